@@ -41,10 +41,70 @@ class Config:
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
     ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'xls', 'xlsx', 'txt'}
     
+    # Chunked (resumable) uploads for files above MAX_CONTENT_LENGTH
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # Must stay below MAX_CONTENT_LENGTH
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 1024 * 1024 * 1024))  # 1GB
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 86400))  # Seconds without data before a session is dropped
+    
+    # File delivery: 'flask' (in-process), 'x-accel' (nginx) or 'x-sendfile' (Apache/lighttpd)
+    FILE_DELIVERY_MODE = os.getenv('FILE_DELIVERY_MODE', 'flask')
+    X_ACCEL_PREFIX = os.getenv('X_ACCEL_PREFIX', '/protected-uploads/')  # nginx internal location aliased to UPLOAD_FOLDER
+    FILE_CACHE_MAX_AGE = int(os.getenv('FILE_CACHE_MAX_AGE', 3600))  # Content-addressed files get one year + immutable
+    
+    # Signed download links (document files need one; previews and images stay public)
+    DOWNLOAD_SIGNATURE_REQUIRED = os.getenv('DOWNLOAD_SIGNATURE_REQUIRED', 'True').lower() in ['true', 'on', '1']
+    DOWNLOAD_URL_SECRET = os.getenv('DOWNLOAD_URL_SECRET')  # Defaults to SECRET_KEY; share it with any static tier that verifies links
+    DOWNLOAD_URL_TTL = int(os.getenv('DOWNLOAD_URL_TTL', 900))  # Seconds
+    
+    # Preview generation (process pool size, 0 = render inline during the upload)
+    PREVIEW_WORKERS = int(os.getenv('PREVIEW_WORKERS', 2))
+    PREVIEW_MAX_ATTEMPTS = int(os.getenv('PREVIEW_MAX_ATTEMPTS', 3))
+    PREVIEW_RETRY_DELAY = float(os.getenv('PREVIEW_RETRY_DELAY', 5))  # Seconds, doubled after each failure
+    
+    # DOC/DOCX/XLS/XLSX previews through headless LibreOffice (one unoserver per preview worker)
+    OFFICE_CONVERT_TIMEOUT = float(os.getenv('OFFICE_CONVERT_TIMEOUT', 60))
+    UNOSERVER_PATH = os.getenv('UNOSERVER_PATH', 'unoserver')
+    SOFFICE_PATH = os.getenv('SOFFICE_PATH', 'soffice')  # Used when the unoserver package is not installed
+    
     # Pagination
     DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', 20))
     MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 100))
     
+    # View/download counters (seconds between bulk flushes, 0 = write-through)
+    COUNTER_FLUSH_INTERVAL = float(os.getenv('COUNTER_FLUSH_INTERVAL', 5))
+    COUNTER_REDIS_URL = os.getenv('COUNTER_REDIS_URL')  # Optional shared buffer for multi-worker setups
+    
+    # Response cache for public catalogue endpoints (seconds, 0 = disabled)
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 300))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    RESPONSE_CACHE_REDIS_URL = os.getenv('RESPONSE_CACHE_REDIS_URL')  # Optional shared cache for multi-worker setups
+    # Without the shared cache, other workers miss invalidations: cap lifetimes to this many seconds
+    RESPONSE_CACHE_LOCAL_TTL = float(os.getenv('RESPONSE_CACHE_LOCAL_TTL', 5))
+    
+    # Authenticated user snapshots (id, role, is_active) instead of a users-table read per request
+    AUTH_PRINCIPAL_TTL = float(os.getenv('AUTH_PRINCIPAL_TTL', 30))  # Seconds, 0 = always read the users table
+    AUTH_PRINCIPAL_MAX_ENTRIES = int(os.getenv('AUTH_PRINCIPAL_MAX_ENTRIES', 4096))
+    AUTH_PRINCIPAL_REDIS_URL = os.getenv('AUTH_PRINCIPAL_REDIS_URL')  # Shared store, also makes invalidation reach every worker
+    AUTH_PRINCIPAL_FROM_TOKEN = os.getenv('AUTH_PRINCIPAL_FROM_TOKEN', 'False').lower() in ['true', 'on', '1']  # Trust role/active claims (needs AUTH_PRINCIPAL_REDIS_URL)
+    
+    # Background SePay reconciliation (seconds between polls, 0 = disabled)
+    SEPAY_RECONCILE_INTERVAL = float(os.getenv('SEPAY_RECONCILE_INTERVAL', 15))
+    SEPAY_RECONCILE_PAGE_SIZE = int(os.getenv('SEPAY_RECONCILE_PAGE_SIZE', 100))
+    SEPAY_RECONCILE_MAX_PAGES = int(os.getenv('SEPAY_RECONCILE_MAX_PAGES', 10))  # Pages fetched per poll
+    SEPAY_EXPIRY_SWEEP_INTERVAL = float(os.getenv('SEPAY_EXPIRY_SWEEP_INTERVAL', 60))  # Cancel expired payment requests, 0 = never
+    SEPAY_EXPIRY_SWEEP_BATCH = int(os.getenv('SEPAY_EXPIRY_SWEEP_BATCH', 1000))  # Rows per UPDATE
+    
+    # SePay webhooks: 'inline' processes in the request, 'journal' stores the raw event and acknowledges at once
+    SEPAY_WEBHOOK_MODE = os.getenv('SEPAY_WEBHOOK_MODE', 'inline').lower()
+    SEPAY_WEBHOOK_DRAIN_INTERVAL = float(os.getenv('SEPAY_WEBHOOK_DRAIN_INTERVAL', 1))  # Seconds, new webhooks wake the worker earlier
+    SEPAY_WEBHOOK_DRAIN_BATCH = int(os.getenv('SEPAY_WEBHOOK_DRAIN_BATCH', 100))
+    SEPAY_WEBHOOK_MAX_ATTEMPTS = int(os.getenv('SEPAY_WEBHOOK_MAX_ATTEMPTS', 5))  # For internal errors, then the event is given up
+    SEPAY_WEBHOOK_RETENTION_DAYS = int(os.getenv('SEPAY_WEBHOOK_RETENTION_DAYS', 30))  # Processed events kept for auditing
+    
+    # /api/sepay/stream (Server-Sent Events; needs threaded or gevent workers)
+    SEPAY_STREAM_TIMEOUT = float(os.getenv('SEPAY_STREAM_TIMEOUT', 300))  # Seconds before the client reconnects
+    SEPAY_STREAM_KEEPALIVE = float(os.getenv('SEPAY_STREAM_KEEPALIVE', 15))  # Seconds between keep-alives and database rechecks
+    
     # CORS
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'https://mauvanban.zluat.vn,http://localhost:3000,http://localhost:5173').split(',')
     
@@ -86,6 +146,12 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    COUNTER_FLUSH_INTERVAL = 0
+    RESPONSE_CACHE_TTL = 0
+    AUTH_PRINCIPAL_TTL = 0
+    PREVIEW_WORKERS = 0
+    SEPAY_RECONCILE_INTERVAL = 0
+    SEPAY_EXPIRY_SWEEP_INTERVAL = 0
 
 
 # Configuration dictionary
@@ -4,7 +4,7 @@ FIXED: Proper decorator usage
 """
 from flask import request
 from flask_restx import Namespace, Resource, fields
-from services import CategoryService, DocumentService, PackageService, UserService
+from services import CategoryService, DocumentService, PackageService, UserService, PreviewService, StorageService
 from middleware import admin_required
 
 # Create namespace
@@ -253,9 +253,7 @@ class AdminDocumentList(Resource):
         guide: {"usage_guide":"Sử dụng khi...","filling_guide":"Điền..."}
         ```
         """
-        import os
         from werkzeug.utils import secure_filename
-        from flask import current_app
         
         # Check if request has file
         has_file = 'file' in request.files
@@ -311,29 +309,16 @@ class AdminDocumentList(Resource):
                             'message': f'Invalid file type: {file.filename}. Allowed: {", ".join(allowed_extensions)}'
                         }, 400
                     
-                    # Generate unique filename
-                    import uuid
-                    from datetime import datetime
-                    unique_filename = f"{uuid.uuid4().hex}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_ext}"
+                    # Save file at its content address (identical re-uploads share one copy)
+                    stored = StorageService.store_upload(file, file_ext)
                     
-                    # Save file
-                    upload_folder = current_app.config['UPLOAD_FOLDER']
-                    os.makedirs(upload_folder, exist_ok=True)
-                    
-                    file_path = os.path.join(upload_folder, unique_filename)
-                    file.save(file_path)
-                    
-                    # Generate preview
-                    from services import PreviewService
-                    preview_url = PreviewService.generate_preview(file_path, file.filename)
-                    
-                    # File info
+                    # File info (preview is reused or rendered in the background after the document is saved)
                     file_info = {
-                        'file_url': f"/uploads/documents/{unique_filename}",
+                        'file_url': stored['file_url'],
                         'file_type': file_ext,
                         'original_filename': secure_filename(file.filename),
-                        'file_size': os.path.getsize(file_path),
-                        'preview_url': preview_url
+                        'file_size': stored['file_size'],
+                        'content_hash': stored['content_hash']
                     }
                     
                     files_data.append(file_info)
@@ -342,10 +327,6 @@ class AdminDocumentList(Resource):
             if files_data:
                 data['file_url'] = files_data[0]['file_url']
                 data['file_type'] = files_data[0]['file_type']
-                
-                # Auto-set thumbnail from preview if not provided
-                if not data.get('thumbnail_url') and files_data[0].get('preview_url'):
-                     data['thumbnail_url'] = files_data[0]['preview_url']
             
         else:
             # Handle JSON data
@@ -446,6 +427,44 @@ class AdminDocumentDetail(Resource):
         }, 200
 
 
+@admin_ns.route('/documents/<string:id>/previews')
+class AdminDocumentPreviews(Resource):
+    """Admin document preview status endpoint"""
+    
+    @admin_required
+    @admin_ns.doc(description='Get preview generation status of document files', security='Bearer')
+    def get(self, current_user, id):
+        """Get preview status"""
+        status = PreviewService.get_status(id)
+        
+        if not status:
+            return {'success': False, 'message': 'Document not found'}, 404
+        
+        return {
+            'success': True,
+            'data': status
+        }, 200
+
+
+@admin_ns.route('/documents/files/<string:file_id>/preview/retry')
+class AdminDocumentFilePreviewRetry(Resource):
+    """Admin preview retry endpoint"""
+    
+    @admin_required
+    @admin_ns.doc(description='Regenerate preview of a document file', security='Bearer')
+    def post(self, current_user, file_id):
+        """Retry preview generation"""
+        success, error = PreviewService.retry(file_id)
+        
+        if error:
+            return {'success': False, 'message': error}, 400
+        
+        return {
+            'success': True,
+            'message': 'Preview generation queued'
+        }, 202
+
+
 # ============ PACKAGE MANAGEMENT ============
 
 @admin_ns.route('/packages')
@@ -573,19 +592,31 @@ class AdminUserList(Resource):
     @admin_ns.param('per_page', 'Items per page', type=int, default=20)
     @admin_ns.param('role', 'Filter by role', enum=['admin', 'user'])
     @admin_ns.param('is_active', 'Filter by active status', type=bool)
+    @admin_ns.param('cursor', 'Keyset cursor (empty = first page, use next_cursor afterwards); page is ignored')
+    @admin_ns.param('total', 'Total count in cursor mode', enum=['exact', 'estimate'])
     def get(self, current_user):
         """Get all users"""
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         role = request.args.get('role')
         is_active = request.args.get('is_active', type=bool)
-        
-        result = UserService.get_all_users(
-            page=page,
-            per_page=per_page,
-            role=role,
-            is_active=is_active
-        )
+        cursor = request.args.get('cursor')
+        total = request.args.get('total')
+        
+        try:
+            result = UserService.get_all_users(
+                page=page,
+                per_page=per_page,
+                role=role,
+                is_active=is_active,
+                cursor=cursor,
+                total=total
+            )
+        except ValueError:
+            return {
+                'success': False,
+                'message': 'Invalid cursor'
+            }, 400
         
         return {
             'success': True,
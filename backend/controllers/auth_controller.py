@@ -4,8 +4,8 @@ FIXED: Proper decorator usage
 """
 from flask import request
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import create_refresh_token, jwt_required, get_jwt_identity, create_access_token, get_jwt
-from services import AuthService
+from flask_jwt_extended import create_refresh_token, jwt_required, get_jwt_identity, create_access_token
+from services import AuthService, UserService, PrincipalService
 from middleware import token_required
 
 # Create namespace
@@ -106,11 +106,18 @@ class RefreshToken(Resource):
     def post(self):
         """Refresh access token"""
         user_id = get_jwt_identity()
-        claims = get_jwt()
+        
+        # Claims come from the current user record, so role/status changes apply on refresh
+        principal = PrincipalService.get(user_id)
+        if not principal or not principal.is_active:
+            return {
+                'success': False,
+                'message': 'User not found or inactive'
+            }, 401
         
         new_access_token = create_access_token(
             identity=user_id,
-            additional_claims={'role': claims.get('role', 'user')}
+            additional_claims=PrincipalService.token_claims(principal)
         )
         
         return {
@@ -129,9 +136,16 @@ class Me(Resource):
     @auth_ns.doc(description='Get current user information', security='Bearer')
     def get(self, current_user):
         """Get current user info"""
+        user, error = UserService.get_user_by_id(current_user.id)
+        if error:
+            return {
+                'success': False,
+                'message': error
+            }, 404
+        
         return {
             'success': True,
-            'data': current_user.to_dict(include_sensitive=True)
+            'data': user.to_dict(include_sensitive=True)
         }, 200
 
 
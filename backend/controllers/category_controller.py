@@ -4,7 +4,7 @@ Category controller - RESTful API endpoints for category management
 from flask import request
 from flask_restx import Namespace, Resource, fields
 from services import CategoryService
-from middleware import admin_required
+from middleware import admin_required, cached_response
 
 # Create namespace
 category_ns = Namespace('categories', description='Category operations')
@@ -35,13 +35,12 @@ class CategoryList(Resource):
     """Category list endpoint"""
     
     @category_ns.doc(description='Get all categories as flat list')
+    @cached_response('categories', 'documents')
     def get(self):
         """Get all categories"""
-        categories = CategoryService.get_all_categories()
-        
         return {
             'success': True,
-            'data': [cat.to_dict(include_documents=True) for cat in categories]
+            'data': CategoryService.get_category_list()
         }, 200
 
 
@@ -50,6 +49,7 @@ class CategoryTree(Resource):
     """Category tree endpoint"""
     
     @category_ns.doc(description='Get categories in tree structure')
+    @cached_response('categories', 'documents')
     def get(self):
         """Get category tree"""
         tree = CategoryService.get_category_tree()
@@ -86,6 +86,7 @@ class CategoryDocuments(Resource):
     """Category documents endpoint"""
     
     @category_ns.doc(description='Get documents in category')
+    @category_ns.param('include_descendants', 'Include documents in subcategories', type=bool, default=False)
     def get(self, slug):
         """Get category documents"""
         from services import DocumentService
@@ -101,11 +102,13 @@ class CategoryDocuments(Resource):
         # Get pagination params
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        include_descendants = request.args.get('include_descendants', '').lower() in ['true', 'on', '1']
         
         result = DocumentService.list_documents(
             page=page,
             per_page=per_page,
-            category_id=category.id
+            category_id=category.id,
+            include_descendants=include_descendants
         )
         
         return {
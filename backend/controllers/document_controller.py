@@ -4,8 +4,8 @@ FIXED: Proper decorator usage
 """
 from flask import request
 from flask_restx import Namespace, Resource
-from services import DocumentService, TransactionService, UserService
-from middleware import token_required, optional_auth
+from services import DocumentService, TransactionService, UserService, EntitlementService, DownloadTokenService, BundleService
+from middleware import token_required, optional_auth, cached_response
 
 # Create namespace
 document_ns = Namespace('documents', description='Document operations')
@@ -15,33 +15,59 @@ document_ns = Namespace('documents', description='Document operations')
 class DocumentList(Resource):
     """Document list endpoint"""
     
+    @cached_response('documents', 'categories', unless=lambda: bool(request.args.get('q')))
+    @optional_auth
     @document_ns.doc(description='List documents with pagination and filters')
     @document_ns.param('page', 'Page number', type=int, default=1)
     @document_ns.param('per_page', 'Items per page', type=int, default=20)
     @document_ns.param('category_id', 'Filter by category ID')
+    @document_ns.param('include_descendants', 'With category_id, include documents in subcategories', type=bool, default=False)
     @document_ns.param('is_featured', 'Filter by featured status', type=bool)
     @document_ns.param('q', 'Search query')  # Changed from 'search' to 'q'
-    @document_ns.param('sort_by', 'Sort field', enum=['created_at', 'views_count', 'downloads_count', 'price'])
+    @document_ns.param('sort_by', 'Sort field (default: relevance when searching, else created_at)', enum=['relevance', 'created_at', 'views_count', 'downloads_count', 'price'])
     @document_ns.param('sort_order', 'Sort order', enum=['asc', 'desc'])
-    def get(self):
+    @document_ns.param('cursor', 'Keyset cursor (empty = first page, use next_cursor afterwards); page is ignored')
+    @document_ns.param('total', 'Total count in cursor mode', enum=['exact', 'estimate'])
+    def get(self, current_user):
         """List documents"""
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         category_id = request.args.get('category_id')
+        include_descendants = request.args.get('include_descendants', '').lower() in ['true', 'on', '1']
         is_featured = request.args.get('is_featured', type=bool)
         search = request.args.get('q')  # Changed from 'search' to 'q'
-        sort_by = request.args.get('sort_by', 'created_at')
+        sort_by = request.args.get('sort_by')
         sort_order = request.args.get('sort_order', 'desc')
+        cursor = request.args.get('cursor')
+        total = request.args.get('total')
         
-        result = DocumentService.list_documents(
-            page=page,
-            per_page=per_page,
-            category_id=category_id,
-            is_featured=is_featured,
-            search_query=search,
-            sort_by=sort_by,
-            sort_order=sort_order
-        )
+        try:
+            result = DocumentService.list_documents(
+                page=page,
+                per_page=per_page,
+                category_id=category_id,
+                include_descendants=include_descendants,
+                is_featured=is_featured,
+                search_query=search,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                cursor=cursor,
+                total=total
+            )
+        except ValueError:
+            return {
+                'success': False,
+                'message': 'Invalid cursor'
+            }, 400
+        
+        # Mark owned documents with one batch query
+        if current_user:
+            owned = EntitlementService.owned_document_ids(
+                current_user.id,
+                [doc['id'] for doc in result['documents']]
+            )
+            for doc in result['documents']:
+                doc['has_purchased'] = doc['id'] in owned
         
         return {
             'success': True,
@@ -98,7 +124,7 @@ class DocumentDetail(Resource):
                 import uuid
                 # Simple check for UUID format
                 uuid_obj = uuid.UUID(slug)
-                document = DocumentService.get_document_by_id(slug)
+                document = DocumentService.get_document_by_id(slug, profile='detail')
             except ValueError:
                 pass
         
@@ -139,7 +165,7 @@ class DocumentPreview(Resource):
     @document_ns.doc(description='Get document preview content')
     def get(self, slug):
         """Get document preview"""
-        document = DocumentService.get_document_by_slug(slug)
+        document = DocumentService.get_document_by_slug(slug, profile=None)
         
         if not document:
             return {
@@ -234,13 +260,16 @@ class DownloadDocument(Resource):
         from flask import current_app
         api_base_url = current_app.config.get('FRONTEND_URL', 'https://mauvanban.zluat.vn')
         
-        def get_full_url(path):
+        def get_full_url(path, download_name=None):
             if not path: return None
             if path.startswith('http'): return path
+            # Expiring HMAC-signed link; the file route checks it without a DB lookup
+            path = DownloadTokenService.signed_url(path, download_name)
             return f"{api_base_url}{'' if path.startswith('/') else '/'}{path}"
 
         # Get main file info
-        full_url = get_full_url(document.file_url)
+        main_filename = f"{document.title}.{document.file_type}"
+        full_url = get_full_url(document.file_url, main_filename)
 
         # Get all attached files if they exist
         files_list = []
@@ -250,14 +279,14 @@ class DownloadDocument(Resource):
                     'id': f.id,
                     'original_filename': f.original_filename,
                     'file_type': f.file_type,
-                    'download_url': get_full_url(f.file_url)
+                    'download_url': get_full_url(f.file_url, f.original_filename)
                 })
         
         # If no files in document_files, use the main file_url
         if not files_list and full_url:
             files_list.append({
                 'id': 'main',
-                'original_filename': f"{document.title}.{document.file_type}",
+                'original_filename': main_filename,
                 'file_type': document.file_type,
                 'download_url': full_url
             })
@@ -273,6 +302,41 @@ class DownloadDocument(Resource):
         }, 200
 
 
+@document_ns.route('/<string:id>/bundle')
+class DocumentBundle(Resource):
+    """Zip of all files of a purchased document"""
+    
+    @token_required
+    @document_ns.doc(description='Download all files of a purchased document as one zip (streamed)', security='Bearer')
+    def get(self, current_user, id):
+        """Download document bundle"""
+        document = DocumentService.get_document_by_id(id, profile='list')
+        if not document:
+            return {
+                'success': False,
+                'message': 'Document not found'
+            }, 404
+        
+        if not TransactionService.check_user_purchased_document(current_user.id, id):
+            return {
+                'success': False,
+                'message': 'Document not purchased'
+            }, 403
+        
+        entries = BundleService.document_entries(document)
+        if not entries:
+            return {
+                'success': False,
+                'message': 'Document has no files'
+            }, 404
+        
+        version = BundleService.version('document', document.id, entries)
+        response = BundleService.send(entries, f"{document.slug or document.id}.zip", version)
+        if response.status_code == 200:
+            DocumentService.increment_download(id)
+        return response
+
+
 @document_ns.route('/<string:id>/report')
 class ReportDocument(Resource):
     """Report document endpoint"""
@@ -2,6 +2,7 @@ from flask import request
 from flask_restx import Namespace, Resource, fields
 from services.news_service import NewsService
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from middleware import cached_response
 
 news_ns = Namespace('news', description='News and AI Content Generation operations')
 
@@ -25,10 +26,29 @@ generate_request = news_ns.model('GenerateNews', {
 
 @news_ns.route('/')
 class NewsList(Resource):
+    @cached_response('news')
     def get(self):
         """Get all news articles"""
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        cursor = request.args.get('cursor')
+        
+        if cursor is not None:
+            # Keyset mode: no OFFSET, total only when ?total=exact|estimate
+            try:
+                result = NewsService.get_news_keyset(cursor, per_page, request.args.get('total'))
+            except ValueError:
+                return {'success': False, 'message': 'Invalid cursor'}, 400
+            return {
+                'success': True,
+                'data': [news.to_dict() for news in result['items']],
+                'pagination': {
+                    'total': result['total'],
+                    'per_page': result['per_page'],
+                    'has_next': result['has_next'],
+                    'next_cursor': result['next_cursor']
+                }
+            }, 200
         
         pagination = NewsService.get_all_news(page, per_page)
         
@@ -4,8 +4,8 @@ FIXED: Proper decorator usage
 """
 from flask import request
 from flask_restx import Namespace, Resource
-from services import PackageService, TransactionService
-from middleware import token_required
+from services import PackageService, TransactionService, DocumentService, EntitlementService, BundleService
+from middleware import token_required, cached_response
 
 # Create namespace
 package_ns = Namespace('packages', description='Package operations')
@@ -18,6 +18,7 @@ class PackageList(Resource):
     @package_ns.doc(description='List all packages')
     @package_ns.param('page', 'Page number', type=int, default=1)
     @package_ns.param('per_page', 'Items per page', type=int, default=20)
+    @cached_response('packages', 'documents')
     def get(self):
         """List packages"""
         page = request.args.get('page', 1, type=int)
@@ -79,3 +80,42 @@ class PurchasePackage(Resource):
             'message': 'Package purchased successfully',
             'data': transaction.to_dict(include_details=True)
         }, 201
+
+
+@package_ns.route('/<string:id>/bundle')
+class PackageBundle(Resource):
+    """Zip of all files of a purchased package"""
+    
+    @token_required
+    @package_ns.doc(description='Download every document of a purchased package as one zip (streamed)', security='Bearer')
+    def get(self, current_user, id):
+        """Download package bundle"""
+        package = PackageService.get_package_by_id(id)
+        if not package:
+            return {
+                'success': False,
+                'message': 'Package not found'
+            }, 404
+        
+        # Buying the package grants every document; owning them one by one counts too
+        document_ids = {pd.document_id for pd in package.documents}
+        owned = EntitlementService.owned_document_ids(current_user.id, document_ids)
+        if not document_ids or owned != document_ids:
+            return {
+                'success': False,
+                'message': 'Package not purchased'
+            }, 403
+        
+        entries = BundleService.package_entries(package)
+        if not entries:
+            return {
+                'success': False,
+                'message': 'Package has no files'
+            }, 404
+        
+        version = BundleService.version('package', package.id, entries)
+        response = BundleService.send(entries, f"{package.slug or package.id}.zip", version)
+        if response.status_code == 200:
+            for document_id in document_ids:
+                DocumentService.increment_download(document_id)
+        return response
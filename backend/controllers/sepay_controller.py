@@ -2,12 +2,15 @@
 SePay Payment Controller - FIXED VERSION
 Handles webhook callbacks and payment status checks
 """
-from flask import request, current_app
+from flask import request, current_app, Response, stream_with_context
 from flask_restx import Namespace, Resource, fields
 from services.sepay_service import SepayService
+from services.sepay_webhook_journal import SepayWebhookJournal
 from services.transaction_service import TransactionService
 from middleware import token_required
+from models import db
 import json
+import logging
 
 # Create namespace
 sepay_ns = Namespace('sepay', description='SePay payment operations')
@@ -71,15 +74,6 @@ class SepayWebhook(Resource):
     def post(self):
         """Process SePay webhook"""
         try:
-            # Log all headers for debugging
-            headers_dict = dict(request.headers)
-            current_app.logger.info("=== SePay Webhook Received ===")
-            current_app.logger.info(f"Headers: {json.dumps(headers_dict, indent=2)}")
-            
-            # Get raw payload
-            payload = request.get_data(as_text=True)
-            current_app.logger.info(f"Raw Payload: {payload}")
-            
             # FIXED: Get authorization header (support both cases)
             auth_header = (
                 request.headers.get('authorization') or  # lowercase
@@ -87,7 +81,25 @@ class SepayWebhook(Resource):
                 ''
             )
             
-            current_app.logger.info(f"Auth header: {auth_header[:50]}...")
+            # Journal mode: authenticate, store the raw event, acknowledge
+            if SepayWebhookJournal.enabled():
+                if not SepayService.verify_webhook_api_key(auth_header):
+                    return {
+                        'success': False,
+                        'message': 'Invalid authentication'
+                    }, 401
+                
+                SepayWebhookJournal.append(request.get_data(as_text=True))
+                return {
+                    'success': True,
+                    'message': 'Webhook queued'
+                }, 200
+            
+            # Get raw payload
+            payload = request.get_data(as_text=True)
+            if current_app.logger.isEnabledFor(logging.DEBUG):
+                current_app.logger.debug(f"SePay webhook headers: {dict(request.headers)}")
+                current_app.logger.debug(f"SePay webhook payload: {payload}")
             
             # Parse JSON data
             try:
@@ -185,6 +197,36 @@ class SepayCheck(Resource):
             }, 500
 
 
+@sepay_ns.route('/stream/<string:transaction_id>')
+class SepayStream(Resource):
+    """Push SePay transaction status (Server-Sent Events)"""
+    
+    @token_required
+    @sepay_ns.doc(description='Stream the transaction status: one "status" event once it is no longer pending', security='Bearer')
+    def get(self, current_user, transaction_id):
+        """Wait for transaction status"""
+        from models import Transaction
+        transaction = db.session.get(Transaction, transaction_id)
+        
+        if not transaction:
+            return {
+                'success': False,
+                'message': 'Transaction not found'
+            }, 404
+        
+        if transaction.user_id != current_user.id:
+            return {
+                'success': False,
+                'message': 'Unauthorized'
+            }, 403
+        
+        return Response(
+            stream_with_context(SepayService.status_stream(transaction_id)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+
 @sepay_ns.route('/cancel/<string:transaction_id>')
 class SepayCancel(Resource):
     """Cancel SePay payment"""
@@ -6,6 +6,7 @@ from flask import request, current_app
 from flask_restx import Namespace, Resource
 from werkzeug.utils import secure_filename
 from middleware import admin_required
+from services import StorageService, ChunkedUploadService, DocumentService
 
 # Create namespace
 upload_ns = Namespace('upload', description='File upload operations')
@@ -60,66 +61,179 @@ class UploadDocument(Resource):
         
         # Secure filename
         filename = secure_filename(file.filename)
+        file_ext = file.filename.rsplit('.', 1)[1].lower()
         
-        # Generate unique filename
-        import uuid
-        from datetime import datetime
-        
-        file_ext = filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_ext}"
-        
-        # Save file
-        upload_folder = config['development'].UPLOAD_FOLDER
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
-        
-        # Generate file URL
-        file_url = f"/uploads/documents/{unique_filename}"
+        # Save file at its content address (identical re-uploads share one copy)
+        stored = StorageService.store_upload(file, file_ext)
         
         return {
             'success': True,
-            'message': 'File uploaded successfully',
+            'message': 'File already uploaded' if stored['deduplicated'] else 'File uploaded successfully',
             'data': {
-                'filename': unique_filename,
+                'filename': stored['file_url'][len('/uploads/documents/'):],
                 'original_filename': filename,
-                'file_url': file_url,
+                'file_url': stored['file_url'],
                 'file_type': file_ext,
-                'file_size': os.path.getsize(file_path)
+                'file_size': stored['file_size'],
+                'content_hash': stored['content_hash'],
+                'deduplicated': stored['deduplicated']
             }
-        }, 201
+        }, 200 if stored['deduplicated'] else 201
 
 
-@upload_ns.route('/document/<string:filename>')
+@upload_ns.route('/document/<path:filename>')
 class DeleteDocument(Resource):
     """Delete uploaded document"""
     
     @admin_required
-    @upload_ns.doc(description='Delete uploaded document file', security='Bearer')
+    @upload_ns.doc(description='Delete uploaded document file (refused while a document still uses it)', security='Bearer')
     def delete(self, current_user, filename):
         """Delete document file"""
         
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = os.path.join(upload_folder, secure_filename(filename))
+        try:
+            deleted, error = StorageService.release(f"/uploads/documents/{filename}")
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error deleting file: {str(e)}'
+            }, 500
         
-        if not os.path.exists(file_path):
+        if error == 'File not found':
             return {
                 'success': False,
-                'message': 'File not found'
+                'message': error
             }, 404
         
-        try:
-            os.remove(file_path)
-            return {
-                'success': True,
-                'message': 'File deleted successfully'
-            }, 200
-        except Exception as e:
+        if error:
             return {
                 'success': False,
-                'message': f'Error deleting file: {str(e)}'
-            }, 500
+                'message': error
+            }, 409
+        
+        return {
+            'success': True,
+            'message': 'File deleted successfully'
+        }, 200
+
+
+@upload_ns.route('/chunked')
+class ChunkedUploadList(Resource):
+    """Chunked upload session endpoint"""
+    
+    @admin_required
+    @upload_ns.doc(description='Start a resumable chunked upload. Body: {filename, file_size, sha256 (optional)}', security='Bearer')
+    def post(self, current_user):
+        """Initiate chunked upload"""
+        data = request.json or {}
+        
+        session, error = ChunkedUploadService.initiate(
+            data.get('filename'),
+            data.get('file_size'),
+            data.get('sha256')
+        )
+        
+        if error:
+            return {'success': False, 'message': error}, 400
+        
+        return {
+            'success': True,
+            'message': 'Upload session created',
+            'data': session
+        }, 201
+
+
+@upload_ns.route('/chunked/<string:upload_id>')
+class ChunkedUploadDetail(Resource):
+    """Chunked upload session detail endpoint"""
+    
+    @admin_required
+    @upload_ns.doc(description='Get upload progress; resume by sending the next chunk at data.offset', security='Bearer')
+    def get(self, current_user, upload_id):
+        """Get upload status"""
+        session = ChunkedUploadService.get_status(upload_id)
+        
+        if not session:
+            return {'success': False, 'message': 'Upload not found'}, 404
+        
+        return {
+            'success': True,
+            'data': session
+        }, 200
+    
+    @admin_required
+    @upload_ns.doc(description='Upload one chunk as the raw request body. Headers: Upload-Offset (required), X-Chunk-SHA256 (optional)', security='Bearer')
+    @upload_ns.param('offset', 'Byte offset of the chunk (alternative to the Upload-Offset header)', type=int)
+    def put(self, current_user, upload_id):
+        """Upload chunk"""
+        offset = request.headers.get('Upload-Offset', request.args.get('offset'))
+        try:
+            offset = int(offset)
+        except (TypeError, ValueError):
+            return {'success': False, 'message': 'Upload-Offset header is required'}, 400
+        
+        session, error = ChunkedUploadService.write_chunk(
+            upload_id,
+            offset,
+            request.stream,
+            request.headers.get('X-Chunk-SHA256')
+        )
+        
+        if error == 'Upload not found':
+            return {'success': False, 'message': error}, 404
+        
+        if error == 'Offset mismatch':
+            return {'success': False, 'message': error, 'data': session}, 409
+        
+        if error:
+            return {'success': False, 'message': error, 'data': session}, 400
+        
+        return {
+            'success': True,
+            'data': session
+        }, 200
+    
+    @admin_required
+    @upload_ns.doc(description='Cancel upload', security='Bearer')
+    def delete(self, current_user, upload_id):
+        """Abort upload"""
+        if not ChunkedUploadService.abort(upload_id):
+            return {'success': False, 'message': 'Upload not found'}, 404
+        
+        return {
+            'success': True,
+            'message': 'Upload cancelled'
+        }, 200
+
+
+@upload_ns.route('/chunked/<string:upload_id>/complete')
+class ChunkedUploadComplete(Resource):
+    """Chunked upload completion endpoint"""
+    
+    @admin_required
+    @upload_ns.doc(description='Verify and store the uploaded file. Body: {document_id (optional)} attaches it to a document; otherwise pass data in files_data when creating one', security='Bearer')
+    def post(self, current_user, upload_id):
+        """Complete chunked upload"""
+        data = request.get_json(silent=True) or {}
+        
+        file_data, error = ChunkedUploadService.complete(upload_id)
+        
+        if error == 'Upload not found':
+            return {'success': False, 'message': error}, 404
+        
+        if error:
+            return {'success': False, 'message': error}, 400
+        
+        if data.get('document_id'):
+            doc_file, error = DocumentService.add_file(data['document_id'], file_data)
+            if error:
+                return {'success': False, 'message': error, 'data': file_data}, 400
+            file_data = doc_file.to_dict()
+        
+        return {
+            'success': True,
+            'message': 'File uploaded successfully',
+            'data': file_data
+        }, 201
 
 
 @upload_ns.route('/image')
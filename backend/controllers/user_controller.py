@@ -19,16 +19,28 @@ class SavedDocuments(Resource):
     @user_ns.doc(description='Get user saved documents', security='Bearer')
     @user_ns.param('page', 'Page number', type=int, default=1)
     @user_ns.param('per_page', 'Items per page', type=int, default=20)
+    @user_ns.param('cursor', 'Keyset cursor (empty = first page, use next_cursor afterwards); page is ignored')
+    @user_ns.param('total', 'Total count in cursor mode', enum=['exact', 'estimate'])
     def get(self, current_user):
         """Get saved documents"""
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
+        total = request.args.get('total')
         
-        result = UserService.get_saved_documents(
-            current_user.id,
-            page=page,
-            per_page=per_page
-        )
+        try:
+            result = UserService.get_saved_documents(
+                current_user.id,
+                page=page,
+                per_page=per_page,
+                cursor=cursor,
+                total=total
+            )
+        except ValueError:
+            return {
+                'success': False,
+                'message': 'Invalid cursor'
+            }, 400
         
         return {
             'success': True,
@@ -45,18 +57,30 @@ class UserTransactions(Resource):
     @user_ns.param('page', 'Page number', type=int, default=1)
     @user_ns.param('per_page', 'Items per page', type=int, default=20)
     @user_ns.param('type', 'Transaction type', enum=['document', 'package', 'topup'])
+    @user_ns.param('cursor', 'Keyset cursor (empty = first page, use next_cursor afterwards); page is ignored')
+    @user_ns.param('total', 'Total count in cursor mode', enum=['exact', 'estimate'])
     def get(self, current_user):
         """Get transaction history"""
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         transaction_type = request.args.get('type')
+        cursor = request.args.get('cursor')
+        total = request.args.get('total')
         
-        result = TransactionService.get_user_transactions(
-            current_user.id,
-            page=page,
-            per_page=per_page,
-            transaction_type=transaction_type
-        )
+        try:
+            result = TransactionService.get_user_transactions(
+                current_user.id,
+                page=page,
+                per_page=per_page,
+                transaction_type=transaction_type,
+                cursor=cursor,
+                total=total
+            )
+        except ValueError:
+            return {
+                'success': False,
+                'message': 'Invalid cursor'
+            }, 400
         
         return {
             'success': True,
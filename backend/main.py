@@ -36,6 +36,34 @@ def create_app(config_name='development'):
     # Initialize API
     api.init_app(app)
     
+    # Write-behind view/download counters
+    from services.counter_service import CounterService
+    CounterService.init_app(app)
+    
+    # Response cache for public catalogue endpoints
+    from services.cache_service import CacheService
+    CacheService.init_app(app)
+    
+    # Cached user principals for JWT-authenticated requests
+    from services.principal_service import PrincipalService
+    PrincipalService.init_app(app)
+    
+    # Background preview generation
+    from services.preview_service import PreviewService
+    PreviewService.init_app(app)
+    
+    # Background SePay reconciliation (status checks only read the database)
+    from services.sepay_reconciler import SepayReconciler
+    SepayReconciler.init_app(app)
+    
+    # Journaled SePay webhooks (acknowledged on arrival, processed by a worker)
+    from services.sepay_webhook_journal import SepayWebhookJournal
+    SepayWebhookJournal.init_app(app)
+    
+    # Payment status notifications for /api/sepay/stream
+    from services.payment_notifier import PaymentNotifier
+    PaymentNotifier.init_app(app)
+    
     # Create upload folder if not exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
@@ -43,9 +71,20 @@ def create_app(config_name='development'):
     @app.route('/uploads/documents/<path:filename>')
     @app.route('/api/uploads/documents/<path:filename>')  # Fix for Double API Frontend issue
     def uploaded_file(filename):
-        """Serve uploaded document files"""
-        from flask import send_from_directory
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        """Serve uploaded document files (via the front proxy when FILE_DELIVERY_MODE is set)"""
+        from flask import request, abort
+        from services.file_delivery_service import FileDeliveryService
+        from services.download_token_service import DownloadTokenService
+
+        if not DownloadTokenService.is_protected(filename):
+            return FileDeliveryService.send(filename)
+
+        # Document files need a link signed by DownloadDocument (checked without the database)
+        expires = request.args.get('expires')
+        name = request.args.get('name', '')
+        if not DownloadTokenService.verify(filename, expires, request.args.get('sig'), name):
+            abort(403)
+        return FileDeliveryService.send(filename, download_name=name or None, expires=int(expires))
     
     # Health check endpoint
     @app.route('/')
@@ -2,5 +2,6 @@
 Middleware package initialization
 """
 from .auth import token_required, admin_required, optional_auth
+from .cache import cached_response
 
-__all__ = ['token_required', 'admin_required', 'optional_auth']
+__all__ = ['token_required', 'admin_required', 'optional_auth', 'cached_response']
@@ -4,12 +4,14 @@ Authentication middleware for JWT token validation and role-based access control
 from functools import wraps
 from flask import request
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
-from models import db, User
+from models import db
+from services.principal_service import PrincipalService
 
 
 def token_required(fn):
     """
     Decorator to require valid JWT token
+    Passes current_user as a UserPrincipal (id, role, is_active)
     Usage: @token_required
     """
     @wraps(fn)
@@ -18,8 +20,8 @@ def token_required(fn):
             verify_jwt_in_request()
             user_id = get_jwt_identity()
             
-            # Get user from database
-            user = db.session.get(User, user_id)
+            # Cached snapshot (id, role, is_active) instead of a users-table read
+            user = PrincipalService.current(user_id, get_jwt())
             
             if not user:
                 return {
@@ -58,8 +60,8 @@ def admin_required(fn):
             verify_jwt_in_request()
             user_id = get_jwt_identity()
             
-            # Get user from database
-            user = db.session.get(User, user_id)
+            # Cached snapshot (id, role, is_active) instead of a users-table read
+            user = PrincipalService.current(user_id, get_jwt())
             
             if not user:
                 return {
@@ -107,7 +109,7 @@ def optional_auth(fn):
             
             current_user = None
             if user_id:
-                current_user = db.session.get(User, user_id)
+                current_user = PrincipalService.current(user_id, get_jwt())
             
             return fn(*args, current_user=current_user, **kwargs)
             
@@ -0,0 +1,54 @@
+"""
+Response cache decorator for public GET endpoints
+"""
+from functools import wraps
+from flask import request, current_app, make_response
+from services.cache_service import CacheService
+
+
+def _cached(entry):
+    """Build a response from a cache entry, answering 304 if the client copy is current"""
+    if request.if_none_match.contains(entry['etag']):
+        response = make_response('', 304)
+    else:
+        response = make_response(entry['body'], entry['status'])
+        response.mimetype = 'application/json'
+    response.set_etag(entry['etag'])
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def cached_response(*tags, ttl=None, unless=None):
+    """
+    Decorator caching a Resource GET response (anonymous, 200 only)
+
+    Args:
+        tags: Tags invalidated by CacheService.invalidate when the data changes
+        ttl: Lifetime in seconds (default RESPONSE_CACHE_TTL)
+        unless: Callable; when it returns True the request bypasses the cache
+
+    Usage: @cached_response('categories', 'documents')
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if (CacheService.default_ttl() <= 0
+                    or request.headers.get('Authorization')
+                    or (unless is not None and unless())):
+                return fn(*args, **kwargs)
+
+            key = CacheService.build_key(request.path, request.args, tags)
+            entry = CacheService.get(key)
+            if entry is None:
+                result = fn(*args, **kwargs)
+                if isinstance(result, tuple):
+                    data, status = result[0], (result[1] if len(result) > 1 else 200)
+                else:
+                    data, status = result, 200
+                if status != 200 or not isinstance(data, (dict, list)):
+                    return result
+                entry = CacheService.set(key, current_app.json.dumps(data), status, ttl)
+            return _cached(entry)
+
+        return wrapper
+    return decorator
@@ -21,6 +21,9 @@ from .saved_document import SavedDocument
 from .transaction import Transaction
 from .reported_document import ReportedDocument
 from .news import News
+from .user_document_entitlement import UserDocumentEntitlement
+from .sepay_sync_state import SepaySyncState
+from .sepay_webhook_event import SepayWebhookEvent
 
 __all__ = [
     'db',
@@ -36,5 +39,8 @@ __all__ = [
     'SavedDocument',
     'Transaction',
     'ReportedDocument',
-    'News'
+    'News',
+    'UserDocumentEntitlement',
+    'SepaySyncState',
+    'SepayWebhookEvent'
 ]
@@ -4,6 +4,7 @@ Category model with hierarchical structure
 import uuid
 from datetime import datetime
 from slugify import slugify
+from sqlalchemy import func
 from . import db
 
 
@@ -43,8 +44,13 @@ class Category(db.Model):
     # generate_slug moved to service for better uniqueness control
 
     
-    def to_dict(self, include_children=False, include_documents=False):
-        """Convert to dictionary"""
+    def to_dict(self, include_children=False, include_documents=False, documents_count=None):
+        """
+        Convert to dictionary
+        
+        documents_count: precomputed count of active documents (CategoryService.get_document_counts);
+        otherwise include_documents runs one COUNT query for this category
+        """
         data = {
             'id': self.id,
             'name': self.name,
@@ -62,7 +68,13 @@ class Category(db.Model):
             data['children'] = [child.to_dict() for child in self.children if child.is_active]
         
         if include_documents:
-            data['documents_count'] = len([doc for doc in self.documents if doc.is_active])
+            if documents_count is None:
+                from .document import Document
+                documents_count = db.session.query(func.count(Document.id)).filter(
+                    Document.category_id == self.id,
+                    Document.is_active.is_(True)
+                ).scalar()
+            data['documents_count'] = documents_count
         
         return data
     
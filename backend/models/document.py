@@ -1,11 +1,29 @@
 """
 Document model for managing templates and forms
 """
+import re
 import uuid
+import unicodedata
 from datetime import datetime
 from slugify import slugify
+from sqlalchemy import event, inspect, DDL
 from . import db
 
+SEARCHABLE_FIELDS = ('title', 'code', 'description', 'meta_keywords', 'content')
+
+
+def fold_search_text(text):
+    """
+    Normalize text for full-text search: lowercase and strip Vietnamese
+    diacritics so that "hop dong" matches "Hợp đồng"
+    """
+    if not text:
+        return ''
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return re.sub(r'\s+', ' ', text.lower()).strip()
+
 
 class Document(db.Model):
     """Document model for templates and forms"""
@@ -47,10 +65,20 @@ class Document(db.Model):
     meta_keywords = db.Column(db.Text)
     meta_description = db.Column(db.Text)
     
+    # Search (diacritic-folded title, code, description and content)
+    search_text = db.Column(db.Text)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # Seek index for keyset pagination (PaginationService) and the
+    # per-category lookups / grouped counts (CategoryService)
+    __table_args__ = (
+        db.Index('idx_documents_created_at_id', 'created_at', 'id'),
+        db.Index('idx_documents_category_id_is_active', 'category_id', 'is_active'),
+    )
+    
     # Relationships
     category = db.relationship('Category', back_populates='documents')
     guide = db.relationship('DocumentGuide', back_populates='document', uselist=False, cascade='all, delete-orphan')
@@ -66,6 +94,11 @@ class Document(db.Model):
         if not self.slug:
             self.slug = slugify(self.title)
     
+    def update_search_text(self):
+        """Rebuild the folded text used by the full-text search index"""
+        parts = [getattr(self, field) for field in SEARCHABLE_FIELDS]
+        self.search_text = fold_search_text(' '.join(p for p in parts if p))
+    
     def increment_views(self):
         """Increment view count"""
         self.views_count += 1
@@ -107,8 +140,65 @@ class Document(db.Model):
         # Include files if loaded
         if hasattr(self, 'files') and self.files:
             data['files'] = [f.to_dict() for f in self.files]
+            
+            # Sized variants of the thumbnail when it is a generated preview
+            thumbnail_file = next((f for f in self.files if f.preview_url and f.preview_url == self.thumbnail_url), None)
+            data['thumbnail_srcset'] = thumbnail_file.preview_srcset() if thumbnail_file else None
         
         return data
     
     def __repr__(self):
         return f'<Document {self.code}: {self.title}>'
+
+
+@event.listens_for(Document, 'before_insert')
+def _init_search_text(mapper, connection, target):
+    """Build search_text for new documents"""
+    target.update_search_text()
+
+
+@event.listens_for(Document, 'before_update')
+def _refresh_search_text(mapper, connection, target):
+    """Rebuild search_text only when a searchable column changed"""
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in SEARCHABLE_FIELDS):
+        target.update_search_text()
+
+
+@event.listens_for(Document, 'after_insert')
+@event.listens_for(Document, 'after_update')
+def _sync_fts_row(mapper, connection, target):
+    """Mirror search_text into the SQLite FTS5 table (PostgreSQL indexes the column directly)"""
+    if connection.dialect.name != 'sqlite':
+        return
+    if not inspect(target).attrs.search_text.history.has_changes():
+        return
+    connection.exec_driver_sql('DELETE FROM documents_fts WHERE document_id = ?', (target.id,))
+    connection.exec_driver_sql(
+        'INSERT INTO documents_fts (document_id, search_text) VALUES (?, ?)',
+        (target.id, target.search_text or '')
+    )
+
+
+@event.listens_for(Document, 'after_delete')
+def _delete_fts_row(mapper, connection, target):
+    """Remove deleted documents from the SQLite FTS5 table"""
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('DELETE FROM documents_fts WHERE document_id = ?', (target.id,))
+
+
+# Full-text index: GIN over a tsvector expression on PostgreSQL, FTS5 table on SQLite
+event.listen(
+    Document.__table__, 'after_create',
+    DDL("CREATE INDEX IF NOT EXISTS idx_documents_search_text_fts ON documents "
+        "USING GIN (to_tsvector('simple', coalesce(search_text, '')))").execute_if(dialect='postgresql')
+)
+event.listen(
+    Document.__table__, 'after_create',
+    DDL("CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+        "document_id UNINDEXED, search_text, tokenize='unicode61 remove_diacritics 2')").execute_if(dialect='sqlite')
+)
+event.listen(
+    Document.__table__, 'before_drop',
+    DDL("DROP TABLE IF EXISTS documents_fts").execute_if(dialect='sqlite')
+)
@@ -19,9 +19,14 @@ class DocumentFile(db.Model):
     # File info
     file_url = db.Column(db.String(500), nullable=False)
     preview_url = db.Column(db.String(500))  # URL of the generated preview image (blurred page 1)
+    preview_renditions = db.Column(db.JSON)  # [{width, format, url}] of the sized WebP/JPEG previews
+    preview_status = db.Column(db.String(20))  # pending, ready, failed (None = no preview for this type)
+    preview_attempts = db.Column(db.Integer, default=0, nullable=False)
+    preview_error = db.Column(db.Text)
     file_type = db.Column(db.String(10))  # pdf, doc, docx, etc.
     original_filename = db.Column(db.String(255))
     file_size = db.Column(db.Integer)  # Size in bytes
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the stored object (rows sharing it = refcount)
     
     # Order
     display_order = db.Column(db.Integer, default=0)
@@ -32,6 +37,15 @@ class DocumentFile(db.Model):
     # Relationships
     document = db.relationship('Document', back_populates='files')
     
+    def preview_srcset(self):
+        """srcset strings per format ({'webp': 'url 200w, ...', 'jpeg': ...}) or None"""
+        if not self.preview_renditions:
+            return None
+        srcset = {}
+        for entry in sorted(self.preview_renditions, key=lambda r: r['width']):
+            srcset.setdefault(entry['format'], []).append(f"{entry['url']} {entry['width']}w")
+        return {fmt: ', '.join(items) for fmt, items in srcset.items()}
+    
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -39,9 +53,12 @@ class DocumentFile(db.Model):
             'document_id': self.document_id,
             'file_url': self.file_url,
             'preview_url': self.preview_url,
+            'preview_srcset': self.preview_srcset(),
+            'preview_status': self.preview_status,
             'file_type': self.file_type,
             'original_filename': self.original_filename,
             'file_size': self.file_size,
+            'content_hash': self.content_hash,
             'display_order': self.display_order,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -33,6 +33,11 @@ class News(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # Seek index for keyset pagination (PaginationService)
+    __table_args__ = (
+        db.Index('idx_news_created_at_id', 'created_at', 'id'),
+    )
+    
     def generate_slug(self):
         """Generate URL-friendly slug from title"""
         if not self.slug and self.title:
@@ -13,6 +13,11 @@ class PackageDocument(db.Model):
     package_id = db.Column(db.String(36), db.ForeignKey('document_packages.id'), primary_key=True)
     document_id = db.Column(db.String(36), db.ForeignKey('documents.id'), primary_key=True)
     
+    # Reverse lookup (document -> packages) for entitlement checks
+    __table_args__ = (
+        db.Index('idx_package_documents_document_id', 'document_id'),
+    )
+    
     # Relationships
     package = db.relationship('DocumentPackage', back_populates='documents')
     document = db.relationship('Document', back_populates='packages')
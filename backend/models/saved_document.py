@@ -21,9 +21,10 @@ class SavedDocument(db.Model):
     # Timestamp
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
-    # Unique constraint
+    # Unique constraint and keyset pagination seek index
     __table_args__ = (
         db.UniqueConstraint('user_id', 'document_id', name='unique_user_document'),
+        db.Index('idx_saved_documents_user_created_at_id', 'user_id', 'created_at', 'id'),
     )
     
     # Relationships
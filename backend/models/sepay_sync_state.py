@@ -0,0 +1,20 @@
+"""
+SePay sync state model - cursors for background reconciliation
+"""
+from datetime import datetime
+from . import db
+
+
+class SepaySyncState(db.Model):
+    """Key/value progress markers for SePay API polling"""
+    
+    __tablename__ = 'sepay_sync_state'
+    
+    # e.g. 'last_transaction_id' -> highest SePay bank transaction ID already matched
+    key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.String(255))
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<SepaySyncState {self.key}={self.value}>'
@@ -0,0 +1,37 @@
+"""
+SePay webhook event model - journal of raw webhook deliveries
+"""
+from datetime import datetime
+from sqlalchemy import text
+from . import db
+
+# Events still to be processed: a short queue at the head of the journal
+UNPROCESSED_EVENT = "processed_at IS NULL"
+
+
+class SepayWebhookEvent(db.Model):
+    """Raw SePay webhook payload, acknowledged on arrival and processed in order by a worker"""
+    
+    __tablename__ = 'sepay_webhook_events'
+    
+    # Primary key (arrival order)
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    
+    # Request body exactly as received
+    payload = db.Column(db.Text, nullable=False)
+    
+    # Processing state
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    result = db.Column(db.String(255))  # Message from SepayService.process_payment_webhook
+    
+    # Timestamps
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('idx_sepay_webhook_events_unprocessed', 'id',
+                 postgresql_where=text(UNPROCESSED_EVENT), sqlite_where=text(UNPROCESSED_EVENT)),
+    )
+    
+    def __repr__(self):
+        return f'<SepayWebhookEvent {self.id}>'
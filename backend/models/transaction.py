@@ -3,8 +3,16 @@ Transaction model for payments and purchases
 """
 import uuid
 from datetime import datetime
+from sqlalchemy import text
 from . import db
 
+# Completed balance purchases: at most one per user and item (guards concurrent purchases)
+BALANCE_DOCUMENT_PURCHASE = "status = 'completed' AND payment_method = 'balance' AND transaction_type = 'document'"
+BALANCE_PACKAGE_PURCHASE = "status = 'completed' AND payment_method = 'balance' AND transaction_type = 'package'"
+
+# Open payment requests: a small, short-lived subset of transactions (expired ones are swept)
+PENDING_PAYMENT = "payment_status = 'pending'"
+
 
 class Transaction(db.Model):
     """Transaction model for tracking purchases and payments"""
@@ -36,6 +44,7 @@ class Transaction(db.Model):
     
     # SePay specific fields
     payment_status = db.Column(db.String(50), default='pending')  # pending, completed, failed, cancelled
+    payment_code = db.Column(db.String(20))  # Order code in the transfer content (DH<code>), matched by webhooks
     sepay_transaction_id = db.Column(db.String(255))  # Transaction ID from SePay
     sepay_data = db.Column(db.JSON)  # Raw webhook data from SePay
     qr_code_url = db.Column(db.Text)  # QR code data URL (base64)
@@ -45,6 +54,25 @@ class Transaction(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # Indexes for entitlement lookups (EntitlementService) and keyset pagination,
+    # the partial unique indexes that make balance purchases idempotent, and
+    # the webhook lookups (order code, idempotency on the SePay ID), and
+    # partial indexes over pending payments for reuse and the expiry sweep
+    __table_args__ = (
+        db.Index('idx_transactions_user_type_status', 'user_id', 'transaction_type', 'status'),
+        db.Index('idx_transactions_user_created_at_id', 'user_id', 'created_at', 'id'),
+        db.Index('uq_transactions_payment_code', 'payment_code', unique=True),
+        db.Index('uq_transactions_sepay_transaction_id', 'sepay_transaction_id', unique=True),
+        db.Index('uq_transactions_balance_document', 'user_id', 'document_id', unique=True,
+                 postgresql_where=text(BALANCE_DOCUMENT_PURCHASE), sqlite_where=text(BALANCE_DOCUMENT_PURCHASE)),
+        db.Index('uq_transactions_balance_package', 'user_id', 'package_id', unique=True,
+                 postgresql_where=text(BALANCE_PACKAGE_PURCHASE), sqlite_where=text(BALANCE_PACKAGE_PURCHASE)),
+        db.Index('idx_transactions_pending_user_item', 'user_id', 'transaction_type', 'document_id', 'package_id',
+                 postgresql_where=text(PENDING_PAYMENT), sqlite_where=text(PENDING_PAYMENT)),
+        db.Index('idx_transactions_pending_expires_at', 'expires_at',
+                 postgresql_where=text(PENDING_PAYMENT), sqlite_where=text(PENDING_PAYMENT)),
+    )
+    
     # Relationships
     user = db.relationship('User', back_populates='transactions')
     document = db.relationship('Document', back_populates='transactions')
@@ -62,6 +90,7 @@ class Transaction(db.Model):
             'status': self.status,
             'payment_method': self.payment_method,
             'payment_status': self.payment_status,
+            'payment_code': self.payment_code,
             'qr_code_url': self.qr_code_url,
             'expires_at': self.expires_at.isoformat() if self.expires_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
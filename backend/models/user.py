@@ -36,6 +36,11 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # Seek index for keyset pagination (PaginationService)
+    __table_args__ = (
+        db.Index('idx_users_created_at_id', 'created_at', 'id'),
+    )
+    
     # Relationships
     saved_documents = db.relationship('SavedDocument', back_populates='user', cascade='all, delete-orphan')
     transactions = db.relationship('Transaction', back_populates='user', cascade='all, delete-orphan')
@@ -0,0 +1,36 @@
+"""
+User Document Entitlement model - materialized "user owns document" facts
+"""
+from datetime import datetime
+from . import db
+
+
+class UserDocumentEntitlement(db.Model):
+    """One row per (user, document) the user may download, from a direct or package purchase"""
+    
+    __tablename__ = 'user_document_entitlements'
+    
+    # Composite primary key
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    document_id = db.Column(db.String(36), db.ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True)
+    
+    # Purchase that granted the entitlement
+    transaction_id = db.Column(db.String(36), db.ForeignKey('transactions.id', ondelete='CASCADE'), nullable=False, index=True)
+    
+    # Timestamp
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    document = db.relationship('Document')
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'user_id': self.user_id,
+            'document_id': self.document_id,
+            'transaction_id': self.transaction_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self):
+        return f'<UserDocumentEntitlement user={self.user_id} document={self.document_id}>'
@@ -0,0 +1,55 @@
+"""
+Database migration: Add indexes for per-category document lookups
+
+CategoryService counts active documents per category with one grouped
+COUNT, and document listings filter on category_id.
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from sqlalchemy import text
+
+INDEXES = [
+    ('idx_documents_category_id_is_active', 'documents(category_id, is_active)'),
+]
+
+
+def upgrade():
+    """Add category indexes"""
+    print("Adding category indexes...")
+    
+    with db.engine.connect() as conn:
+        for name, target in INDEXES:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {target}"))
+        
+        conn.commit()
+    
+    print("✅ Category indexes added successfully!")
+
+
+def downgrade():
+    """Remove category indexes"""
+    print("Removing category indexes...")
+    
+    with db.engine.connect() as conn:
+        for name, _ in INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        
+        conn.commit()
+    
+    print("✅ Category indexes removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running category index migration...")
+        upgrade()
+        print("Migration completed!")
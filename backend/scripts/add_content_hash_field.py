@@ -0,0 +1,79 @@
+"""
+Database migration: Add content_hash to document_files and backfill it
+
+Existing files stay where they are; hashing them lets new uploads of the same
+bytes reuse their previews.
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, DocumentFile
+from sqlalchemy import text
+
+
+def upgrade():
+    """Add content_hash column and index to document_files table"""
+    print("Adding content_hash to document_files table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("""
+            ALTER TABLE document_files 
+            ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)
+        """))
+        
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_document_files_content_hash 
+            ON document_files(content_hash)
+        """))
+        
+        conn.commit()
+    
+    print("✅ content_hash added successfully!")
+
+
+def backfill():
+    """Hash existing files that are still on disk"""
+    from services import StorageService
+    from services.office_converter import file_sha256
+    
+    print("Hashing existing document files...")
+    
+    hashed = missing = 0
+    for doc_file in DocumentFile.query.filter(DocumentFile.content_hash.is_(None)).all():
+        path = StorageService.local_path(doc_file.file_url)
+        if not path or not os.path.isfile(path):
+            missing += 1
+            continue
+        doc_file.content_hash = file_sha256(path)
+        hashed += 1
+    
+    db.session.commit()
+    print(f"✅ Hashed {hashed} file(s), {missing} missing on disk")
+
+
+def downgrade():
+    """Remove content_hash from document_files table"""
+    print("Removing content_hash from document_files table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_document_files_content_hash"))
+        conn.execute(text("ALTER TABLE document_files DROP COLUMN IF EXISTS content_hash"))
+        
+        conn.commit()
+    
+    print("✅ content_hash removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running content hash migration...")
+        upgrade()
+        backfill()
+        print("Migration completed!")
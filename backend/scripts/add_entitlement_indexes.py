@@ -0,0 +1,57 @@
+"""
+Database migration: Add indexes backing the single-query entitlement check
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from sqlalchemy import text
+
+
+def upgrade():
+    """Add entitlement lookup indexes"""
+    print("Adding entitlement indexes...")
+    
+    with db.engine.connect() as conn:
+        # Completed purchases of a user by type
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_user_type_status 
+            ON transactions(user_id, transaction_type, status)
+        """))
+        
+        # Packages containing a document (the primary key leads with package_id)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_package_documents_document_id 
+            ON package_documents(document_id)
+        """))
+        
+        conn.commit()
+    
+    print("✅ Entitlement indexes added successfully!")
+
+
+def downgrade():
+    """Remove entitlement lookup indexes"""
+    print("Removing entitlement indexes...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS idx_transactions_user_type_status"))
+        conn.execute(text("DROP INDEX IF EXISTS idx_package_documents_document_id"))
+        
+        conn.commit()
+    
+    print("✅ Entitlement indexes removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running entitlement index migration...")
+        upgrade()
+        print("Migration completed!")
@@ -0,0 +1,56 @@
+"""
+Database migration: Add (created_at, id) seek indexes for keyset pagination
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from sqlalchemy import text
+
+INDEXES = [
+    ('idx_documents_created_at_id', 'documents(created_at, id)'),
+    ('idx_news_created_at_id', 'news(created_at, id)'),
+    ('idx_users_created_at_id', 'users(created_at, id)'),
+    ('idx_transactions_user_created_at_id', 'transactions(user_id, created_at, id)'),
+    ('idx_saved_documents_user_created_at_id', 'saved_documents(user_id, created_at, id)'),
+]
+
+
+def upgrade():
+    """Add keyset pagination indexes"""
+    print("Adding pagination indexes...")
+    
+    with db.engine.connect() as conn:
+        for name, target in INDEXES:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {target}"))
+        
+        conn.commit()
+    
+    print("✅ Pagination indexes added successfully!")
+
+
+def downgrade():
+    """Remove keyset pagination indexes"""
+    print("Removing pagination indexes...")
+    
+    with db.engine.connect() as conn:
+        for name, _ in INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        
+        conn.commit()
+    
+    print("✅ Pagination indexes removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running pagination index migration...")
+        upgrade()
+        print("Migration completed!")
@@ -0,0 +1,132 @@
+"""
+Database migration: Add payment_code to transactions, backfill it and index webhook lookups
+
+Webhooks used to find the order with a leading-wildcard ILIKE on transactions.id.
+payment_code holds the order code from the transfer content (DH<code>) under a
+unique index, and sepay_transaction_id gets a unique index for the idempotency check.
+
+Existing SePay transactions keep their old code (last 8 characters of the ID).
+When two of them share a code, only the newest one gets it; the bank content
+cannot tell them apart anyway.
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Transaction
+from sqlalchemy import text
+
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    """Add payment_code column to transactions table"""
+    print("Adding payment_code to transactions table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("""
+            ALTER TABLE transactions
+            ADD COLUMN IF NOT EXISTS payment_code VARCHAR(20)
+        """))
+        
+        conn.commit()
+    
+    print("✅ payment_code added successfully!")
+
+
+def backfill():
+    """Give existing SePay transactions their legacy order code"""
+    from services.sepay_service import SepayService
+    
+    print("Backfilling payment codes...")
+    
+    used = set(db.session.execute(text(
+        "SELECT payment_code FROM transactions WHERE payment_code IS NOT NULL"
+    )).scalars())
+    
+    rows = db.session.query(Transaction.id).filter(
+        Transaction.payment_method == 'sepay',
+        Transaction.payment_code.is_(None)
+    ).order_by(Transaction.created_at.desc()).all()
+    
+    updates = []
+    skipped = 0
+    for (transaction_id,) in rows:
+        code = SepayService.legacy_payment_code(transaction_id)
+        if code in used:
+            skipped += 1
+            continue
+        used.add(code)
+        updates.append({'id': transaction_id, 'code': code})
+    
+    statement = text("UPDATE transactions SET payment_code = :code WHERE id = :id")
+    for start in range(0, len(updates), BATCH_SIZE):
+        db.session.execute(statement, updates[start:start + BATCH_SIZE])
+        db.session.commit()
+    
+    print(f"✅ Backfilled {len(updates)} transaction(s), {skipped} older duplicate code(s) left empty")
+
+
+def create_indexes():
+    """Unique indexes for webhook matching and idempotency"""
+    print("Creating webhook lookup indexes...")
+    
+    with db.engine.connect() as conn:
+        duplicates = conn.execute(text("""
+            SELECT sepay_transaction_id, COUNT(*)
+            FROM transactions
+            WHERE sepay_transaction_id IS NOT NULL
+            GROUP BY sepay_transaction_id
+            HAVING COUNT(*) > 1
+        """)).fetchall()
+        if duplicates:
+            print(f"❌ Found {len(duplicates)} SePay transaction ID(s) recorded more than once:")
+            for sepay_id, count in duplicates:
+                print(f"   {sepay_id}: {count} transactions")
+            print("   Resolve them (clear sepay_transaction_id on the wrong rows) and run again.")
+            return False
+        
+        conn.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_transactions_payment_code
+            ON transactions(payment_code)
+        """))
+        
+        conn.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_transactions_sepay_transaction_id
+            ON transactions(sepay_transaction_id)
+        """))
+        
+        conn.commit()
+    
+    print("✅ Webhook lookup indexes created successfully!")
+    return True
+
+
+def downgrade():
+    """Remove payment_code and the webhook lookup indexes"""
+    print("Removing payment_code from transactions table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS uq_transactions_sepay_transaction_id"))
+        conn.execute(text("DROP INDEX IF EXISTS uq_transactions_payment_code"))
+        conn.execute(text("ALTER TABLE transactions DROP COLUMN IF EXISTS payment_code"))
+        
+        conn.commit()
+    
+    print("✅ payment_code removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running payment code migration...")
+        upgrade()
+        backfill()
+        if not create_indexes():
+            sys.exit(1)
+        print("Migration completed!")
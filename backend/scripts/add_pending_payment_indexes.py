@@ -0,0 +1,63 @@
+"""
+Database migration: Add partial indexes over pending payment requests
+
+create_sepay_payment looks up a reusable pending request by user and item,
+and the expiry sweep looks up pending requests by expires_at. Both only
+touch rows with payment_status = 'pending', a small subset once expired
+requests are swept, so the indexes are partial.
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from models.transaction import PENDING_PAYMENT
+from sqlalchemy import text
+
+INDEXES = (
+    ('idx_transactions_pending_user_item', 'user_id, transaction_type, document_id, package_id'),
+    ('idx_transactions_pending_expires_at', 'expires_at'),
+)
+
+
+def upgrade():
+    """Add pending payment indexes"""
+    print("Adding pending payment indexes...")
+    
+    with db.engine.connect() as conn:
+        for name, columns in INDEXES:
+            conn.execute(text(f"""
+                CREATE INDEX IF NOT EXISTS {name} 
+                ON transactions({columns}) 
+                WHERE {PENDING_PAYMENT}
+            """))
+        
+        conn.commit()
+    
+    print("✅ Pending payment indexes created successfully!")
+
+
+def downgrade():
+    """Remove pending payment indexes"""
+    print("Removing pending payment indexes...")
+    
+    with db.engine.connect() as conn:
+        for name, _ in INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        
+        conn.commit()
+    
+    print("✅ Pending payment indexes removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running pending payment index migration...")
+        upgrade()
+        print("Migration completed!")
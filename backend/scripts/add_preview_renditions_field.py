@@ -0,0 +1,50 @@
+"""
+Database migration: Add preview_renditions column to document_files table
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from sqlalchemy import text
+
+
+def upgrade():
+    """Add preview_renditions column to document_files table"""
+    print("Adding preview_renditions to document_files table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("""
+            ALTER TABLE document_files 
+            ADD COLUMN IF NOT EXISTS preview_renditions JSON
+        """))
+        
+        conn.commit()
+    
+    print("✅ preview_renditions added successfully!")
+    print("ℹ️ Run scripts/requeue_previews.py after marking old previews as 'pending' to generate renditions for them.")
+
+
+def downgrade():
+    """Remove preview_renditions column from document_files table"""
+    print("Removing preview_renditions from document_files table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("ALTER TABLE document_files DROP COLUMN IF EXISTS preview_renditions"))
+        
+        conn.commit()
+    
+    print("✅ preview_renditions removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running preview renditions migration...")
+        upgrade()
+        print("Migration completed!")
@@ -0,0 +1,68 @@
+"""
+Database migration: Add background preview job fields to document_files table
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from sqlalchemy import text
+
+
+def upgrade():
+    """Add preview job fields to document_files table"""
+    print("Adding preview job fields to document_files table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("""
+            ALTER TABLE document_files 
+            ADD COLUMN IF NOT EXISTS preview_status VARCHAR(20)
+        """))
+        
+        conn.execute(text("""
+            ALTER TABLE document_files 
+            ADD COLUMN IF NOT EXISTS preview_attempts INTEGER NOT NULL DEFAULT 0
+        """))
+        
+        conn.execute(text("""
+            ALTER TABLE document_files 
+            ADD COLUMN IF NOT EXISTS preview_error TEXT
+        """))
+        
+        # Previews generated inline before this migration are done
+        conn.execute(text("""
+            UPDATE document_files 
+            SET preview_status = 'ready' 
+            WHERE preview_url IS NOT NULL AND preview_status IS NULL
+        """))
+        
+        conn.commit()
+    
+    print("✅ Preview job fields added successfully!")
+
+
+def downgrade():
+    """Remove preview job fields from document_files table"""
+    print("Removing preview job fields from document_files table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("ALTER TABLE document_files DROP COLUMN IF EXISTS preview_status"))
+        conn.execute(text("ALTER TABLE document_files DROP COLUMN IF EXISTS preview_attempts"))
+        conn.execute(text("ALTER TABLE document_files DROP COLUMN IF EXISTS preview_error"))
+        
+        conn.commit()
+    
+    print("✅ Preview job fields removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running preview job migration...")
+        upgrade()
+        print("Migration completed!")
@@ -0,0 +1,87 @@
+"""
+Database migration: Add partial unique indexes for completed balance purchases
+
+TransactionService debits the balance with a conditional UPDATE; these
+indexes make a second completed balance purchase of the same document or
+package fail, so concurrent requests cannot buy (and pay for) an item twice.
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from models.transaction import BALANCE_DOCUMENT_PURCHASE, BALANCE_PACKAGE_PURCHASE
+from sqlalchemy import text
+
+INDEXES = (
+    ('uq_transactions_balance_document', 'document_id', BALANCE_DOCUMENT_PURCHASE),
+    ('uq_transactions_balance_package', 'package_id', BALANCE_PACKAGE_PURCHASE),
+)
+
+
+def find_duplicates(conn):
+    """Existing duplicate purchases that would block the indexes"""
+    duplicates = []
+    for _, column, condition in INDEXES:
+        rows = conn.execute(text(f"""
+            SELECT user_id, {column}, COUNT(*) 
+            FROM transactions 
+            WHERE {condition} 
+            GROUP BY user_id, {column} 
+            HAVING COUNT(*) > 1
+        """)).fetchall()
+        duplicates.extend((column, row[0], row[1], row[2]) for row in rows)
+    return duplicates
+
+
+def upgrade():
+    """Add purchase uniqueness indexes"""
+    print("Adding purchase uniqueness indexes...")
+    
+    with db.engine.connect() as conn:
+        duplicates = find_duplicates(conn)
+        if duplicates:
+            print(f"❌ Found {len(duplicates)} duplicate completed balance purchase(s):")
+            for column, user_id, item_id, count in duplicates:
+                print(f"   user {user_id} {column}={item_id}: {count} purchases")
+            print("   Refund or mark the extra transactions (status != 'completed') and run again.")
+            return False
+        
+        for name, column, condition in INDEXES:
+            conn.execute(text(f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS {name} 
+                ON transactions(user_id, {column}) 
+                WHERE {condition}
+            """))
+        
+        conn.commit()
+    
+    print("✅ Purchase uniqueness indexes added successfully!")
+    return True
+
+
+def downgrade():
+    """Remove purchase uniqueness indexes"""
+    print("Removing purchase uniqueness indexes...")
+    
+    with db.engine.connect() as conn:
+        for name, _, _ in INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        
+        conn.commit()
+    
+    print("✅ Purchase uniqueness indexes removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running purchase uniqueness migration...")
+        if not upgrade():
+            sys.exit(1)
+        print("Migration completed!")
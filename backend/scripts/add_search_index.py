@@ -0,0 +1,76 @@
+"""
+Database migration: Add full-text search index to documents table
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from sqlalchemy import text
+
+
+def upgrade():
+    """Add search_text column, full-text index and backfill existing documents"""
+    print("Adding full-text search index to documents table...")
+
+    dialect = db.engine.dialect.name
+
+    with db.engine.connect() as conn:
+        if dialect == 'postgresql':
+            conn.execute(text("""
+                ALTER TABLE documents
+                ADD COLUMN IF NOT EXISTS search_text TEXT
+            """))
+
+            # GIN index over the tsvector expression used by SearchService
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_documents_search_text_fts
+                ON documents USING GIN (to_tsvector('simple', coalesce(search_text, '')))
+            """))
+        elif dialect == 'sqlite':
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(documents)"))]
+            if 'search_text' not in columns:
+                conn.execute(text("ALTER TABLE documents ADD COLUMN search_text TEXT"))
+
+            conn.execute(text("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                    document_id UNINDEXED, search_text, tokenize='unicode61 remove_diacritics 2'
+                )
+            """))
+
+        conn.commit()
+
+    print("Backfilling search text...")
+    from services.search_service import SearchService
+    count = SearchService.rebuild_index()
+
+    print(f"✅ Search index built for {count} documents!")
+
+
+def downgrade():
+    """Remove full-text search index from documents table"""
+    print("Removing full-text search index from documents table...")
+
+    with db.engine.connect() as conn:
+        if db.engine.dialect.name == 'sqlite':
+            conn.execute(text("DROP TABLE IF EXISTS documents_fts"))
+        else:
+            conn.execute(text("DROP INDEX IF EXISTS idx_documents_search_text_fts"))
+        conn.execute(text("ALTER TABLE documents DROP COLUMN search_text"))
+
+        conn.commit()
+
+    print("✅ Search index removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    with app.app_context():
+        print("Running search index migration...")
+        upgrade()
+        print("Migration completed!")
@@ -0,0 +1,55 @@
+"""
+Database migration: Add sepay_sync_state table
+
+Holds the since-id cursor of the background SePay reconciler
+(services/sepay_reconciler.py).
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from sqlalchemy import text
+
+
+def upgrade():
+    """Create sepay_sync_state table"""
+    print("Creating sepay_sync_state table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS sepay_sync_state (
+                key VARCHAR(50) PRIMARY KEY,
+                value VARCHAR(255),
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        
+        conn.commit()
+    
+    print("✅ sepay_sync_state created successfully!")
+
+
+def downgrade():
+    """Drop sepay_sync_state table"""
+    print("Dropping sepay_sync_state table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS sepay_sync_state"))
+        
+        conn.commit()
+    
+    print("✅ sepay_sync_state dropped successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running SePay sync state migration...")
+        upgrade()
+        print("Migration completed!")
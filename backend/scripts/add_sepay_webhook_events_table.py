@@ -0,0 +1,67 @@
+"""
+Database migration: Add sepay_webhook_events table
+
+Journal of raw SePay webhook deliveries for SEPAY_WEBHOOK_MODE=journal
+(services/sepay_webhook_journal.py).
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from models.sepay_webhook_event import UNPROCESSED_EVENT
+from sqlalchemy import text
+
+
+def upgrade():
+    """Create sepay_webhook_events table"""
+    print("Creating sepay_webhook_events table...")
+    
+    id_column = 'BIGSERIAL PRIMARY KEY' if db.engine.dialect.name == 'postgresql' else 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    
+    with db.engine.connect() as conn:
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS sepay_webhook_events (
+                id {id_column},
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result VARCHAR(255),
+                received_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                processed_at TIMESTAMP
+            )
+        """))
+        
+        conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS idx_sepay_webhook_events_unprocessed 
+            ON sepay_webhook_events(id) 
+            WHERE {UNPROCESSED_EVENT}
+        """))
+        
+        conn.commit()
+    
+    print("✅ sepay_webhook_events created successfully!")
+
+
+def downgrade():
+    """Drop sepay_webhook_events table"""
+    print("Dropping sepay_webhook_events table...")
+    
+    with db.engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS sepay_webhook_events"))
+        
+        conn.commit()
+    
+    print("✅ sepay_webhook_events dropped successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running SePay webhook journal migration...")
+        upgrade()
+        print("Migration completed!")
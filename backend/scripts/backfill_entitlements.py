@@ -0,0 +1,43 @@
+"""
+Database migration: Create user_document_entitlements and backfill it from transactions
+
+Safe to re-run: the table is rebuilt from completed purchases every time.
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, UserDocumentEntitlement
+
+
+def upgrade():
+    """Create the entitlements table and fill it from completed purchases"""
+    print("Creating user_document_entitlements table...")
+    UserDocumentEntitlement.__table__.create(db.engine, checkfirst=True)
+    
+    print("Backfilling entitlements from transactions...")
+    from services.entitlement_service import EntitlementService
+    count = EntitlementService.rebuild()
+    db.session.commit()
+    
+    print(f"✅ {count} entitlements written!")
+
+
+def downgrade():
+    """Drop the entitlements table"""
+    print("Dropping user_document_entitlements table...")
+    UserDocumentEntitlement.__table__.drop(db.engine, checkfirst=True)
+    print("✅ Entitlements table removed successfully!")
+
+
+if __name__ == '__main__':
+    from main import create_app
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    with app.app_context():
+        print("Running entitlement backfill...")
+        upgrade()
+        print("Migration completed!")
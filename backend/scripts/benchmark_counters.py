@@ -0,0 +1,98 @@
+"""
+Benchmark: document detail throughput with write-through vs. write-behind view counters
+
+Runs concurrent GET /api/documents/<slug> requests against one popular
+document, first with COUNTER_FLUSH_INTERVAL=0 (a commit per view, like the
+old increment_view) and then with buffered counters flushed in bulk.
+
+Usage:
+    python scripts/benchmark_counters.py [threads] [requests_per_thread]
+
+Set BENCH_DATABASE_URL to benchmark against PostgreSQL instead of SQLite.
+"""
+import os
+import sys
+import time
+import threading
+
+# Benchmark database must be configured before the app config is imported
+os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL', 'sqlite:///bench_counters.sqlite')
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app
+from models import db, Document, Category
+from services import CounterService
+
+
+def ensure_document():
+    """Create the hot document once and return its slug"""
+    document = Document.query.filter_by(code='BENCH-HOT').first()
+    if document:
+        return document.slug
+
+    category = Category(name='Benchmark counters', slug='benchmark-counters')
+    db.session.add(category)
+    db.session.flush()
+    document = Document(
+        code='BENCH-HOT',
+        title='Hợp đồng thuê nhà (benchmark)',
+        slug='bench-hot-document',
+        category_id=category.id,
+        price=0
+    )
+    db.session.add(document)
+    db.session.commit()
+    return document.slug
+
+
+def run(app, slug, threads, per_thread):
+    """Fire concurrent detail requests and return (requests/second, errors)"""
+    errors = []
+
+    def worker():
+        client = app.test_client()
+        for _ in range(per_thread):
+            response = client.get(f'/api/documents/{slug}')
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return threads * per_thread / elapsed, len(errors)
+
+
+def views(slug):
+    db.session.expire_all()
+    return Document.query.filter_by(slug=slug).first().views_count
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    total = threads * per_thread
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        slug = ensure_document()
+
+        print(f"📊 {threads} threads x {per_thread} requests ({db.engine.dialect.name})\n")
+
+        for label, interval in (('write-through (before)', 0), ('write-behind (after)', 5)):
+            app.config['COUNTER_FLUSH_INTERVAL'] = interval
+            before = views(slug)
+            rps, errors = run(app, slug, threads, per_thread)
+            CounterService.flush()
+            counted = views(slug) - before
+            print(f"{label:<24}{rps:>10.0f} req/s   errors={errors}   views counted={counted}/{total}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: legacy four-column ILIKE scan vs. full-text search index
+
+Seeds a throwaway catalogue (100k documents by default) and times both
+search paths of DocumentService.list_documents.
+
+Usage:
+    python scripts/benchmark_search.py [num_documents]
+
+Set BENCH_DATABASE_URL to benchmark against PostgreSQL instead of SQLite.
+"""
+import os
+import sys
+import time
+import random
+import uuid
+from datetime import datetime
+
+# Benchmark database must be configured before the app config is imported
+os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL', 'sqlite:///bench_search.sqlite')
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import or_
+from main import create_app
+from models import db, Document, Category
+from models.document import fold_search_text
+from services import DocumentService, SearchService
+
+WORDS = [
+    'Hợp đồng', 'thuê nhà', 'mua bán', 'lao động', 'Đơn xin', 'việc', 'nghỉ phép',
+    'Biên bản', 'bàn giao', 'tài sản', 'Giấy ủy quyền', 'Quyết định', 'bổ nhiệm',
+    'Tờ khai', 'thuế', 'đăng ký', 'kinh doanh', 'doanh nghiệp', 'Công văn', 'đề nghị'
+]
+
+QUERIES = ['hop dong', 'Hợp đồng thuê nhà', 'don xin nghi phep', 'uy quyen', 'to khai thue']
+
+
+def seed(count, batch_size=5000):
+    """Insert `count` synthetic documents with bulk inserts"""
+    category = Category(name='Benchmark', slug=f'benchmark-{uuid.uuid4().hex[:8]}')
+    db.session.add(category)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    for start in range(0, count, batch_size):
+        rows = []
+        for i in range(start, min(start + batch_size, count)):
+            title = ' '.join(rng.sample(WORDS, 4))
+            description = ' '.join(rng.sample(WORDS, 8))
+            content = ' '.join(rng.choice(WORDS) for _ in range(120))
+            code = f'BM-{i:06d}'
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'code': code,
+                'title': title,
+                'slug': f'{code.lower()}-{uuid.uuid4().hex[:6]}',
+                'description': description,
+                'content': content,
+                'search_text': fold_search_text(' '.join([title, code, description, content])),
+                'category_id': category.id,
+                'price': 0,
+                'views_count': 0,
+                'downloads_count': 0,
+                'is_featured': False,
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now
+            })
+        db.session.execute(Document.__table__.insert(), rows)
+        db.session.commit()
+        print(f"   seeded {min(start + batch_size, count)}/{count}")
+
+    SearchService.sync_fts_table()
+
+
+def legacy_search(search_query, page=1, per_page=20):
+    """The previous implementation: OR-ed ILIKE over four columns"""
+    pattern = f'%{search_query.strip()}%'
+    query = Document.query.filter_by(is_active=True).filter(
+        or_(
+            Document.title.ilike(pattern),
+            Document.description.ilike(pattern),
+            Document.code.ilike(pattern),
+            Document.content.ilike(pattern)
+        )
+    ).order_by(Document.created_at.desc())
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    return [doc.id for doc in pagination.items], pagination.total
+
+
+def timed(fn, repeat=5):
+    """Return the median wall time of `repeat` calls in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+
+        existing = Document.query.count()
+        if existing < count:
+            print(f"🌱 Seeding {count - existing} documents...")
+            seed(count - existing)
+
+        print(f"\n📊 {Document.query.count()} documents ({db.engine.dialect.name})\n")
+        print(f"{'query':<22}{'ILIKE ms':>12}{'FTS ms':>12}{'speedup':>10}{'hits':>10}")
+
+        for search_query in QUERIES:
+            legacy_ms = timed(lambda: legacy_search(search_query))
+            fts_ms = timed(lambda: DocumentService.list_documents(search_query=search_query))
+            hits = DocumentService.list_documents(search_query=search_query)['total']
+            print(f"{search_query:<22}{legacy_ms:>12.1f}{fts_ms:>12.1f}{legacy_ms / fts_ms:>9.1f}x{hits:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: PDF preview rendering with the old per-call watermark vs. the cached one
+
+Generates a batch of one-page PDFs, then renders previews for all of them
+twice, each run in a fresh process so peak RSS is comparable:
+  - before: open + convert + LANCZOS-resize watermark.png for every preview and
+            alpha-composite a full-page transparent layer
+  - after:  cached pre-scaled watermark pasted with its alpha mask
+
+Usage:
+    python scripts/benchmark_watermark.py [count]
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import resource
+import tempfile
+import multiprocessing
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from services.preview_service import apply_watermark, WATERMARK_PATH
+
+
+def legacy_render(file_path, previews_folder):
+    """Preview rendering as it was before the watermark cache"""
+    import fitz
+
+    doc = fitz.open(file_path)
+    page = doc.load_page(0)
+    pix = page.get_pixmap(alpha=False)
+    image = Image.open(io.BytesIO(pix.tobytes("ppm")))
+    doc.close()
+
+    watermark = Image.open(WATERMARK_PATH).convert("RGBA")
+    target_width = int(image.width * 0.5)
+    ratio = target_width / float(watermark.width)
+    target_height = int(watermark.height * ratio)
+    watermark = watermark.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+    x = int((image.width - target_width) / 2)
+    y = int((image.height - target_height) / 2)
+    transparent = Image.new('RGBA', image.size, (0, 0, 0, 0))
+    transparent.paste(watermark, (x, y))
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    final_image = Image.alpha_composite(image, transparent).convert('RGB')
+
+    preview_filename = f"{os.path.splitext(os.path.basename(file_path))[0]}_preview.jpg"
+    final_image.save(os.path.join(previews_folder, preview_filename), 'JPEG', quality=90)
+
+
+def cached_render(file_path, previews_folder):
+    """Same single full-size JPEG, watermarked through the cached path"""
+    import fitz
+
+    doc = fitz.open(file_path)
+    page = doc.load_page(0)
+    pix = page.get_pixmap(alpha=False)
+    image = Image.open(io.BytesIO(pix.tobytes("ppm")))
+    doc.close()
+
+    final_image = apply_watermark(image)
+
+    preview_filename = f"{os.path.splitext(os.path.basename(file_path))[0]}_preview.jpg"
+    final_image.save(os.path.join(previews_folder, preview_filename), 'JPEG', quality=90)
+
+
+def make_pdfs(folder, count):
+    """Write count one-page A4 PDFs with some text"""
+    import fitz
+
+    paths = []
+    for i in range(count):
+        doc = fitz.open()
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((72, 72), f"HỢP ĐỒNG MẪU SỐ {i}", fontsize=18)
+        for line in range(40):
+            page.insert_text((72, 110 + line * 17), f"Điều {line + 1}. Nội dung điều khoản mẫu của văn bản {i}.")
+        path = os.path.join(folder, f"bench_{i:04d}.pdf")
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+def run(label, paths, previews_folder, queue):
+    render = legacy_render if label == 'before' else cached_render
+    start = time.perf_counter()
+    for path in paths:
+        render(path, previews_folder)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    if not os.path.exists(WATERMARK_PATH):
+        print(f"❌ Watermark not found: {WATERMARK_PATH}")
+        sys.exit(1)
+
+    workdir = tempfile.mkdtemp(prefix='bench_watermark_')
+    try:
+        previews_folder = os.path.join(workdir, 'previews')
+        os.makedirs(previews_folder)
+        paths = make_pdfs(workdir, count)
+        print(f"📊 Rendering previews for {count} PDFs\n")
+
+        ctx = multiprocessing.get_context('spawn')
+        for label in ('before', 'after'):
+            queue = ctx.Queue()
+            process = ctx.Process(target=run, args=(label, paths, previews_folder, queue))
+            process.start()
+            elapsed, peak_mb = queue.get()
+            process.join()
+            print(f"{label:<8}{elapsed:>8.2f}s   {count / elapsed:>7.1f} previews/s   peak RSS {peak_mb:>7.1f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
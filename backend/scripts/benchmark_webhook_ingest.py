@@ -0,0 +1,112 @@
+"""
+Benchmark: SePay webhook acknowledgment, inline processing vs. journal
+
+Creates pending payment requests, then posts one webhook per request to
+/api/sepay/webhook through the Flask test client, first with
+SEPAY_WEBHOOK_MODE=inline and then with journal. Prints the time the app
+spends per request (what SePay waits for) and, for the journal, how long
+the worker takes until every payment is completed.
+
+Usage:
+    python scripts/benchmark_webhook_ingest.py [webhooks]
+
+Set BENCH_DATABASE_URL to benchmark against PostgreSQL instead of SQLite.
+"""
+import os
+import sys
+import json
+import time
+import statistics
+
+# Benchmark database and webhook key must be configured before the app config is imported
+os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL', 'sqlite:///bench_webhook_ingest.sqlite')
+os.environ['SEPAY_SECRET_KEY'] = 'bench-webhook-ingest'
+os.environ['SEPAY_RECONCILE_INTERVAL'] = '0'
+os.environ['SEPAY_EXPIRY_SWEEP_INTERVAL'] = '0'
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app
+from models import db, User, Transaction, SepayWebhookEvent
+from services.sepay_service import SepayService
+from services.sepay_webhook_journal import SepayWebhookJournal
+
+HEADERS = {'Authorization': 'Apikey bench-webhook-ingest', 'Content-Type': 'application/json'}
+
+
+def create_payments(user, count, first_sepay_id):
+    """Pending top-ups and the webhook body that pays each of them"""
+    transactions = [
+        Transaction(user_id=user.id, transaction_type='topup', amount=10000, status='pending',
+                    payment_method='sepay', payment_status='pending',
+                    payment_code=SepayService.new_payment_code())
+        for _ in range(count)
+    ]
+    db.session.add_all(transactions)
+    db.session.commit()
+    return [t.id for t in transactions], [
+        json.dumps({
+            'id': first_sepay_id + i, 'gateway': 'ACB', 'transferType': 'in', 'transferAmount': 10000,
+            'content': f'LOCSPAY000324416 DH{t.payment_code}', 'accountNumber': '9924666'
+        })
+        for i, t in enumerate(transactions)
+    ]
+
+
+def post_all(client, bodies):
+    """Post every webhook; return per-request latencies in ms"""
+    latencies = []
+    for body in bodies:
+        start = time.perf_counter()
+        response = client.post('/api/sepay/webhook', data=body, headers=HEADERS)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return latencies
+
+
+def report(label, latencies):
+    p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<22}mean {statistics.mean(latencies):>7.3f} ms   p95 {p95:>7.3f} ms")
+
+
+def completed(ids):
+    db.session.expire_all()
+    return Transaction.query.filter(Transaction.id.in_(ids), Transaction.payment_status == 'completed').count()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        user = User.query.filter_by(email='bench-webhook-ingest@example.com').first()
+        if not user:
+            user = User(email='bench-webhook-ingest@example.com', full_name='Bench webhook ingest')
+            user.set_password('bench-webhook-ingest')
+            db.session.add(user)
+            db.session.commit()
+
+        client = app.test_client()
+        base_id = int(time.time()) * 10000
+        print(f"📊 {count} webhooks per mode ({db.engine.dialect.name})\n")
+
+        app.config['SEPAY_WEBHOOK_MODE'] = 'inline'
+        ids, bodies = create_payments(user, count, base_id)
+        report('inline (before)', post_all(client, bodies))
+        print(f"{'':<22}completed {completed(ids)}/{count}")
+
+        app.config['SEPAY_WEBHOOK_MODE'] = 'journal'
+        ids, bodies = create_payments(user, count, base_id + count)
+        start = time.perf_counter()
+        report('journal ack (after)', post_all(client, bodies))
+        while SepayWebhookEvent.query.filter(SepayWebhookEvent.processed_at.is_(None)).count():
+            db.session.commit()
+            time.sleep(0.05)
+        print(f"{'':<22}completed {completed(ids)}/{count}, drained {time.perf_counter() - start:.2f}s after the first webhook")
+        SepayWebhookJournal.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: webhook order matching, suffix ILIKE on transactions.id vs. indexed payment_code
+
+Seeds a transactions table (one million rows by default, reused on later
+runs) and times the two lookups a SePay webhook does:
+  - order match:  Transaction.id ILIKE '%SUFFIX'  vs.  payment_code = :code
+  - idempotency:  sepay_transaction_id = :id without and with its unique index
+
+Usage:
+    python scripts/benchmark_webhook_matching.py [rows] [lookups]
+
+Set BENCH_DATABASE_URL to benchmark against PostgreSQL instead of SQLite.
+"""
+import os
+import sys
+import time
+import uuid
+import random
+from datetime import datetime, timedelta
+
+# Benchmark database must be configured before the app config is imported
+os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL', 'sqlite:///bench_webhooks.sqlite')
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, func
+from main import create_app
+from models import db, User, Transaction
+from services.sepay_service import SepayService
+
+BATCH_SIZE = 20000
+
+
+def seed(rows):
+    """Insert transactions until the table holds `rows` of them"""
+    existing = db.session.query(func.count(Transaction.id)).scalar()
+    if existing >= rows:
+        return existing
+
+    user = User.query.filter_by(email='bench-webhooks@example.com').first()
+    if not user:
+        user = User(email='bench-webhooks@example.com', full_name='Bench webhooks')
+        user.set_password('bench-webhooks')
+        db.session.add(user)
+        db.session.commit()
+
+    codes = set(db.session.execute(text(
+        "SELECT payment_code FROM transactions WHERE payment_code IS NOT NULL"
+    )).scalars())
+    start = datetime.utcnow() - timedelta(days=365)
+    table = Transaction.__table__
+    print(f"Seeding {rows - existing} transactions...")
+
+    for offset in range(existing, rows, BATCH_SIZE):
+        batch = []
+        for i in range(offset, min(offset + BATCH_SIZE, rows)):
+            code = SepayService.new_payment_code()
+            while code in codes:
+                code = SepayService.new_payment_code()
+            codes.add(code)
+            completed = i % 3 != 0
+            created_at = start + timedelta(seconds=i * 30)
+            batch.append({
+                'id': str(uuid.uuid4()),
+                'user_id': user.id,
+                'transaction_type': 'topup' if i % 2 else 'document',
+                'amount': 50000,
+                'status': 'completed' if completed else 'pending',
+                'payment_method': 'sepay',
+                'payment_status': 'completed' if completed else 'pending',
+                'payment_code': code,
+                'sepay_transaction_id': str(10_000_000 + i) if completed else None,
+                'created_at': created_at,
+                'updated_at': created_at
+            })
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+    return rows
+
+
+def timed(label, lookups, fn):
+    """Run fn for every lookup value and print the mean latency"""
+    start = time.perf_counter()
+    found = sum(fn(value) is not None for value in lookups)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44}{elapsed / len(lookups) * 1000:>10.3f} ms/lookup   found {found}/{len(lookups)}")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        total = seed(rows)
+
+        sample = db.session.execute(text(
+            "SELECT id, payment_code, sepay_transaction_id FROM transactions "
+            "WHERE sepay_transaction_id IS NOT NULL"
+        ).execution_options(stream_results=True)).fetchmany(200_000)
+        sample = random.sample(sample, min(count, len(sample)))
+
+        print(f"📊 {total} transactions, {len(sample)} lookups each ({db.engine.dialect.name})\n")
+
+        timed("order match: id ILIKE '%SUFFIX' (before)", [row[0][-8:].upper() for row in sample],
+              lambda suffix: Transaction.query.filter(Transaction.id.ilike(f'%{suffix}')).first())
+        timed("order match: payment_code = :code (after)", [row[1] for row in sample],
+              lambda code: Transaction.query.filter_by(payment_code=code).first())
+
+        sepay_ids = [row[2] for row in sample]
+        lookup = lambda sepay_id: Transaction.query.filter_by(sepay_transaction_id=sepay_id).first()
+
+        db.session.commit()  # Release the read transaction before changing the schema
+        with db.engine.connect() as conn:
+            conn.execute(text("DROP INDEX IF EXISTS uq_transactions_sepay_transaction_id"))
+            conn.commit()
+        timed("idempotency: sepay_transaction_id, no index", sepay_ids, lookup)
+
+        db.session.commit()
+        with db.engine.connect() as conn:
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_transactions_sepay_transaction_id "
+                "ON transactions(sepay_transaction_id)"
+            ))
+            conn.commit()
+        timed("idempotency: sepay_transaction_id, unique", sepay_ids, lookup)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Check for the recursive-CTE category hierarchy helpers
+
+Seeds an in-memory SQLite database with a three-level category tree and
+checks descendant/ancestor sets, single-query cycle detection in
+update_category and the include_descendants document filter (active
+subcategories only).
+
+Usage:
+    python scripts/check_category_hierarchy.py
+"""
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from main import create_app
+from models import db, Category, Document
+from services import CategoryService, DocumentService
+
+
+def seed():
+    """root -> (a -> (a1, a2), b); one document per category"""
+    categories = {}
+    for name, parent in (('root', None), ('a', 'root'), ('b', 'root'), ('a1', 'a'), ('a2', 'a')):
+        category = Category(name=name, slug=name, parent_id=categories[parent].id if parent else None)
+        db.session.add(category)
+        db.session.flush()
+        categories[name] = category
+        db.session.add(Document(code=f'CH-{name}', title=f'Tài liệu {name}', slug=f'tai-lieu-{name}',
+                                category_id=category.id, price=0))
+    db.session.commit()
+    return {name: category.id for name, category in categories.items()}
+
+
+def count_queries(fn):
+    """Return (result, number of SQL statements executed by fn)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return result, len(statements)
+
+
+def main():
+    app = create_app('testing')
+    failures = []
+
+    def check(condition, label):
+        print(f"{'✅' if condition else '❌'} {label}")
+        if not condition:
+            failures.append(label)
+
+    with app.app_context():
+        db.create_all()
+        ids = seed()
+        names = {category_id: name for name, category_id in ids.items()}
+
+        descendants, queries = count_queries(lambda: CategoryService.get_descendant_ids(ids['root']))
+        check({names[i] for i in descendants} == {'root', 'a', 'b', 'a1', 'a2'} and queries == 1,
+              f'descendants of root in {queries} query')
+        check({names[i] for i in CategoryService.get_descendant_ids(ids['a'], include_self=False)} == {'a1', 'a2'},
+              'descendants of a without itself')
+        check({names[i] for i in CategoryService.get_ancestor_ids(ids['a2'])} == {'a', 'root'},
+              'ancestors of a2')
+
+        cycle, queries = count_queries(lambda: CategoryService.would_create_cycle(ids['a'], ids['a2']))
+        check(cycle and queries == 1, f'moving a under its grandchild a2 is a cycle ({queries} query)')
+        check(not CategoryService.would_create_cycle(ids['a'], ids['b']), 'moving a under b is fine')
+
+        _, error = CategoryService.update_category(ids['root'], parent_id=ids['a1'])
+        check(error == 'Cannot create circular reference', 'update_category rejects the cycle')
+        category, error = CategoryService.update_category(ids['a2'], parent_id=ids['b'])
+        check(error is None and category.parent_id == ids['b'], 'update_category moves a2 under b')
+
+        direct = DocumentService.list_documents(category_id=ids['a'])
+        subtree = DocumentService.list_documents(category_id=ids['a'], include_descendants=True)
+        check(direct['total'] == 1, 'category filter matches direct documents only')
+        check(subtree['total'] == 2, 'include_descendants adds documents of a1 (a2 moved away)')
+        keyset = DocumentService.list_documents(category_id=ids['root'], include_descendants=True,
+                                                cursor='', total='exact')
+        check(keyset['total'] == 5, 'include_descendants works with keyset pagination')
+
+        # Deactivated subcategory: hidden from the tree, so its documents drop out of the subtree too
+        CategoryService.update_category(ids['a1'], is_active=False)
+        subtree = DocumentService.list_documents(category_id=ids['a'], include_descendants=True)
+        check(subtree['total'] == 1, 'include_descendants skips documents under an inactive subcategory')
+        check(ids['a1'] in CategoryService.get_descendant_ids(ids['a']), 'get_descendant_ids still walks inactive categories')
+        CategoryService.update_category(ids['a1'], is_active=True)
+
+        client = app.test_client()
+        response = client.get('/api/categories/root/documents?include_descendants=true')
+        check(response.get_json()['data']['total'] == 5, 'GET /api/categories/<slug>/documents?include_descendants=true')
+
+    if failures:
+        print(f"\n❌ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\n✅ Category hierarchy checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Query-count check for document serialization endpoints
+
+Seeds an in-memory SQLite database, calls each endpoint with two page sizes
+and fails if the number of SQL statements depends on how many rows are
+serialized (i.e. an N+1 lazy load crept back into Document.to_dict paths).
+
+Usage:
+    python scripts/check_query_counts.py
+"""
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from main import create_app
+from models import db, Category, Document, DocumentFile, DocumentGuide
+
+
+def seed():
+    category = Category(name='Hợp đồng', slug='hop-dong')
+    db.session.add(category)
+    db.session.flush()
+
+    for i in range(30):
+        document = Document(
+            code=f'QC-{i:02d}',
+            title=f'Hợp đồng mẫu {i}',
+            slug=f'hop-dong-mau-{i}',
+            category_id=category.id,
+            price=0
+        )
+        db.session.add(document)
+        db.session.flush()
+        db.session.add(DocumentGuide(document_id=document.id, usage_guide='...'))
+        for order in range(2):
+            db.session.add(DocumentFile(
+                document_id=document.id,
+                file_url=f'/uploads/documents/qc-{i}-{order}.pdf',
+                file_type='pdf',
+                display_order=order
+            ))
+    db.session.commit()
+
+
+def seed_subcategories():
+    """Three levels below the seeded category, with documents in each"""
+    parent = Category.query.filter_by(slug='hop-dong').first()
+    for i in range(3):
+        child = Category(name=f'Hợp đồng {i}', slug=f'hop-dong-{i}', parent_id=parent.id, display_order=i)
+        db.session.add(child)
+        db.session.flush()
+        for j in range(3):
+            grandchild = Category(name=f'Hợp đồng {i}.{j}', slug=f'hop-dong-{i}-{j}', parent_id=child.id)
+            db.session.add(grandchild)
+            db.session.flush()
+            db.session.add(Document(
+                code=f'QC-{i}-{j}',
+                title=f'Hợp đồng mẫu {i}.{j}',
+                slug=f'hop-dong-mau-{i}-{j}',
+                category_id=grandchild.id,
+                price=0
+            ))
+    db.session.commit()
+
+
+def count_queries(client, url):
+    """Return the number of SQL statements executed while serving url"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+        assert response.status_code == 200, f'{url} returned {response.status_code}'
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return len(statements)
+
+
+def main():
+    app = create_app('testing')
+    failures = 0
+
+    with app.app_context():
+        db.create_all()
+        seed()
+        client = app.test_client()
+
+        endpoints = [
+            ('GET /api/documents', '/api/documents?per_page={n}'),
+            ('GET /api/documents?q=', '/api/documents?q=hop+dong&per_page={n}'),
+            ('GET /api/categories/<slug>/documents', '/api/categories/hop-dong/documents?per_page={n}'),
+        ]
+
+        for label, url in endpoints:
+            small = count_queries(client, url.format(n=5))
+            large = count_queries(client, url.format(n=25))
+            ok = small == large
+            failures += 0 if ok else 1
+            print(f"{'✅' if ok else '❌'} {label:<40} per_page=5: {small} queries, per_page=25: {large} queries")
+
+        # Category list and tree: one categories query plus one grouped COUNT, at any size/depth
+        category_endpoints = [('GET /api/categories', '/api/categories'),
+                              ('GET /api/categories/tree', '/api/categories/tree')]
+        before = [count_queries(client, url) for _, url in category_endpoints]
+        seed_subcategories()
+        after = [count_queries(client, url) for _, url in category_endpoints]
+        for (label, _), small, large in zip(category_endpoints, before, after):
+            ok = small == large
+            failures += 0 if ok else 1
+            print(f"{'✅' if ok else '❌'} {label:<40} 1 category: {small} queries, 13 categories: {large} queries")
+
+        detail = count_queries(client, '/api/documents/hop-dong-mau-1')
+        print(f"ℹ️ GET /api/documents/<slug>{'':<16} {detail} queries")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+End-to-end check for SepayReconciler against the local SePay stand-in
+
+Seeds an in-memory SQLite database with pending SePay payments, posts bank
+transfers to scripts/fake_sepay_api.py and checks that:
+  - polling /api/sepay/check/<id> never calls the SePay API
+  - one reconcile pass completes every paid order with one API request
+  - later passes only ask for transactions after the stored cursor
+  - wrong amounts, unknown codes and transfers already seen by the webhook are left alone
+  - completing an already completed order (a duplicate webhook racing the
+    reconciler) credits nothing
+
+Usage:
+    python scripts/check_sepay_reconciler.py
+"""
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_sepay_api import FakeSepayAPI
+
+api = FakeSepayAPI().start()
+os.environ.update({
+    'SEPAY_API_URL': api.url,
+    'SEPAY_API_KEY': 'check-reconciler',
+    'SEPAY_ENABLED': 'True'
+})
+
+from decimal import Decimal
+from flask_jwt_extended import create_access_token
+from main import create_app
+from models import db, User, Category, Document, Transaction, SepaySyncState
+from services import SepayReconciler, EntitlementService
+from services.sepay_service import SepayService
+
+
+def pending(user, amount, transaction_type='topup', document=None):
+    transaction = Transaction(
+        user_id=user.id, transaction_type=transaction_type, amount=amount,
+        document_id=document.id if document else None, status='pending',
+        payment_method='sepay', payment_status='pending',
+        payment_code=SepayService.new_payment_code()
+    )
+    db.session.add(transaction)
+    db.session.commit()
+    return transaction
+
+
+def main():
+    app = create_app('testing')
+    failures = []
+
+    def check(condition, label):
+        print(f"{'✅' if condition else '❌'} {label}")
+        if not condition:
+            failures.append(label)
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='reconcile@example.com', full_name='Reconcile', balance=0)
+        user.set_password('reconcile')
+        category = Category(name='Hợp đồng', slug='hop-dong')
+        db.session.add_all([user, category])
+        db.session.flush()
+        document = Document(code='RC-01', title='Hợp đồng mẫu', slug='hop-dong-mau',
+                            category_id=category.id, price=20000)
+        db.session.add(document)
+        db.session.commit()
+
+        topup = pending(user, 50000)
+        purchase = pending(user, 20000, 'document', document)
+        underpaid = pending(user, 100000)
+        webhooked = pending(user, 30000)
+
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+        for _ in range(20):
+            response = client.get(f'/api/sepay/check/{topup.id}', headers=headers)
+        check(response.status_code == 200 and response.get_json()['data']['payment_status'] == 'pending',
+              'status check reports pending from the database')
+        check(api.requests == 0, f'status polling made no SePay API calls ({api.requests})')
+
+        # Some noise, then the payments
+        api.add_transaction('Chuyen tien an trua', 120000)
+        api.add_transaction(f'LOCSPAY000324416 DH{topup.payment_code}', 50000)
+        api.add_transaction(f'dh{purchase.payment_code} thanh toan', 20000)
+        api.add_transaction(f'DH{underpaid.payment_code}', 10000)
+        api.add_transaction('DHZZZZZZZZ', 50000)
+        webhook_id = api.add_transaction(f'DH{webhooked.payment_code}', 30000)
+        api.add_transaction('Rut tien', 0, amount_out=50000)
+
+        ok, _ = SepayService.process_payment_webhook({
+            'id': webhook_id, 'transferType': 'in', 'transferAmount': 30000,
+            'content': f'DH{webhooked.payment_code}'
+        })
+        check(ok, 'webhook completes its payment first')
+
+        api.requests = 0
+        stats = SepayReconciler.reconcile_once()
+        db.session.expire_all()
+        check(stats['matched'] == 2, f"one pass matched the two paid orders ({stats['matched']})")
+        check(api.requests == 1, f'one pass made one SePay API call ({api.requests})')
+        check(db.session.get(Transaction, topup.id).payment_status == 'completed', 'top-up completed')
+        check(db.session.get(User, user.id).balance == Decimal('80000'), 'balance credited once per top-up')
+        check(db.session.get(Transaction, purchase.id).payment_status == 'completed', 'purchase completed')
+        check(EntitlementService.user_owns_document(user.id, document.id), 'purchased document granted')
+        check(db.session.get(Transaction, underpaid.id).payment_status == 'pending', 'underpaid order still pending')
+        check(db.session.get(SepaySyncState, SepayReconciler.CURSOR_KEY).value == str(api._next_id),
+              'cursor advanced to the newest bank transaction')
+
+        response = client.get(f'/api/sepay/check/{topup.id}', headers=headers)
+        check(response.get_json()['data']['payment_status'] == 'completed', 'status check reports completed')
+
+        # A racer that read the order while it was still pending loses the conditional UPDATE
+        stale = db.session.get(Transaction, topup.id)
+        won = SepayService.complete_payment(stale, 'race-duplicate', 50000, {})
+        db.session.commit()
+        db.session.expire_all()
+        check(not won, 'second completion of the same order is rejected')
+        check(db.session.get(User, user.id).balance == Decimal('80000'), 'second completion credits nothing')
+
+        # Nothing new: the next pass asks only for transactions after the cursor
+        api.requests = 0
+        stats = SepayReconciler.reconcile_once()
+        check(stats['fetched'] == 0 and api.requests == 1, 'incremental pass fetched nothing new')
+
+        late = api.add_transaction(f'DH{underpaid.payment_code} bo sung', 100000)
+        stats = SepayReconciler.reconcile_once()
+        db.session.expire_all()
+        check(stats['fetched'] == 1 and stats['matched'] == 1, 'only the new transfer is fetched and matched')
+        check(db.session.get(Transaction, underpaid.id).sepay_transaction_id == late, 'late transfer completes its order')
+
+        # No pending payments left: no API call at all
+        api.requests = 0
+        SepayReconciler.reconcile_once()
+        check(api.requests == 0, 'no pending payments, no SePay API call')
+
+    api.stop()
+    if failures:
+        print(f"\n❌ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\n✅ SePay reconciler checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Process journaled SePay webhooks outside the web workers
+
+Usage:
+    python scripts/drain_sepay_webhooks.py          # drain once
+    python scripts/drain_sepay_webhooks.py --loop   # drain every SEPAY_WEBHOOK_DRAIN_INTERVAL seconds
+"""
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app
+from models import db, SepayWebhookEvent
+from services.sepay_webhook_journal import SepayWebhookJournal
+
+
+def main():
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    loop = '--loop' in sys.argv[1:]
+    interval = max(float(app.config.get('SEPAY_WEBHOOK_DRAIN_INTERVAL') or 1), 0.1)
+
+    with app.app_context():
+        while True:
+            try:
+                stats = SepayWebhookJournal.drain()
+                if stats['processed'] or stats['retried'] or not loop:
+                    queued = SepayWebhookEvent.query.filter(SepayWebhookEvent.processed_at.is_(None)).count()
+                    print(f"📥 processed={stats['processed']} retried={stats['retried']} "
+                          f"batches={stats['batches']} queued={queued}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Drain failed: {e}")
+                if not loop:
+                    sys.exit(1)
+            finally:
+                db.session.remove()
+            if not loop:
+                break
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    main()
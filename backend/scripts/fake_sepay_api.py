@@ -0,0 +1,121 @@
+"""
+Local stand-in for the SePay transactions API
+
+Serves GET /transactions/list (since_id inclusive, limit, userapi response
+format) from an in-memory list, so the reconciler can be exercised without
+a SePay account. POST /transactions adds a bank transaction:
+    {"content": "LOCSPAY000324416 DHABCD2345", "amount": 50000}
+
+Usage:
+    python scripts/fake_sepay_api.py [port]
+    SEPAY_API_URL=http://127.0.0.1:<port> SEPAY_API_KEY=test python app.py
+
+Also importable: FakeSepayAPI().start() runs it on a free port in a thread.
+"""
+import sys
+import json
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeSepayAPI:
+    """In-memory bank account behind a SePay-like HTTP API"""
+
+    def __init__(self, port=0, first_id=1000):
+        self.transactions = []
+        self.requests = 0
+        self._next_id = first_id
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def add_transaction(self, content, amount_in, amount_out=0):
+        """Record an incoming (or outgoing) transfer; returns its SePay ID"""
+        with self._lock:
+            self._next_id += 1
+            self.transactions.append({
+                'id': str(self._next_id),
+                'bank_brand_name': 'ACB',
+                'account_number': '9924666',
+                'transaction_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'amount_in': f'{amount_in:.2f}',
+                'amount_out': f'{amount_out:.2f}',
+                'transaction_content': content,
+                'reference_number': f'FT{self._next_id}'
+            })
+            return str(self._next_id)
+
+    def list_transactions(self, since_id=None, limit=100):
+        """Newest first, like the real API"""
+        with self._lock:
+            rows = [tx for tx in self.transactions if since_id is None or int(tx['id']) >= since_id]
+        if since_id is not None:
+            return rows[:limit][::-1]
+        return rows[::-1][:limit]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if not url.path.rstrip('/').endswith('/transactions/list'):
+                    return self._send(404, {'status': 404, 'error': 'Not found'})
+                if not self.headers.get('Authorization', '').startswith('Bearer '):
+                    return self._send(401, {'status': 401, 'error': 'Unauthorized'})
+                query = parse_qs(url.query)
+                since_id = int(query['since_id'][0]) if 'since_id' in query else None
+                limit = int(query.get('limit', ['100'])[0])
+                with api._lock:
+                    api.requests += 1
+                return self._send(200, {
+                    'status': 200,
+                    'error': None,
+                    'messages': {'success': True, 'transactions': api.list_transactions(since_id, limit)}
+                })
+
+            def do_POST(self):
+                if urlparse(self.path).path.rstrip('/') != '/transactions':
+                    return self._send(404, {'status': 404, 'error': 'Not found'})
+                data = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                sepay_id = api.add_transaction(data.get('content', ''), float(data.get('amount', 0)))
+                return self._send(201, {'status': 201, 'id': sepay_id})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8787
+    api = FakeSepayAPI(port=port)
+    print(f"🏦 Fake SePay API on {api.url} (Ctrl+C to stop)")
+    try:
+        api._server.serve_forever()
+    except KeyboardInterrupt:
+        api.stop()
@@ -0,0 +1,26 @@
+"""
+Re-run preview jobs that were lost (e.g. the server restarted mid-render)
+
+Renders inline in this process, so no worker pool has to stay alive.
+
+Usage:
+    python scripts/requeue_previews.py [--failed]
+"""
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app
+from services import PreviewService
+
+
+if __name__ == '__main__':
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    app.config['PREVIEW_WORKERS'] = 0
+    app.config['PREVIEW_MAX_ATTEMPTS'] = 1
+    
+    with app.app_context():
+        count = PreviewService.requeue_pending(include_failed='--failed' in sys.argv)
+        print(f"✅ Processed {count} preview job(s)")
@@ -0,0 +1,45 @@
+"""
+Run SePay reconciliation outside the web workers
+
+Usage:
+    python scripts/run_sepay_reconciler.py          # one pass
+    python scripts/run_sepay_reconciler.py --loop   # poll every SEPAY_RECONCILE_INTERVAL seconds
+
+Set SEPAY_RECONCILE_INTERVAL=0 for the web app when this runs as its own process.
+"""
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app
+from models import db
+from services.sepay_reconciler import SepayReconciler
+
+
+def main():
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    loop = '--loop' in sys.argv[1:]
+    interval = max(float(app.config.get('SEPAY_RECONCILE_INTERVAL') or 15), 1)
+
+    with app.app_context():
+        while True:
+            try:
+                stats = SepayReconciler.reconcile_once()
+                print(f"🔄 fetched={stats['fetched']} matched={stats['matched']} cursor={stats['cursor']}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Reconcile failed: {e}")
+                if not loop:
+                    sys.exit(1)
+            finally:
+                db.session.remove()
+            if not loop:
+                break
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+Stress test: concurrent balance purchases, read-modify-write vs. conditional UPDATE
+
+Every user can afford AFFORDABLE documents. Several threads per user try to
+buy every document twice, all at once, first with the old implementation
+(load user, compare balance in Python, subtract, commit) and then with
+TransactionService.purchase_document. After each run the script checks:
+  - overspend:  debits recorded in transactions minus the actual balance drop
+                (lost updates let users buy more than they paid for)
+  - overdrawn:  users with a negative balance or more purchases than affordable
+  - duplicates: completed purchases of the same document by the same user
+
+Usage:
+    python scripts/stress_purchases.py [users] [threads_per_user] [documents]
+
+Set BENCH_DATABASE_URL to run against PostgreSQL (SQLite serializes writers).
+"""
+import os
+import sys
+import time
+import random
+import threading
+from decimal import Decimal
+
+# Benchmark database must be configured before the app config is imported
+os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL', 'sqlite:///bench_purchases.sqlite')
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from main import create_app
+from models import db, User, Document, Category, Transaction, UserDocumentEntitlement
+from services import TransactionService, EntitlementService
+
+PRICE = Decimal('10000')
+AFFORDABLE = 5
+
+
+def legacy_purchase_document(user_id, document_id):
+    """Purchase path as it was before the conditional UPDATE"""
+    try:
+        user = db.session.get(User, user_id)
+        document = db.session.get(Document, document_id)
+        existing = Transaction.query.filter_by(
+            user_id=user_id, document_id=document_id,
+            transaction_type='document', status='completed'
+        ).first()
+        if existing:
+            return None, 'Document already purchased'
+        if user.balance < document.price:
+            return None, 'Insufficient balance'
+
+        transaction = Transaction(
+            user_id=user_id, transaction_type='document', document_id=document_id,
+            amount=document.price, status='completed', payment_method='balance'
+        )
+        user.balance -= document.price
+        db.session.add(transaction)
+        EntitlementService.grant_for_transaction(transaction)
+        db.session.commit()
+        return transaction, None
+    except Exception as e:
+        db.session.rollback()
+        return None, f'Purchase failed: {str(e)}'
+
+
+def setup(users, documents):
+    """Create (or reuse) the benchmark users and documents"""
+    category = Category.query.filter_by(slug='benchmark-purchases').first()
+    if not category:
+        category = Category(name='Benchmark purchases', slug='benchmark-purchases')
+        db.session.add(category)
+        db.session.flush()
+
+    document_ids = []
+    for i in range(documents):
+        code = f'BENCH-BUY-{i:03d}'
+        document = Document.query.filter_by(code=code).first()
+        if not document:
+            document = Document(code=code, title=f'Mẫu benchmark {i}', slug=f'bench-buy-{i:03d}',
+                                category_id=category.id, price=PRICE)
+            db.session.add(document)
+            db.session.flush()
+        document_ids.append(document.id)
+
+    user_ids = []
+    for i in range(users):
+        email = f'bench-purchase-{i}@example.com'
+        user = User.query.filter_by(email=email).first()
+        if not user:
+            user = User(email=email, full_name=f'Bench {i}')
+            user.set_password('bench-purchase')
+            db.session.add(user)
+            db.session.flush()
+        user_ids.append(user.id)
+
+    db.session.commit()
+    return user_ids, document_ids
+
+
+def reset(user_ids):
+    """Remove earlier purchases and give every user the same balance"""
+    db.session.query(UserDocumentEntitlement).filter(
+        UserDocumentEntitlement.user_id.in_(user_ids)
+    ).delete(synchronize_session=False)
+    db.session.query(Transaction).filter(
+        Transaction.user_id.in_(user_ids)
+    ).delete(synchronize_session=False)
+    db.session.query(User).filter(User.id.in_(user_ids)).update(
+        {User.balance: PRICE * AFFORDABLE}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+def run(app, purchase, user_ids, document_ids, threads_per_user):
+    """Fire every purchase attempt concurrently; return (attempts, completed, elapsed)"""
+    counts = {'attempts': 0, 'completed': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(user_ids) * threads_per_user)
+
+    def worker(user_id):
+        attempts = [doc_id for doc_id in document_ids for _ in range(2)]
+        random.shuffle(attempts)
+        completed = 0
+        with app.app_context():
+            barrier.wait()
+            for document_id in attempts:
+                transaction, _ = purchase(user_id, document_id)
+                completed += transaction is not None
+            db.session.remove()
+        with lock:
+            counts['attempts'] += len(attempts)
+            counts['completed'] += completed
+
+    pool = [threading.Thread(target=worker, args=(user_id,))
+            for user_id in user_ids for _ in range(threads_per_user)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return counts['attempts'], counts['completed'], time.perf_counter() - start
+
+
+def check(user_ids):
+    """Compare recorded purchases with actual balances"""
+    db.session.expire_all()
+    starting = PRICE * AFFORDABLE
+    overspend = Decimal('0')
+    overdrawn = 0
+    for user in User.query.filter(User.id.in_(user_ids)).all():
+        spent, count = db.session.query(
+            func.coalesce(func.sum(Transaction.amount), 0), func.count(Transaction.id)
+        ).filter(
+            Transaction.user_id == user.id, Transaction.status == 'completed'
+        ).one()
+        overspend += Decimal(spent) - (starting - user.balance)
+        if user.balance < 0 or count > AFFORDABLE:
+            overdrawn += 1
+
+    duplicates = db.session.query(Transaction.user_id, Transaction.document_id).filter(
+        Transaction.user_id.in_(user_ids), Transaction.status == 'completed',
+        Transaction.transaction_type == 'document'
+    ).group_by(Transaction.user_id, Transaction.document_id).having(func.count() > 1).count()
+    return overspend, overdrawn, duplicates
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    threads_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    documents = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        user_ids, document_ids = setup(users, documents)
+
+        print(f"📊 {users} users x {threads_per_user} threads, {documents} documents, "
+              f"each user can afford {AFFORDABLE} ({db.engine.dialect.name})\n")
+
+        for label, purchase in (('read-modify-write (before)', legacy_purchase_document),
+                                ('conditional UPDATE (after)', TransactionService.purchase_document)):
+            reset(user_ids)
+            attempts, completed, elapsed = run(app, purchase, user_ids, document_ids, threads_per_user)
+            overspend, overdrawn, duplicates = check(user_ids)
+            print(f"{label:<28}{attempts / elapsed:>8.0f} attempts/s  {completed / elapsed:>7.0f} purchases/s   "
+                  f"overspend={overspend:.0f}  overdrawn users={overdrawn}  duplicates={duplicates}")
+
+        reset(user_ids)
+
+
+if __name__ == '__main__':
+    main()
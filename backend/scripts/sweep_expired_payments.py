@@ -0,0 +1,94 @@
+"""
+Cancel expired pending SePay payments and report sweep throughput
+
+Usage:
+    python scripts/sweep_expired_payments.py [--batch-size N]
+        Sweep the configured database once (the web workers also do this
+        every SEPAY_EXPIRY_SWEEP_INTERVAL seconds).
+
+    python scripts/sweep_expired_payments.py --seed N [--batch-size N]
+        Seed N expired payment requests (plus as many live ones) into
+        BENCH_DATABASE_URL (default sqlite:///bench_sweep.sqlite) and sweep them.
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description='Cancel expired pending SePay payments')
+parser.add_argument('--batch-size', type=int, default=None, help='Rows per UPDATE (default SEPAY_EXPIRY_SWEEP_BATCH)')
+parser.add_argument('--seed', type=int, default=0, help='Seed this many expired rows into the benchmark database first')
+args = parser.parse_args()
+
+if args.seed:
+    # Benchmark database must be configured before the app config is imported
+    os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL', 'sqlite:///bench_sweep.sqlite')
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app
+from models import db, User, Transaction
+from services.sepay_reconciler import SepayReconciler
+from services.sepay_service import SepayService
+
+SEED_BATCH_SIZE = 20000
+
+
+def seed(rows):
+    """Insert `rows` expired and `rows` still valid pending payment requests"""
+    user = User.query.filter_by(email='bench-sweep@example.com').first()
+    if not user:
+        user = User(email='bench-sweep@example.com', full_name='Bench sweep')
+        user.set_password('bench-sweep')
+        db.session.add(user)
+        db.session.commit()
+
+    now = datetime.utcnow()
+    table = Transaction.__table__
+    print(f"Seeding {rows} expired and {rows} live payment requests...")
+    for offset in range(0, rows * 2, SEED_BATCH_SIZE):
+        batch = []
+        for i in range(offset, min(offset + SEED_BATCH_SIZE, rows * 2)):
+            expired = i % 2 == 0
+            created_at = now - timedelta(hours=2 if expired else 0, seconds=i % 600)
+            batch.append({
+                'id': str(uuid.uuid4()),
+                'user_id': user.id,
+                'transaction_type': 'topup',
+                'amount': 50000,
+                'status': 'pending',
+                'payment_method': 'sepay',
+                'payment_status': 'pending',
+                'payment_code': f'{SepayService.new_payment_code()}{i:x}'[:20],
+                'expires_at': created_at + timedelta(minutes=15),
+                'created_at': created_at,
+                'updated_at': created_at
+            })
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+
+
+def main():
+    app = create_app('production' if args.seed else os.getenv('FLASK_ENV', 'development'))
+
+    with app.app_context():
+        if args.seed:
+            db.create_all()
+            seed(args.seed)
+
+        start = time.perf_counter()
+        stats = SepayReconciler.sweep_expired(batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+
+        pending = Transaction.query.filter_by(payment_method='sepay', payment_status='pending').count()
+        rate = stats['expired'] / elapsed if elapsed > 0 else 0
+        print(f"🧹 Cancelled {stats['expired']} expired payment(s) in {stats['batches']} batch(es), "
+              f"{elapsed:.2f}s ({rate:.0f} rows/s, {db.engine.dialect.name})")
+        print(f"   {pending} payment request(s) still pending")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,20 @@ from .package_service import PackageService
 from .transaction_service import TransactionService
 from .user_service import UserService
 from .preview_service import PreviewService
+from .search_service import SearchService
+from .counter_service import CounterService
+from .entitlement_service import EntitlementService
+from .pagination_service import PaginationService
+from .cache_service import CacheService
+from .storage_service import StorageService
+from .chunked_upload_service import ChunkedUploadService
+from .file_delivery_service import FileDeliveryService
+from .download_token_service import DownloadTokenService
+from .bundle_service import BundleService
+from .principal_service import PrincipalService
+from .sepay_reconciler import SepayReconciler
+from .sepay_webhook_journal import SepayWebhookJournal
+from .payment_notifier import PaymentNotifier
 
 __all__ = [
     'AuthService',
@@ -16,5 +30,19 @@ __all__ = [
     'PackageService',
     'TransactionService',
     'UserService',
-    'PreviewService'
+    'PreviewService',
+    'SearchService',
+    'CounterService',
+    'EntitlementService',
+    'PaginationService',
+    'CacheService',
+    'StorageService',
+    'ChunkedUploadService',
+    'FileDeliveryService',
+    'DownloadTokenService',
+    'BundleService',
+    'PrincipalService',
+    'SepayReconciler',
+    'SepayWebhookJournal',
+    'PaymentNotifier'
 ]
@@ -4,6 +4,7 @@ Authentication service for user registration, login, and token management
 from datetime import datetime, timedelta
 from flask_jwt_extended import create_access_token, create_refresh_token
 from models import db, User
+from .principal_service import PrincipalService
 from email_validator import validate_email, EmailNotValidError
 
 
@@ -89,7 +90,7 @@ class AuthService:
             # Generate tokens
             access_token = create_access_token(
                 identity=user.id,
-                additional_claims={'role': user.role}
+                additional_claims=PrincipalService.token_claims(user)
             )
             refresh_token = create_refresh_token(identity=user.id)
             
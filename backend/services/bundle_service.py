@@ -0,0 +1,184 @@
+"""
+Bundle service - streams the files of a document or package as one zip
+
+The archive is produced while it is sent: zipfile writes into a sink that the
+response generator drains after every block, so neither memory nor disk use
+grows with the bundle size. Entries are stored (no compression) since PDFs and
+Office files are already compressed. Output is deterministic for a given set
+of files, so the ETag (the bundle version) lets clients revalidate with 304.
+"""
+import os
+import json
+import stat
+import zipfile
+import hashlib
+import logging
+import time
+import posixpath
+from flask import current_app, request, Response, make_response
+from werkzeug.utils import secure_filename
+from .storage_service import StorageService
+from .file_delivery_service import set_attachment
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK = 1024 * 1024
+
+
+class _ZipSink:
+    """Write-only, non-seekable target for zipfile; buffered bytes are drained by the generator"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class BundleService:
+    """Service for zip bundles of document files"""
+
+    @staticmethod
+    def _unique_name(name, used):
+        """Avoid duplicate entry names inside one archive: a.pdf, a (2).pdf, ..."""
+        base, ext = posixpath.splitext(name)
+        candidate = name
+        counter = 2
+        while candidate.lower() in used:
+            candidate = f"{base} ({counter}){ext}"
+            counter += 1
+        used.add(candidate.lower())
+        return candidate
+
+    @staticmethod
+    def document_entries(document, folder='', used=None):
+        """
+        Zip entries for the files of a document
+
+        Args:
+            document: Document (with files loaded)
+            folder: Optional folder inside the archive
+            used: Set of entry names already taken (shared across documents)
+
+        Returns:
+            list: [{name, path, size, date_time, version}] for files present on disk
+        """
+        used = set() if used is None else used
+        files = sorted(document.files or [], key=lambda f: (f.display_order or 0, f.created_at))
+        if files:
+            sources = [(f.file_url, f.original_filename, f.content_hash, f.created_at) for f in files]
+        elif document.file_url:
+            sources = [(document.file_url, f"{document.title}.{document.file_type}", None, None)]
+        else:
+            sources = []
+
+        entries = []
+        for file_url, filename, content_hash, created_at in sources:
+            path = StorageService.local_path(file_url)
+            if not path or not os.path.isfile(path):
+                logger.warning("Bundle of document %s skips missing file %s", document.id, file_url)
+                continue
+            file_stat = os.stat(path)
+            size = file_stat.st_size
+            # Timestamps come from the file itself, never Document.updated_at (bumped by every counter flush)
+            modified = created_at.timetuple() if created_at else time.gmtime(file_stat.st_mtime)
+            date_time = tuple(modified[:6]) if modified[0] >= 1980 else (1980, 1, 1, 0, 0, 0)
+            # secure_filename drops Vietnamese characters, so only strip path separators
+            filename = (filename or os.path.basename(path)).replace('/', '_').replace('\\', '_')
+            name = BundleService._unique_name(posixpath.join(folder, filename) if folder else filename, used)
+            entries.append({
+                'name': name,
+                'path': path,
+                'size': size,
+                'date_time': date_time,
+                'version': content_hash or f"{size}:{file_stat.st_mtime_ns}"
+            })
+        return entries
+
+    @staticmethod
+    def package_entries(package):
+        """
+        Zip entries for every document in a package, one folder per document
+
+        Returns:
+            list: Entries as returned by document_entries
+        """
+        used = set()
+        entries = []
+        documents = sorted((pd.document for pd in package.documents if pd.document), key=lambda d: d.code or d.title)
+        for document in documents:
+            folder = secure_filename(document.slug or document.code or document.id) or document.id
+            entries.extend(BundleService.document_entries(document, folder=folder, used=used))
+        return entries
+
+    @staticmethod
+    def version(kind, object_id, entries):
+        """Bundle version (ETag): changes only when an entry's name, content or file timestamp changes"""
+        payload = json.dumps([kind, object_id, [(e['name'], e['version'], e['date_time']) for e in entries]])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def generate(entries):
+        """
+        Yield the zip archive in pieces (at most one read block plus headers at a time)
+
+        Args:
+            entries: Entries from document_entries / package_entries
+
+        Yields:
+            bytes: Archive data
+        """
+        sink = _ZipSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for entry in entries:
+                info = zipfile.ZipInfo(entry['name'], date_time=entry['date_time'])
+                info.compress_type = zipfile.ZIP_STORED
+                info.external_attr = (stat.S_IFREG | 0o644) << 16
+                info.file_size = entry['size']  # Lets zipfile pick Zip64 headers up front for large files
+                with open(entry['path'], 'rb') as src, archive.open(info, 'w') as dest:
+                    for block in iter(lambda: src.read(READ_BLOCK), b''):
+                        dest.write(block)
+                        yield sink.drain()
+                data = sink.drain()
+                if data:
+                    yield data
+        data = sink.drain()  # Central directory
+        if data:
+            yield data
+
+    @staticmethod
+    def send(entries, download_name, version):
+        """
+        Stream a bundle, or answer 304 if the client has this version
+
+        Args:
+            entries: Entries to archive (resolved before streaming, so no DB access happens later)
+            download_name: Filename for Content-Disposition
+            version: Value from BundleService.version
+
+        Returns:
+            Response
+        """
+        max_age = int(current_app.config.get('FILE_CACHE_MAX_AGE', 3600))
+
+        if request.if_none_match.contains(version):
+            response = make_response('', 304)
+        else:
+            response = Response(BundleService.generate(entries), mimetype='application/zip')
+            set_attachment(response, download_name)
+            response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass chunks through as they are produced
+
+        response.set_etag(version)
+        # Paid content: browsers may keep it, shared caches may not
+        response.cache_control.private = True
+        response.cache_control.max_age = max_age
+        return response
@@ -0,0 +1,292 @@
+"""
+Cache service - response cache for public catalogue endpoints
+
+Entries are keyed on the request path, the normalized query string and the
+current version of every tag the endpoint depends on. Invalidating a tag
+bumps its version, so stale entries are never read again and simply age out
+of the LRU (or expire in Redis).
+
+Tag versions are only global with RESPONSE_CACHE_REDIS_URL. Without it an
+invalidation reaches the worker that made the change only, so entries are
+kept for at most RESPONSE_CACHE_LOCAL_TTL seconds and other workers may
+serve stale data for that long.
+"""
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """Per-process LRU with TTLs"""
+
+    def __init__(self, max_entries=1024):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tags = {}
+        self.max_entries = max_entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def tag_versions(self, tags):
+        with self._lock:
+            return [self._tags.get(tag, 0) for tag in tags]
+
+    def bump_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._tags[tag] = self._tags.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache shared by all workers; tag versions live in Redis so invalidation is global"""
+
+    KEY_PREFIX = 'respcache:'
+
+    def __init__(self, url, key_prefix=None):
+        import redis  # Optional dependency, only needed for the shared backend
+        self._redis = redis.Redis.from_url(url)
+        if key_prefix:
+            self.KEY_PREFIX = key_prefix
+
+    def get(self, key):
+        raw = self._redis.get(f'{self.KEY_PREFIX}{key}')
+        return json.loads(raw) if raw else None
+
+    def set(self, key, value, ttl):
+        self._redis.set(f'{self.KEY_PREFIX}{key}', json.dumps(value), ex=max(int(ttl), 1))
+
+    def delete(self, key):
+        self._redis.delete(f'{self.KEY_PREFIX}{key}')
+
+    def tag_versions(self, tags):
+        values = self._redis.mget([f'{self.KEY_PREFIX}tag:{tag}' for tag in tags])
+        return [int(value) if value else 0 for value in values]
+
+    def bump_tags(self, tags):
+        pipe = self._redis.pipeline()
+        for tag in tags:
+            pipe.incr(f'{self.KEY_PREFIX}tag:{tag}')
+        pipe.execute()
+
+    def clear(self):
+        for key in self._redis.scan_iter(f'{self.KEY_PREFIX}*'):
+            self._redis.delete(key)
+
+
+class CacheService:
+    """Service for cached responses and tag invalidation"""
+
+    _app = None
+    _local = None
+    _shared = None
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        Configure the response cache for an app
+
+        RESPONSE_CACHE_TTL (seconds) sets the default lifetime; 0 disables caching.
+        RESPONSE_CACHE_MAX_ENTRIES bounds the in-process LRU.
+        RESPONSE_CACHE_REDIS_URL enables the shared Redis backend behind the LRU.
+        RESPONSE_CACHE_LOCAL_TTL caps lifetimes when there is no shared backend.
+        """
+        cls._app = app
+        cls._local = MemoryCacheBackend(int(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024)))
+        cls._shared = None
+
+        redis_url = app.config.get('RESPONSE_CACHE_REDIS_URL')
+        if redis_url:
+            try:
+                cls._shared = RedisCacheBackend(redis_url)
+            except Exception as e:
+                logger.warning(f"Redis response cache unavailable, using memory only: {e}")
+
+    @classmethod
+    def default_ttl(cls):
+        if cls._app is None:
+            return 0
+        return cls._bounded_ttl(float(cls._app.config.get('RESPONSE_CACHE_TTL', 0)))
+
+    @classmethod
+    def _bounded_ttl(cls, ttl):
+        """Lifetime capped to RESPONSE_CACHE_LOCAL_TTL when invalidations stay in this process"""
+        if cls._shared is not None or cls._app is None:
+            return ttl
+        return min(ttl, float(cls._app.config.get('RESPONSE_CACHE_LOCAL_TTL', 5)))
+
+    @staticmethod
+    def normalize_query(args):
+        """Canonical query string: sorted keys and values, empty values dropped"""
+        pairs = sorted((key, value) for key, values in args.lists() for value in values if value != '')
+        return '&'.join(f'{key}={value}' for key, value in pairs)
+
+    @classmethod
+    def build_key(cls, path, args, tags):
+        """
+        Build the cache key for a request
+
+        Args:
+            path: Request path
+            args: Request query args (MultiDict)
+            tags: Tags the response depends on
+
+        Returns:
+            str: Cache key, or None if the cache is unavailable
+        """
+        if cls._local is None:
+            return None
+        try:
+            backend = cls._shared or cls._local
+            versions = backend.tag_versions(tags)
+        except Exception as e:
+            logger.warning(f"Response cache tag lookup failed: {e}")
+            return None
+        raw = f"{path}?{cls.normalize_query(args)}|" + ','.join(
+            f'{tag}:{version}' for tag, version in zip(tags, versions)
+        )
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    @classmethod
+    def get(cls, key):
+        """
+        Get a cached response
+
+        Returns:
+            dict: {etag, body, status} or None
+        """
+        if key is None or cls._local is None:
+            return None
+        entry = cls._local.get(key)
+        if entry is not None or cls._shared is None:
+            return entry
+        try:
+            entry = cls._shared.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+        if entry is not None:
+            cls._local.set(key, entry, cls.default_ttl())
+        return entry
+
+    @classmethod
+    def set(cls, key, body, status=200, ttl=None):
+        """
+        Store a serialized response
+
+        Args:
+            key: Key from build_key
+            body: Serialized JSON body (str)
+            status: HTTP status
+            ttl: Lifetime in seconds (default RESPONSE_CACHE_TTL, capped by
+                 RESPONSE_CACHE_LOCAL_TTL without a shared backend)
+
+        Returns:
+            dict: Stored entry {etag, body, status}
+        """
+        entry = {
+            'etag': hashlib.sha1(body.encode()).hexdigest(),
+            'body': body,
+            'status': status
+        }
+        ttl = cls.default_ttl() if ttl is None else cls._bounded_ttl(ttl)
+        if key is None or cls._local is None or ttl <= 0:
+            return entry
+
+        cls._local.set(key, entry, ttl)
+        if cls._shared is not None:
+            try:
+                cls._shared.set(key, entry, ttl)
+            except Exception as e:
+                logger.warning(f"Response cache write failed: {e}")
+        return entry
+
+    @classmethod
+    def memoize(cls, name, tags, compute, ttl=None):
+        """
+        Value computed in this process, reused until one of the tags is invalidated
+
+        Without a shared backend other workers' invalidations are not seen, so
+        the value is then kept for at most RESPONSE_CACHE_LOCAL_TTL seconds.
+
+        Args:
+            name: Name of the value (unique per distinct computation)
+            tags: Tags the value depends on
+            compute: Function producing the value; must not be mutated by callers
+            ttl: Lifetime in seconds (default RESPONSE_CACHE_TTL, 0 = always compute)
+
+        Returns:
+            Cached or freshly computed value
+        """
+        ttl = cls.default_ttl() if ttl is None else cls._bounded_ttl(ttl)
+        if cls._local is None or ttl <= 0:
+            return compute()
+        try:
+            versions = (cls._shared or cls._local).tag_versions(tags)
+        except Exception as e:
+            logger.warning(f"Response cache tag lookup failed: {e}")
+            return compute()
+
+        key = f"memo:{name}|" + ','.join(f'{tag}:{version}' for tag, version in zip(tags, versions))
+        value = cls._local.get(key)
+        if value is None:
+            value = compute()
+            cls._local.set(key, value, ttl)
+        return value
+
+    @classmethod
+    def invalidate(cls, *tags):
+        """
+        Invalidate every cached response depending on any of the tags
+
+        Args:
+            tags: Tag names (categories, documents, packages, news)
+        """
+        if cls._local is None or not tags:
+            return
+        cls._local.bump_tags(tags)
+        if cls._shared is not None:
+            try:
+                cls._shared.bump_tags(tags)
+            except Exception as e:
+                logger.error(f"Response cache invalidation failed: {e}")
+
+    @classmethod
+    def clear(cls):
+        """Drop every cached response"""
+        if cls._local is not None:
+            cls._local.clear()
+        if cls._shared is not None:
+            try:
+                cls._shared.clear()
+            except Exception as e:
+                logger.error(f"Response cache clear failed: {e}")
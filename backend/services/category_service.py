@@ -1,8 +1,10 @@
 """
 Category service for managing document categories
 """
-from models import db, Category
-from sqlalchemy import func
+from models import db, Category, Document
+from sqlalchemy import func, select, exists
+from sqlalchemy.orm import aliased
+from .cache_service import CacheService
 
 
 class CategoryService:
@@ -26,25 +28,127 @@ class CategoryService:
         
         return query.order_by(Category.display_order, Category.name).all()
     
+    @staticmethod
+    def get_document_counts():
+        """
+        Active document count per category, from one grouped COUNT
+        
+        Returns:
+            dict: {category_id: count}; categories without documents are absent
+        """
+        rows = db.session.query(Document.category_id, func.count(Document.id)).filter(
+            Document.is_active.is_(True)
+        ).group_by(Document.category_id).all()
+        return dict(rows)
+    
+    @staticmethod
+    def get_category_list(include_inactive=False):
+        """
+        Flat category list with documents_count (two queries)
+        
+        Cached until a category or document changes.
+        """
+        def build():
+            counts = CategoryService.get_document_counts()
+            return [
+                cat.to_dict(include_documents=True, documents_count=counts.get(cat.id, 0))
+                for cat in CategoryService.get_all_categories(include_inactive)
+            ]
+        
+        return CacheService.memoize(f'category-list:{bool(include_inactive)}', ('categories', 'documents'), build)
+    
     @staticmethod
     def get_category_tree(include_inactive=False):
         """
         Get categories organized in tree structure
         
+        Built in memory from one categories query and one grouped document
+        count, at any depth, and cached until a category or document changes.
+        
         Args:
             include_inactive: Include inactive categories
             
         Returns:
             list: List of root categories with nested children
         """
-        query = Category.query.filter_by(parent_id=None)
+        return CacheService.memoize(
+            f'category-tree:{bool(include_inactive)}', ('categories', 'documents'),
+            lambda: CategoryService._build_tree(include_inactive)
+        )
+    
+    @staticmethod
+    def _build_tree(include_inactive):
+        categories = CategoryService.get_all_categories(include_inactive)
+        counts = CategoryService.get_document_counts()
         
-        if not include_inactive:
-            query = query.filter_by(is_active=True)
+        nodes = {}
+        for cat in categories:
+            node = cat.to_dict(include_documents=True, documents_count=counts.get(cat.id, 0))
+            node['children'] = []
+            nodes[cat.id] = node
         
-        root_categories = query.order_by(Category.display_order, Category.name).all()
+        roots = []
+        for cat in categories:  # Already in display order, so children lists are too
+            if cat.parent_id is None:
+                roots.append(nodes[cat.id])
+            elif cat.parent_id in nodes:
+                nodes[cat.parent_id]['children'].append(nodes[cat.id])
+            # Children of filtered-out (inactive) parents are left out, as before
+        return roots
+    
+    @staticmethod
+    def descendants_cte(category_id, active_only=False):
+        """
+        Recursive CTE (column id) of a category and every category below it
         
-        return [cat.to_dict(include_children=True, include_documents=True) for cat in root_categories]
+        UNION (not UNION ALL) makes the recursion stop even if the stored
+        hierarchy already contains a cycle. With active_only an inactive
+        category and everything below it are left out, as in the category tree.
+        """
+        anchor = select(Category.id).where(Category.id == category_id)
+        if active_only:
+            anchor = anchor.where(Category.is_active.is_(True))
+        tree = anchor.cte('category_descendants', recursive=True)
+        child = aliased(Category)
+        children = select(child.id).where(child.parent_id == tree.c.id)
+        if active_only:
+            children = children.where(child.is_active.is_(True))
+        return tree.union(children)
+    
+    @staticmethod
+    def ancestors_cte(category_id):
+        """Recursive CTE (columns id, parent_id) of a category and every category above it"""
+        tree = select(Category.id, Category.parent_id).where(
+            Category.id == category_id
+        ).cte('category_ancestors', recursive=True)
+        parent = aliased(Category)
+        return tree.union(select(parent.id, parent.parent_id).where(parent.id == tree.c.parent_id))
+    
+    @staticmethod
+    def get_descendant_ids(category_id, include_self=True):
+        """IDs of all categories below a category (one query)"""
+        tree = CategoryService.descendants_cte(category_id)
+        ids = set(db.session.execute(select(tree.c.id)).scalars())
+        if not include_self:
+            ids.discard(category_id)
+        return ids
+    
+    @staticmethod
+    def get_ancestor_ids(category_id, include_self=False):
+        """IDs of all categories above a category (one query)"""
+        tree = CategoryService.ancestors_cte(category_id)
+        ids = set(db.session.execute(select(tree.c.id)).scalars())
+        if not include_self:
+            ids.discard(category_id)
+        return ids
+    
+    @staticmethod
+    def would_create_cycle(category_id, parent_id):
+        """Check in one query whether parent_id is the category itself or one of its descendants"""
+        tree = CategoryService.ancestors_cte(parent_id)
+        return db.session.execute(
+            select(exists().where(tree.c.id == category_id))
+        ).scalar()
     
     @staticmethod
     def get_category_by_id(category_id):
@@ -91,6 +195,7 @@ class CategoryService:
             
             db.session.add(category)
             db.session.commit()
+            CacheService.invalidate('categories')
             
             return category, None
             
@@ -127,14 +232,9 @@ class CategoryService:
                 if parent_id == category_id:
                     return None, 'Category cannot be its own parent'
                 
-                # Check if new parent is a descendant
-                parent = db.session.get(Category, parent_id)
-                if parent:
-                    current = parent
-                    while current.parent_id:
-                        if current.parent_id == category_id:
-                            return None, 'Cannot create circular reference'
-                        current = db.session.get(Category, current.parent_id)
+                # Check if new parent is a descendant (walks up from the new parent)
+                if CategoryService.would_create_cycle(category_id, parent_id):
+                    return None, 'Cannot create circular reference'
             
             # Update fields
             if name is not None and name != category.name:
@@ -165,6 +265,7 @@ class CategoryService:
                 category.is_active = is_active
             
             db.session.commit()
+            CacheService.invalidate('categories')
             
             return category, None
             
@@ -190,12 +291,13 @@ class CategoryService:
                 return False, 'Category not found'
             
             # Check if category has documents
-            if len(category.documents) > 0:
+            if db.session.query(Document.id).filter_by(category_id=category_id).first():
                 return False, 'Cannot delete category with documents'
             
             # Soft delete
             category.is_active = False
             db.session.commit()
+            CacheService.invalidate('categories')
             
             return True, None
             
@@ -221,6 +323,7 @@ class CategoryService:
                     category.display_order = item['display_order']
             
             db.session.commit()
+            CacheService.invalidate('categories')
             return True, None
             
         except Exception as e:
@@ -0,0 +1,253 @@
+"""
+Chunked upload service - resumable uploads for files larger than MAX_CONTENT_LENGTH
+
+A session is a <id>.part file plus a <id>.json manifest under
+UPLOAD_FOLDER/tmp/chunked, so any worker can accept the next chunk and a
+client can resume from the stored offset after a dropped connection.
+Chunks are streamed straight to disk; memory use does not depend on file size.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+from flask import current_app
+from .storage_service import StorageService
+
+try:
+    import fcntl  # Serializes concurrent writes to one session (POSIX only)
+except ImportError:
+    fcntl = None
+
+COPY_BUFFER = 1024 * 1024
+ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'xls', 'xlsx'}
+
+
+class ChunkedUploadService:
+    """Service for resumable chunked uploads"""
+
+    @staticmethod
+    def _folder():
+        folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'tmp', 'chunked')
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    @staticmethod
+    def _paths(upload_id):
+        # Upload IDs are hex UUIDs; reject anything else so they cannot escape the folder
+        try:
+            upload_id = uuid.UUID(hex=upload_id).hex
+        except (ValueError, TypeError, AttributeError):
+            return None, None
+        folder = ChunkedUploadService._folder()
+        return os.path.join(folder, f'{upload_id}.json'), os.path.join(folder, f'{upload_id}.part')
+
+    @staticmethod
+    def _load(upload_id):
+        manifest_path, part_path = ChunkedUploadService._paths(upload_id)
+        if not manifest_path or not os.path.exists(manifest_path) or not os.path.exists(part_path):
+            return None
+        with open(manifest_path) as f:
+            session = json.load(f)
+        session['offset'] = os.path.getsize(part_path)
+        return session
+
+    @staticmethod
+    def _save(session):
+        manifest_path, _ = ChunkedUploadService._paths(session['upload_id'])
+        data = {k: v for k, v in session.items() if k != 'offset'}
+        tmp_path = f'{manifest_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, manifest_path)
+
+    @staticmethod
+    def _public(session):
+        return {
+            'upload_id': session['upload_id'],
+            'filename': session['filename'],
+            'file_size': session['file_size'],
+            'offset': session['offset'],
+            'chunk_size': int(current_app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)),
+            'expires_at': session['created_at'] + int(current_app.config.get('UPLOAD_SESSION_TTL', 86400))
+        }
+
+    @staticmethod
+    def initiate(filename, file_size, sha256=None):
+        """
+        Start an upload session
+
+        Args:
+            filename: Original filename (extension is validated)
+            file_size: Total size in bytes
+            sha256: Optional SHA-256 hex digest of the whole file, verified on completion
+
+        Returns:
+            tuple: (session, error_message)
+        """
+        file_ext = filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else ''
+        if file_ext not in ALLOWED_EXTENSIONS:
+            return None, f'Invalid file type. Allowed: {", ".join(sorted(ALLOWED_EXTENSIONS))}'
+
+        try:
+            file_size = int(file_size)
+        except (TypeError, ValueError):
+            return None, 'file_size is required'
+        max_size = int(current_app.config.get('UPLOAD_MAX_FILE_SIZE', 1024 * 1024 * 1024))
+        if file_size <= 0 or file_size > max_size:
+            return None, f'file_size must be between 1 and {max_size} bytes'
+
+        ChunkedUploadService.cleanup_expired()
+
+        session = {
+            'upload_id': uuid.uuid4().hex,
+            'filename': filename,
+            'file_type': file_ext,
+            'file_size': file_size,
+            'sha256': sha256.lower() if sha256 else None,
+            'created_at': int(time.time()),
+            'offset': 0
+        }
+        _, part_path = ChunkedUploadService._paths(session['upload_id'])
+        open(part_path, 'wb').close()
+        ChunkedUploadService._save(session)
+        return ChunkedUploadService._public(session), None
+
+    @staticmethod
+    def get_status(upload_id):
+        """
+        Get session progress (the offset to resume from)
+
+        Returns:
+            dict: Session info or None if not found
+        """
+        session = ChunkedUploadService._load(upload_id)
+        return ChunkedUploadService._public(session) if session else None
+
+    @staticmethod
+    def write_chunk(upload_id, offset, stream, chunk_sha256=None):
+        """
+        Append a chunk read from a stream
+
+        Args:
+            upload_id: Session ID
+            offset: Byte offset of the chunk; must equal the bytes received so far
+            stream: Binary stream with the chunk body
+            chunk_sha256: Optional SHA-256 of the chunk; a mismatch discards the chunk
+
+        Returns:
+            tuple: (session, error_message). On 'Offset mismatch' the session
+                   carries the offset to resume from.
+        """
+        session = ChunkedUploadService._load(upload_id)
+        if not session:
+            return None, 'Upload not found'
+
+        _, part_path = ChunkedUploadService._paths(upload_id)
+        max_chunk = int(current_app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+
+        with open(part_path, 'r+b') as part:
+            if fcntl:
+                fcntl.flock(part, fcntl.LOCK_EX)
+            part.seek(0, os.SEEK_END)
+            current = part.tell()
+            if offset != current:
+                session['offset'] = current
+                return ChunkedUploadService._public(session), 'Offset mismatch'
+
+            digest = hashlib.sha256()
+            written = 0
+            error = None
+            for block in iter(lambda: stream.read(COPY_BUFFER), b''):
+                written += len(block)
+                if written > max_chunk or current + written > session['file_size']:
+                    error = 'Chunk exceeds the chunk size or the declared file size'
+                    break
+                digest.update(block)
+                part.write(block)
+
+            if error is None and chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+                error = 'Chunk checksum mismatch'
+
+            if error:
+                # Drop the partial chunk so the client can resend it from the same offset
+                part.truncate(current)
+                session['offset'] = current
+                return ChunkedUploadService._public(session), error
+
+            part.flush()
+            os.fsync(part.fileno())
+            session['offset'] = part.tell()
+
+        return ChunkedUploadService._public(session), None
+
+    @staticmethod
+    def complete(upload_id):
+        """
+        Verify a finished upload and move it into content-addressed storage
+
+        Returns:
+            tuple: (file_data, error_message) where file_data matches the
+                   files_data entries accepted by DocumentService
+        """
+        session = ChunkedUploadService._load(upload_id)
+        if not session:
+            return None, 'Upload not found'
+        if session['offset'] != session['file_size']:
+            return None, f"Upload incomplete: {session['offset']}/{session['file_size']} bytes received"
+
+        manifest_path, part_path = ChunkedUploadService._paths(upload_id)
+
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as part:
+            for block in iter(lambda: part.read(COPY_BUFFER), b''):
+                digest.update(block)
+        content_hash = digest.hexdigest()
+
+        if session['sha256'] and session['sha256'] != content_hash:
+            ChunkedUploadService.abort(upload_id)
+            return None, 'Checksum mismatch, upload discarded'
+
+        stored = StorageService.commit_object(part_path, content_hash, session['file_type'], session['file_size'])
+        os.remove(manifest_path)
+
+        from werkzeug.utils import secure_filename
+        return {
+            'file_url': stored['file_url'],
+            'file_type': stored['file_type'],
+            'original_filename': secure_filename(session['filename']),
+            'file_size': stored['file_size'],
+            'content_hash': stored['content_hash'],
+            'deduplicated': stored['deduplicated']
+        }, None
+
+    @staticmethod
+    def abort(upload_id):
+        """
+        Discard a session and its data
+
+        Returns:
+            bool: True if a session was removed
+        """
+        manifest_path, part_path = ChunkedUploadService._paths(upload_id)
+        removed = False
+        for path in (manifest_path, part_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+                removed = True
+        return removed
+
+    @staticmethod
+    def cleanup_expired():
+        """Remove sessions that received no data for UPLOAD_SESSION_TTL seconds"""
+        ttl = int(current_app.config.get('UPLOAD_SESSION_TTL', 86400))
+        cutoff = time.time() - ttl
+        folder = ChunkedUploadService._folder()
+        for name in os.listdir(folder):
+            if not name.endswith('.part'):
+                continue
+            try:
+                if os.path.getmtime(os.path.join(folder, name)) < cutoff:
+                    ChunkedUploadService.abort(name[:-len('.part')])
+            except OSError:
+                pass
@@ -0,0 +1,204 @@
+"""
+Counter service - write-behind buffering for view/download counters
+"""
+import os
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from sqlalchemy import bindparam
+from models import db, Document, News
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCounterBackend:
+    """Per-process counter buffer"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+
+    def incr(self, target, item_id, amount=1):
+        with self._lock:
+            self._counts[(target, item_id)] += amount
+
+    def drain(self):
+        """Return and reset all buffered counts as {(target, id): amount}"""
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+        return dict(counts)
+
+
+class RedisCounterBackend:
+    """Counter buffer shared by all workers through Redis hashes"""
+
+    KEY_PREFIX = 'counters:'
+
+    def __init__(self, url):
+        import redis  # Optional dependency, only needed for the shared backend
+        self._redis = redis.Redis.from_url(url)
+
+    def incr(self, target, item_id, amount=1):
+        self._redis.hincrby(f'{self.KEY_PREFIX}{target}', item_id, amount)
+
+    def drain(self):
+        """Atomically take every target hash so only one worker flushes a given batch"""
+        counts = {}
+        for target in CounterService.TARGETS:
+            key = f'{self.KEY_PREFIX}{target}'
+            flushing_key = f'{key}:flushing:{os.getpid()}'
+            try:
+                self._redis.rename(key, flushing_key)
+            except Exception:
+                continue  # Nothing buffered for this target
+            for item_id, amount in self._redis.hgetall(flushing_key).items():
+                counts[(target, item_id.decode())] = int(amount)
+            self._redis.delete(flushing_key)
+        return counts
+
+
+class CounterService:
+    """Service for buffered counter increments"""
+
+    # target name -> (model, counter column)
+    TARGETS = {
+        'document_views': (Document, 'views_count'),
+        'document_downloads': (Document, 'downloads_count'),
+        'news_views': (News, 'views_count'),
+    }
+
+    _app = None
+    _backend = None
+    _flusher = None
+    _flusher_pid = None
+    _stop = threading.Event()
+    _start_lock = threading.Lock()
+    _atexit_registered = False
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        Configure the counter buffer for an app
+
+        COUNTER_FLUSH_INTERVAL (seconds) controls write-behind; 0 writes through.
+        COUNTER_REDIS_URL enables the shared Redis backend.
+        """
+        cls._app = app
+        redis_url = app.config.get('COUNTER_REDIS_URL')
+        if redis_url:
+            try:
+                cls._backend = RedisCounterBackend(redis_url)
+            except Exception as e:
+                logger.warning(f"Redis counter backend unavailable, using memory: {e}")
+                cls._backend = MemoryCounterBackend()
+        else:
+            cls._backend = MemoryCounterBackend()
+
+        if not cls._atexit_registered:
+            atexit.register(cls._flush_at_exit)
+            cls._atexit_registered = True
+
+    @classmethod
+    def _interval(cls):
+        if cls._app is None:
+            return 0
+        return float(cls._app.config.get('COUNTER_FLUSH_INTERVAL', 0))
+
+    @classmethod
+    def increment(cls, target, item_id, amount=1):
+        """
+        Record an increment for a counter
+
+        Args:
+            target: One of TARGETS (document_views, document_downloads, news_views)
+            item_id: Row ID
+            amount: Increment size
+
+        Returns:
+            bool: True if recorded
+        """
+        if target not in cls.TARGETS or not item_id:
+            return False
+
+        if cls._interval() <= 0 or cls._backend is None:
+            return cls._apply({(target, item_id): amount})
+
+        cls._backend.incr(target, item_id, amount)
+        cls._ensure_flusher()
+        return True
+
+    @classmethod
+    def flush(cls):
+        """
+        Write all buffered increments to the database
+
+        Issues one executemany UPDATE ... SET col = col + n per target.
+
+        Returns:
+            int: Number of rows updated
+        """
+        if cls._backend is None:
+            return 0
+        counts = cls._backend.drain()
+        if not counts:
+            return 0
+        if not cls._apply(counts):
+            # Put the increments back so they are retried on the next flush
+            for (target, item_id), amount in counts.items():
+                cls._backend.incr(target, item_id, amount)
+            return 0
+        return len(counts)
+
+    @classmethod
+    def _apply(cls, counts):
+        """Apply {(target, id): amount} as bulk relative updates"""
+        grouped = defaultdict(list)
+        for (target, item_id), amount in counts.items():
+            grouped[target].append({'item_id': item_id, 'amount': amount})
+
+        try:
+            for target, rows in grouped.items():
+                model, column_name = cls.TARGETS[target]
+                table = model.__table__
+                column = table.c[column_name]
+                stmt = table.update()\
+                    .where(table.c.id == bindparam('item_id'))\
+                    .values({column_name: column + bindparam('amount')})
+                db.session.execute(stmt, rows)
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to flush counters: {e}")
+            return False
+
+    @classmethod
+    def _ensure_flusher(cls):
+        """Start the background flush thread (again after a fork)"""
+        if cls._flusher is not None and cls._flusher.is_alive() and cls._flusher_pid == os.getpid():
+            return
+        with cls._start_lock:
+            if cls._flusher is not None and cls._flusher.is_alive() and cls._flusher_pid == os.getpid():
+                return
+            cls._stop.clear()
+            cls._flusher = threading.Thread(target=cls._run_flusher, name='counter-flusher', daemon=True)
+            cls._flusher_pid = os.getpid()
+            cls._flusher.start()
+
+    @classmethod
+    def _run_flusher(cls):
+        while not cls._stop.wait(max(cls._interval(), 0.1)):
+            with cls._app.app_context():
+                cls.flush()
+
+    @classmethod
+    def _flush_at_exit(cls):
+        cls._stop.set()
+        if cls._app is None:
+            return
+        try:
+            with cls._app.app_context():
+                cls.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush counters on shutdown: {e}")
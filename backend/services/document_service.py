@@ -2,15 +2,49 @@
 Document service for managing documents
 """
 from models import db, Document, DocumentGuide, Category, DocumentFile
-from sqlalchemy import or_, func
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
+from .search_service import SearchService
+from .counter_service import CounterService
+from .pagination_service import PaginationService
+from .cache_service import CacheService
+from .storage_service import StorageService
+from .preview_service import PreviewService
+from .category_service import CategoryService
 
 
 class DocumentService:
     """Service for document operations"""
     
+    SORT_FIELDS = ('created_at', 'views_count', 'downloads_count', 'price')
+    
+    @staticmethod
+    def load_options(profile):
+        """
+        Relationship loading options matching what each endpoint serializes
+        
+        Document.to_dict always reads `files`; include_category reads `category`
+        and include_guide reads `guide`. Loading them up front keeps the query
+        count per endpoint fixed regardless of page size.
+        
+        Args:
+            profile: 'list' (to_dict(include_category=True)),
+                     'detail' (to_dict(include_guide=True, include_category=True))
+            
+        Returns:
+            list: SQLAlchemy loader options
+        """
+        if profile is None:
+            return []
+        options = [selectinload(Document.files), joinedload(Document.category)]
+        if profile == 'detail':
+            options.append(joinedload(Document.guide))
+        return options
+    
     @staticmethod
     def list_documents(page=1, per_page=20, category_id=None, is_featured=None, 
-                      search_query=None, sort_by='created_at', sort_order='desc'):
+                      search_query=None, sort_by=None, sort_order='desc', profile='list',
+                      cursor=None, total=None, include_descendants=False):
         """
         List documents with pagination and filters
         
@@ -18,50 +52,70 @@ class DocumentService:
             page: Page number
             per_page: Items per page
             category_id: Filter by category
+            include_descendants: With category_id, also match documents in its subcategories
             is_featured: Filter by featured status
-            search_query: Search in title and description
-            sort_by: Sort field (created_at, views_count, downloads_count, price)
+            search_query: Full-text search (title, code, description, content)
+            sort_by: Sort field (relevance, created_at, views_count, downloads_count, price).
+                     Defaults to relevance when searching, created_at otherwise
             sort_order: Sort order (asc, desc)
+            profile: Loading profile (see load_options)
+            cursor: Keyset mode when not None ('' = first page); ignored for relevance sort
+            total: Keyset mode only - None, 'exact' or 'estimate'
             
         Returns:
-            dict: {documents, total, page, per_page, pages}
+            dict: {documents, total, page, per_page, pages}, or in keyset mode
+                  {documents, total, per_page, next_cursor, has_next}
+        
+        Raises:
+            ValueError: If the cursor is malformed
         """
-        query = Document.query.filter_by(is_active=True)
+        query = Document.query.options(*DocumentService.load_options(profile)).filter_by(is_active=True)
         
         # Apply filters
-        if category_id:
+        if category_id and include_descendants:
+            # Active subtree as a recursive CTE inside the same query
+            subtree = CategoryService.descendants_cte(category_id, active_only=True)
+            query = query.filter(Document.category_id.in_(select(subtree.c.id)))
+        elif category_id:
             query = query.filter_by(category_id=category_id)
         
         if is_featured is not None:
             query = query.filter_by(is_featured=is_featured)
         
+        rank = None
         if search_query:
-            # Clean and normalize search query
-            search_query = search_query.strip()
-            
-            # Create search pattern for partial matching
-            search_pattern = f'%{search_query}%'
-            
-            # Search in title, description, code, and content
-            # Using ilike for case-insensitive search (works with Vietnamese)
-            query = query.filter(
-                or_(
-                    Document.title.ilike(search_pattern),
-                    Document.description.ilike(search_pattern),
-                    Document.code.ilike(search_pattern),
-                    Document.content.ilike(search_pattern)
-                )
-            )
+            query, rank = SearchService.apply_search(query, search_query)
         
         # Apply sorting
-        sort_column = getattr(Document, sort_by, Document.created_at)
-        if sort_order == 'desc':
-            query = query.order_by(sort_column.desc())
+        if not sort_by:
+            sort_by = 'relevance' if rank is not None else 'created_at'
+        
+        if sort_by == 'relevance' and rank is not None:
+            query = query.order_by(rank.desc(), Document.created_at.desc())
         else:
-            query = query.order_by(sort_column.asc())
+            if sort_by in DocumentService.SORT_FIELDS:
+                sort_column = getattr(Document, sort_by)
+            else:
+                sort_column = Document.created_at
+            
+            if cursor is not None:
+                result = PaginationService.paginate_keyset(
+                    query, sort_column, Document.id,
+                    cursor=cursor,
+                    per_page=per_page,
+                    descending=(sort_order == 'desc'),
+                    total=total
+                )
+                result['documents'] = [doc.to_dict(include_category=True) for doc in result.pop('items')]
+                return result
+            
+            if sort_order == 'desc':
+                query = query.order_by(sort_column.desc())
+            else:
+                query = query.order_by(sort_column.asc())
         
         # Paginate
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = query.paginate(page=page, per_page=per_page, max_per_page=PaginationService.max_per_page(), error_out=False)
         
         return {
             'documents': [doc.to_dict(include_category=True) for doc in pagination.items],
@@ -91,14 +145,17 @@ class DocumentService:
         )
     
     @staticmethod
-    def get_document_by_id(document_id):
-        """Get document by ID"""
-        return db.session.get(Document, document_id)
+    def get_document_by_id(document_id, profile=None):
+        """Get document by ID, optionally eager-loading for a serialization profile"""
+        if profile is None:
+            return db.session.get(Document, document_id)
+        return db.session.get(Document, document_id, options=DocumentService.load_options(profile))
     
     @staticmethod
-    def get_document_by_slug(slug):
-        """Get document by slug"""
-        return Document.query.filter_by(slug=slug, is_active=True).first()
+    def get_document_by_slug(slug, profile='detail'):
+        """Get document by slug (profile=None skips eager loading)"""
+        return Document.query.options(*DocumentService.load_options(profile))\
+            .filter_by(slug=slug, is_active=True).first()
     
     @staticmethod
     def create_document(code, title, description, category_id, price=0, 
@@ -163,18 +220,10 @@ class DocumentService:
             db.session.flush()  # Get document ID
             
             # Create files if provided
+            doc_files = []
             if files_data and isinstance(files_data, list):
                 for index, file_data in enumerate(files_data):
-                    doc_file = DocumentFile(
-                        document_id=document.id,
-                        file_url=file_data.get('file_url'),
-                        preview_url=file_data.get('preview_url'),
-                        file_type=file_data.get('file_type'),
-                        original_filename=file_data.get('original_filename'),
-                        file_size=file_data.get('file_size'),
-                        display_order=index
-                    )
-                    db.session.add(doc_file)
+                    doc_files.append(DocumentService._build_file(document, file_data, index))
                     
                     # If this is the first file and document doesn't have file_url, set it from the first file
                     if index == 0 and not document.file_url:
@@ -195,6 +244,12 @@ class DocumentService:
                 db.session.add(guide)
             
             db.session.commit()
+            CacheService.invalidate('documents')
+            
+            # Render previews in the background (the first one becomes the thumbnail if none was given)
+            for doc_file in doc_files:
+                if doc_file.preview_status == 'pending':
+                    PreviewService.enqueue(doc_file.id)
             
             return document, None
             
@@ -202,6 +257,80 @@ class DocumentService:
             db.session.rollback()
             return None, f'Failed to create document: {str(e)}'
     
+    @staticmethod
+    def _build_file(document, file_data, display_order):
+        """
+        Add a DocumentFile to the session (the caller commits)
+        
+        A file whose content_hash already has a finished preview reuses it;
+        other previewable files are marked 'pending' for PreviewService.enqueue.
+        """
+        doc_file = DocumentFile(
+            document_id=document.id,
+            file_url=file_data.get('file_url'),
+            preview_url=file_data.get('preview_url'),
+            preview_status=file_data.get('preview_status'),
+            file_type=file_data.get('file_type'),
+            original_filename=file_data.get('original_filename'),
+            file_size=file_data.get('file_size'),
+            content_hash=file_data.get('content_hash'),
+            display_order=display_order
+        )
+        
+        # Same bytes uploaded before: reuse the finished preview instead of rendering again
+        if not doc_file.preview_url:
+            existing = StorageService.find_preview(doc_file.content_hash)
+            if existing:
+                doc_file.preview_url = existing.preview_url
+                doc_file.preview_renditions = existing.preview_renditions
+                doc_file.preview_status = 'ready'
+            elif PreviewService.can_preview(doc_file.file_type):
+                doc_file.preview_status = 'pending'
+        
+        if display_order == 0 and not document.thumbnail_url and doc_file.preview_status == 'ready':
+            document.thumbnail_url = doc_file.preview_url
+        
+        db.session.add(doc_file)
+        return doc_file
+    
+    @staticmethod
+    def add_file(document_id, file_data):
+        """
+        Attach an uploaded file to an existing document
+        
+        Args:
+            document_id: Document ID
+            file_data: {file_url, file_type, original_filename, file_size, content_hash}
+            
+        Returns:
+            tuple: (document_file, error_message)
+        """
+        try:
+            document = db.session.get(Document, document_id)
+            if not document:
+                return None, 'Document not found'
+            
+            display_order = db.session.query(
+                func.coalesce(func.max(DocumentFile.display_order) + 1, 0)
+            ).filter(DocumentFile.document_id == document_id).scalar()
+            
+            doc_file = DocumentService._build_file(document, file_data, display_order)
+            if not document.file_url:
+                document.file_url = doc_file.file_url
+                document.file_type = doc_file.file_type
+            
+            db.session.commit()
+            CacheService.invalidate('documents')
+            
+            if doc_file.preview_status == 'pending':
+                PreviewService.enqueue(doc_file.id)
+            
+            return doc_file, None
+            
+        except Exception as e:
+            db.session.rollback()
+            return None, f'Failed to add file: {str(e)}'
+    
     @staticmethod
     def update_document(document_id, **kwargs):
         """
@@ -252,6 +381,7 @@ class DocumentService:
                     db.session.add(guide)
             
             db.session.commit()
+            CacheService.invalidate('documents')
             
             return document, None
             
@@ -279,6 +409,7 @@ class DocumentService:
             # Soft delete
             document.is_active = False
             db.session.commit()
+            CacheService.invalidate('documents')
             
             return True, None
             
@@ -300,7 +431,7 @@ class DocumentService:
             list: List of related documents
         """
         try:
-            related = Document.query.filter(
+            related = Document.query.options(selectinload(Document.files)).filter(
                 Document.category_id == category_id,
                 Document.id != document_id,
                 Document.is_active == True
@@ -312,26 +443,10 @@ class DocumentService:
 
     @staticmethod
     def increment_view(document_id):
-        """Increment document view count"""
-        try:
-            document = db.session.get(Document, document_id)
-            if document:
-                document.increment_views()
-                db.session.commit()
-                return True
-        except:
-            db.session.rollback()
-        return False
+        """Increment document view count (buffered, flushed in bulk)"""
+        return CounterService.increment('document_views', document_id)
     
     @staticmethod
     def increment_download(document_id):
-        """Increment document download count"""
-        try:
-            document = db.session.get(Document, document_id)
-            if document:
-                document.increment_downloads()
-                db.session.commit()
-                return True
-        except:
-            db.session.rollback()
-        return False
+        """Increment document download count (buffered, flushed in bulk)"""
+        return CounterService.increment('document_downloads', document_id)
@@ -0,0 +1,106 @@
+"""
+Download token service - HMAC-signed, expiring links to document files
+
+A link carries the file path, an expiry timestamp, the download filename and
+an HMAC-SHA256 over the three, so the file route (or any static tier holding
+DOWNLOAD_URL_SECRET) can check it without touching the database or a session.
+Links are only issued after the purchase check in DownloadDocument.post.
+"""
+import hmac
+import time
+import base64
+import hashlib
+import posixpath
+from urllib.parse import urlencode
+from flask import current_app
+from .storage_service import StorageService, URL_PREFIX
+
+# Served without a signature: uploaded images and the watermarked preview
+# renditions written directly into previews/ (never its subfolders)
+PUBLIC_PREFIXES = ('images/',)
+PREVIEW_FOLDER = 'previews'
+PREVIEW_EXTENSIONS = ('.jpg', '.jpeg', '.webp', '.png')
+
+
+class DownloadTokenService:
+    """Service for signing and verifying download links"""
+
+    @staticmethod
+    def _key():
+        secret = current_app.config.get('DOWNLOAD_URL_SECRET') or current_app.config['SECRET_KEY']
+        return secret.encode('utf-8')
+
+    @staticmethod
+    def sign(relative_path, expires, name=''):
+        """
+        Signature of a path, expiry and download name
+
+        Returns:
+            str: URL-safe base64 HMAC-SHA256 without padding
+        """
+        message = f"{relative_path}\n{expires}\n{name}".encode('utf-8')
+        digest = hmac.new(DownloadTokenService._key(), message, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+    @staticmethod
+    def signed_url(file_url, download_name=None, ttl=None):
+        """
+        Time-limited link to a stored file
+
+        Args:
+            file_url: /uploads/documents/... URL from the database
+            download_name: Filename for Content-Disposition (part of the signature)
+            ttl: Lifetime in seconds (default DOWNLOAD_URL_TTL)
+
+        Returns:
+            str: Relative URL with expires/name/sig query parameters
+        """
+        if not file_url or file_url.startswith('http'):
+            return file_url
+
+        relative = StorageService.relative_path(file_url)
+        if ttl is None:
+            ttl = int(current_app.config.get('DOWNLOAD_URL_TTL', 900))
+        expires = int(time.time()) + ttl
+        name = download_name or ''
+
+        params = {'expires': expires}
+        if name:
+            params['name'] = name
+        params['sig'] = DownloadTokenService.sign(relative, expires, name)
+        return f"{URL_PREFIX}{relative}?{urlencode(params)}"
+
+    @staticmethod
+    def verify(relative_path, expires, sig, name=''):
+        """
+        Check a signed link (no database or session access)
+
+        Args:
+            relative_path: Path inside UPLOAD_FOLDER, as routed
+            expires: 'expires' query parameter
+            sig: 'sig' query parameter
+            name: 'name' query parameter
+
+        Returns:
+            bool: True if the signature matches and the link has not expired
+        """
+        try:
+            expires = int(expires)
+        except (TypeError, ValueError):
+            return False
+        if not sig or expires < time.time():
+            return False
+        expected = DownloadTokenService.sign(relative_path, expires, name or '')
+        return hmac.compare_digest(expected, sig)
+
+    @staticmethod
+    def is_protected(relative_path):
+        """Check if a file needs a signed link (document files, not previews or images)"""
+        if not current_app.config.get('DOWNLOAD_SIGNATURE_REQUIRED', True):
+            return False
+        # Normalize first so previews/../objects/... cannot pass as a preview
+        path = posixpath.normpath(relative_path.lstrip('/'))
+        if path.startswith(PUBLIC_PREFIXES):
+            return False
+        folder, name = posixpath.split(path)
+        return not (folder == PREVIEW_FOLDER and name.lower().endswith(PREVIEW_EXTENSIONS))
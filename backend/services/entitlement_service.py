@@ -0,0 +1,238 @@
+"""
+Entitlement service - answers "does user U own document D"
+
+Ownership is materialized in user_document_entitlements, filled in the same
+transaction that completes a purchase, so checks are primary-key lookups.
+"""
+from flask import g, has_app_context
+from sqlalchemy import select, func, union_all, literal
+from sqlalchemy.orm import joinedload, selectinload
+from models import db, Transaction, PackageDocument, Document, UserDocumentEntitlement
+
+
+class EntitlementService:
+    """Service for document ownership checks"""
+
+    @staticmethod
+    def _memo():
+        """Per-request (app context) memo of {(user_id, document_id): bool}"""
+        if not has_app_context():
+            return {}
+        if '_entitlement_memo' not in g:
+            g._entitlement_memo = {}
+        return g._entitlement_memo
+
+    @staticmethod
+    def user_owns_document(user_id, document_id):
+        """
+        Check ownership with a primary-key lookup
+
+        Args:
+            user_id: User ID
+            document_id: Document ID
+
+        Returns:
+            bool: True if the user owns the document
+        """
+        if not user_id or not document_id:
+            return False
+
+        memo = EntitlementService._memo()
+        key = (user_id, document_id)
+        if key in memo:
+            return memo[key]
+
+        owned = db.session.execute(
+            select(literal(True)).where(
+                UserDocumentEntitlement.user_id == user_id,
+                UserDocumentEntitlement.document_id == document_id
+            )
+        ).first() is not None
+        memo[key] = owned
+        return owned
+
+    @staticmethod
+    def owned_document_ids(user_id, document_ids):
+        """
+        Batch ownership check for list pages (one index range scan for all IDs)
+
+        Args:
+            user_id: User ID
+            document_ids: Iterable of document IDs
+
+        Returns:
+            set: Subset of document_ids the user owns
+        """
+        document_ids = {doc_id for doc_id in document_ids if doc_id}
+        if not user_id or not document_ids:
+            return set()
+
+        memo = EntitlementService._memo()
+        owned = {doc_id for doc_id in document_ids if memo.get((user_id, doc_id))}
+        pending = [doc_id for doc_id in document_ids if (user_id, doc_id) not in memo]
+        if not pending:
+            return owned
+
+        found = set(db.session.execute(
+            select(UserDocumentEntitlement.document_id).where(
+                UserDocumentEntitlement.user_id == user_id,
+                UserDocumentEntitlement.document_id.in_(pending)
+            )
+        ).scalars())
+        for doc_id in pending:
+            memo[(user_id, doc_id)] = doc_id in found
+        return owned | found
+
+    @staticmethod
+    def get_owned_documents(user_id):
+        """
+        Get all documents a user owns (one index range scan joined to documents)
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            list: Documents, most recently acquired first
+        """
+        return Document.query.options(
+            joinedload(Document.category), selectinload(Document.files)
+        ).join(
+            UserDocumentEntitlement, UserDocumentEntitlement.document_id == Document.id
+        ).filter(
+            UserDocumentEntitlement.user_id == user_id
+        ).order_by(UserDocumentEntitlement.created_at.desc()).all()
+
+    @staticmethod
+    def grant_for_transaction(transaction):
+        """
+        Add entitlements for a completed document/package purchase
+
+        Runs inside the caller's transaction; the caller commits.
+
+        Args:
+            transaction: Completed Transaction
+
+        Returns:
+            int: Number of entitlements added
+        """
+        if transaction.transaction_type == 'document' and transaction.document_id:
+            document_ids = [transaction.document_id]
+        elif transaction.transaction_type == 'package' and transaction.package_id:
+            document_ids = list(db.session.execute(
+                select(PackageDocument.document_id).where(
+                    PackageDocument.package_id == transaction.package_id
+                )
+            ).scalars())
+        else:
+            return 0
+
+        if not document_ids:
+            return 0
+
+        db.session.flush()  # Make sure the transaction row (FK target) exists
+        existing = set(db.session.execute(
+            select(UserDocumentEntitlement.document_id).where(
+                UserDocumentEntitlement.user_id == transaction.user_id,
+                UserDocumentEntitlement.document_id.in_(document_ids)
+            )
+        ).scalars())
+
+        added = 0
+        for document_id in document_ids:
+            if document_id in existing:
+                continue
+            db.session.add(UserDocumentEntitlement(
+                user_id=transaction.user_id,
+                document_id=document_id,
+                transaction_id=transaction.id
+            ))
+            added += 1
+
+        EntitlementService.clear_memo(transaction.user_id)
+        return added
+
+    @staticmethod
+    def _purchases_query(document_id=None):
+        """
+        (user_id, document_id, transaction_id, created_at) for every owned document
+
+        One row per pair, taken from the earliest completed purchase of it
+        (ordered by transactions.created_at).
+        """
+        direct = select(
+            Transaction.user_id.label('user_id'),
+            Transaction.document_id.label('document_id'),
+            Transaction.id.label('transaction_id'),
+            Transaction.created_at.label('created_at')
+        ).where(
+            Transaction.status == 'completed',
+            Transaction.transaction_type == 'document',
+            Transaction.document_id.isnot(None)
+        )
+        via_package = select(
+            Transaction.user_id.label('user_id'),
+            PackageDocument.document_id.label('document_id'),
+            Transaction.id.label('transaction_id'),
+            Transaction.created_at.label('created_at')
+        ).join(
+            PackageDocument, PackageDocument.package_id == Transaction.package_id
+        ).where(
+            Transaction.status == 'completed',
+            Transaction.transaction_type == 'package'
+        )
+        if document_id:
+            direct = direct.where(Transaction.document_id == document_id)
+            via_package = via_package.where(PackageDocument.document_id == document_id)
+
+        purchases = union_all(direct, via_package).subquery('purchases')
+        ranked = select(
+            purchases,
+            func.row_number().over(
+                partition_by=(purchases.c.user_id, purchases.c.document_id),
+                order_by=(purchases.c.created_at, purchases.c.transaction_id)
+            ).label('purchase_rank')
+        ).subquery('ranked')
+        return select(
+            ranked.c.user_id,
+            ranked.c.document_id,
+            ranked.c.transaction_id,
+            func.coalesce(ranked.c.created_at, func.now())
+        ).where(ranked.c.purchase_rank == 1)
+
+    @staticmethod
+    def rebuild(document_id=None):
+        """
+        Rebuild entitlements from the transactions table
+
+        Used by the backfill command and when package contents change.
+        The caller commits.
+
+        Args:
+            document_id: Only rebuild rows for this document (None = everything)
+
+        Returns:
+            int: Number of entitlements written
+        """
+        table = UserDocumentEntitlement.__table__
+        delete = table.delete()
+        if document_id:
+            delete = delete.where(table.c.document_id == document_id)
+        db.session.execute(delete)
+
+        result = db.session.execute(table.insert().from_select(
+            ['user_id', 'document_id', 'transaction_id', 'created_at'],
+            EntitlementService._purchases_query(document_id)
+        ))
+
+        EntitlementService.clear_memo()
+        return result.rowcount
+
+    @staticmethod
+    def clear_memo(user_id=None):
+        """Forget memoized answers after entitlements change"""
+        memo = EntitlementService._memo()
+        if user_id is None:
+            memo.clear()
+            return
+        for key in [key for key in memo if key[0] == user_id]:
+            del memo[key]
@@ -0,0 +1,141 @@
+"""
+File delivery service - serves files under UPLOAD_FOLDER
+
+FILE_DELIVERY_MODE selects who streams the bytes:
+  - 'flask':      in-process send_file with Range, strong ETags and Cache-Control
+  - 'x-accel':    empty response with X-Accel-Redirect for an nginx internal location
+  - 'x-sendfile': empty response with X-Sendfile for Apache/lighttpd
+"""
+import os
+import re
+import time
+import hashlib
+import mimetypes
+import threading
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import quote
+from flask import current_app, request, send_file, abort, make_response
+from werkzeug.security import safe_join
+
+# Names containing a SHA-256 never change content (content-addressed objects and their previews)
+CONTENT_HASH_RE = re.compile(r'[0-9a-f]{64}')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def set_attachment(response, download_name):
+    """Content-Disposition: attachment, with an RFC 5987 filename* for non-ASCII names"""
+    try:
+        download_name.encode('ascii')
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        response.headers.set('Content-Disposition', 'attachment', filename=simple,
+                             **{'filename*': f"UTF-8''{quote(download_name, safe='')}"})
+
+
+class FileDeliveryService:
+    """Service for serving uploaded files"""
+
+    _etags = OrderedDict()  # (path, mtime, size) -> sha256, for files without a hash in the name
+    _etags_lock = threading.Lock()
+    _etags_max = 4096
+
+    @staticmethod
+    def is_immutable(relative_path):
+        """Check if a file name is content-addressed"""
+        return CONTENT_HASH_RE.search(os.path.basename(relative_path)) is not None
+
+    @classmethod
+    def etag_for(cls, path, relative_path):
+        """
+        Strong ETag derived from the file content
+
+        Content-addressed names already carry the hash; other files are hashed
+        once per (mtime, size) and remembered.
+        """
+        name = os.path.basename(relative_path)
+        if cls.is_immutable(relative_path):
+            return name
+
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with cls._etags_lock:
+            etag = cls._etags.get(key)
+            if etag:
+                cls._etags.move_to_end(key)
+                return etag
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()
+
+        with cls._etags_lock:
+            cls._etags[key] = etag
+            while len(cls._etags) > cls._etags_max:
+                cls._etags.popitem(last=False)
+        return etag
+
+    @classmethod
+    def send(cls, relative_path, download_name=None, expires=None):
+        """
+        Serve a file from UPLOAD_FOLDER
+
+        Args:
+            relative_path: Path inside UPLOAD_FOLDER (from the URL)
+            download_name: Optional filename for Content-Disposition: attachment
+            expires: Expiry of a signed link; the response is then private and
+                     cacheable only until the link expires
+
+        Returns:
+            Response
+        """
+        upload_folder = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+        path = safe_join(upload_folder, relative_path)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        immutable = cls.is_immutable(relative_path) and expires is None
+        max_age = IMMUTABLE_MAX_AGE if immutable else int(current_app.config.get('FILE_CACHE_MAX_AGE', 3600))
+        if expires is not None:
+            max_age = max(0, min(max_age, int(expires - time.time())))
+        etag = cls.etag_for(path, relative_path)
+        mode = current_app.config.get('FILE_DELIVERY_MODE', 'flask')
+
+        if mode in ('x-accel', 'x-sendfile'):
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response('')
+                response.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+                if mode == 'x-accel':
+                    prefix = current_app.config.get('X_ACCEL_PREFIX', '/protected-uploads/')
+                    response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + relative_path.lstrip('/')
+                else:
+                    response.headers['X-Sendfile'] = path
+                if download_name:
+                    set_attachment(response, download_name)
+            response.set_etag(etag)
+        else:
+            response = send_file(
+                path,
+                conditional=True,  # Range / If-Range / If-None-Match
+                etag=etag,
+                max_age=max_age,
+                as_attachment=bool(download_name),
+                download_name=download_name
+            )
+
+        if expires is None:
+            response.cache_control.public = True
+        else:
+            # Signed content must not be stored by shared caches (send_file sets public)
+            response.cache_control.public = False
+            response.cache_control.private = True
+        response.cache_control.max_age = max_age
+        if immutable:
+            response.cache_control.immutable = True
+        return response
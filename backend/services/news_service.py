@@ -3,6 +3,9 @@ import json
 from flask import current_app
 from models import db, News
 from datetime import datetime
+from .counter_service import CounterService
+from .pagination_service import PaginationService
+from .cache_service import CacheService
 
 class NewsService:
     @staticmethod
@@ -89,6 +92,7 @@ Hãy trình bày kết quả dưới định dạng JSON như sau:
             news.generate_slug()
             db.session.add(news)
             db.session.commit()
+            CacheService.invalidate('news')
             return news, 201
         except Exception as e:
             db.session.rollback()
@@ -99,14 +103,22 @@ Hãy trình bày kết quả dưới định dạng JSON như sau:
         """Get paginated news list"""
         pagination = News.query.filter_by(is_active=True)\
             .order_by(News.created_at.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+            .paginate(page=page, per_page=per_page, max_per_page=PaginationService.max_per_page(), error_out=False)
         return pagination
 
+    @staticmethod
+    def get_news_keyset(cursor='', per_page=10, total=None):
+        """Get news list with keyset pagination (see PaginationService.paginate_keyset)"""
+        query = News.query.filter_by(is_active=True)
+        return PaginationService.paginate_keyset(
+            query, News.created_at, News.id,
+            cursor=cursor, per_page=per_page, total=total
+        )
+
     @staticmethod
     def get_news_by_slug(slug):
         """Get single news by slug"""
         news = News.query.filter_by(slug=slug, is_active=True).first()
         if news:
-            news.views_count += 1
-            db.session.commit()
+            CounterService.increment('news_views', news.id)
         return news
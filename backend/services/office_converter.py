@@ -0,0 +1,210 @@
+"""
+Office converter - DOC/DOCX/XLS/XLSX to PDF through a long-lived headless LibreOffice
+
+Each preview worker process keeps one unoserver instance running and sends it
+conversions over XML-RPC, so LibreOffice starts once per worker instead of
+once per file. Concurrency is therefore bounded by PREVIEW_WORKERS. Without
+the unoserver package it falls back to one `soffice --convert-to` per file.
+"""
+import os
+import time
+import socket
+import atexit
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# File types converted to PDF before rendering the preview
+OFFICE_TYPES = {'doc', 'docx', 'xls', 'xlsx'}
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _free_port():
+    """Ask the OS for an unused local TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class OfficeConverter:
+    """One long-lived LibreOffice (unoserver) per process"""
+
+    def __init__(self, timeout=60, unoserver_path='unoserver', soffice_path='soffice', startup_timeout=30):
+        self.timeout = timeout
+        self.unoserver_path = unoserver_path
+        self.soffice_path = soffice_path
+        self.startup_timeout = startup_timeout
+        self._lock = threading.Lock()
+        self._process = None
+        self._port = None
+        self._profile_dir = None
+
+        try:
+            from unoserver.client import UnoClient  # Optional dependency
+            self._client_class = UnoClient
+        except ImportError:
+            logger.warning("unoserver is not installed, converting with one soffice process per file")
+            self._client_class = None
+
+    def convert(self, src_path, pdf_path):
+        """
+        Convert the first page of an office file to PDF
+
+        Args:
+            src_path: Source DOC/DOCX/XLS/XLSX path
+            pdf_path: Output PDF path
+
+        Raises:
+            TimeoutError: If LibreOffice does not finish within the timeout
+            RuntimeError: If the conversion fails
+        """
+        with self._lock:
+            if self._client_class is None:
+                self._convert_with_soffice(src_path, pdf_path)
+            else:
+                self._convert_with_unoserver(src_path, pdf_path)
+
+        if not os.path.exists(pdf_path) or os.path.getsize(pdf_path) == 0:
+            raise RuntimeError(f'LibreOffice produced no output for {os.path.basename(src_path)}')
+
+    def _ensure_server(self):
+        """Start unoserver if it is not running"""
+        if self._process is not None and self._process.poll() is None:
+            return
+
+        self._profile_dir = self._profile_dir or tempfile.mkdtemp(prefix='unoserver_profile_')
+        self._port = _free_port()
+        self._process = subprocess.Popen(
+            [
+                self.unoserver_path,
+                '--interface', '127.0.0.1',
+                '--port', str(self._port),
+                '--uno-port', str(_free_port()),
+                '--user-installation', f'file://{self._profile_dir}'
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f'unoserver exited with code {self._process.returncode}')
+            try:
+                with socket.create_connection(('127.0.0.1', self._port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+
+        self._stop_server()
+        raise TimeoutError('unoserver did not start in time')
+
+    def _convert_with_unoserver(self, src_path, pdf_path):
+        self._ensure_server()
+        client = self._client_class(server='127.0.0.1', port=str(self._port))
+        errors = []
+
+        def run():
+            try:
+                try:
+                    client.convert(inpath=src_path, outpath=pdf_path, convert_to='pdf',
+                                   filter_options=['PageRange=1'])
+                except TypeError:
+                    # Older unoserver without filter options
+                    client.convert(inpath=src_path, outpath=pdf_path, convert_to='pdf')
+            except Exception as e:
+                errors.append(e)
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        worker.join(self.timeout)
+
+        if worker.is_alive():
+            # A stuck LibreOffice is restarted on the next conversion
+            self._stop_server()
+            raise TimeoutError(f'Conversion timed out after {self.timeout}s')
+        if errors:
+            raise RuntimeError(f'Conversion failed: {errors[0]}')
+
+    def _convert_with_soffice(self, src_path, pdf_path):
+        self._profile_dir = self._profile_dir or tempfile.mkdtemp(prefix='soffice_profile_')
+        out_dir = tempfile.mkdtemp(prefix='soffice_out_')
+        try:
+            try:
+                subprocess.run(
+                    [
+                        self.soffice_path, '--headless', '--norestore',
+                        f'-env:UserInstallation=file://{self._profile_dir}',
+                        '--convert-to', 'pdf', '--outdir', out_dir, src_path
+                    ],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    timeout=self.timeout,
+                    check=True
+                )
+            except subprocess.TimeoutExpired:
+                raise TimeoutError(f'Conversion timed out after {self.timeout}s')
+            except subprocess.CalledProcessError as e:
+                raise RuntimeError(f'soffice exited with code {e.returncode}')
+
+            produced = os.path.join(out_dir, f"{os.path.splitext(os.path.basename(src_path))[0]}.pdf")
+            if os.path.exists(produced):
+                shutil.move(produced, pdf_path)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def _stop_server(self):
+        if self._process is not None and self._process.poll() is None:
+            try:
+                os.killpg(self._process.pid, 9)
+            except Exception:
+                self._process.kill()
+        self._process = None
+
+    def close(self):
+        """Stop LibreOffice and remove its profile"""
+        self._stop_server()
+        if self._profile_dir:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+            self._profile_dir = None
+
+
+_converter = None
+_converter_pid = None
+_converter_lock = threading.Lock()
+
+
+def get_converter(options=None):
+    """
+    Per-process converter (created on first use, stopped at process exit)
+
+    Args:
+        options: {timeout, unoserver_path, soffice_path}
+    """
+    global _converter, _converter_pid
+    with _converter_lock:
+        if _converter is None or _converter_pid != os.getpid():
+            _converter = OfficeConverter(**(options or {}))
+            _converter_pid = os.getpid()
+            atexit.register(_converter.close)
+            try:
+                # Process pool workers exit without running atexit handlers
+                from multiprocessing import util
+                util.Finalize(_converter, _converter.close, exitpriority=10)
+            except Exception:
+                pass
+        return _converter
@@ -2,6 +2,9 @@
 Package service for managing document packages
 """
 from models import db, DocumentPackage, PackageDocument, Document
+from .entitlement_service import EntitlementService
+from .cache_service import CacheService
+from .pagination_service import PaginationService
 
 
 class PackageService:
@@ -27,7 +30,7 @@ class PackageService:
         
         query = query.order_by(DocumentPackage.created_at.desc())
         
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = query.paginate(page=page, per_page=per_page, max_per_page=PaginationService.max_per_page(), error_out=False)
         
         return {
             'packages': [pkg.to_dict(include_documents=True) for pkg in pagination.items],
@@ -86,6 +89,7 @@ class PackageService:
                         db.session.add(pkg_doc)
             
             db.session.commit()
+            CacheService.invalidate('packages')
             
             return package, None
             
@@ -130,6 +134,7 @@ class PackageService:
                 package.is_active = is_active
             
             db.session.commit()
+            CacheService.invalidate('packages')
             
             return package, None
             
@@ -157,6 +162,7 @@ class PackageService:
             # Soft delete
             package.is_active = False
             db.session.commit()
+            CacheService.invalidate('packages')
             
             return True, None
             
@@ -201,7 +207,12 @@ class PackageService:
                 document_id=document_id
             )
             db.session.add(pkg_doc)
+            db.session.flush()
+            
+            # Buyers of this package now own the document too
+            EntitlementService.rebuild(document_id)
             db.session.commit()
+            CacheService.invalidate('packages')
             
             return True, None
             
@@ -231,7 +242,12 @@ class PackageService:
                 return False, 'Document not in package'
             
             db.session.delete(pkg_doc)
+            db.session.flush()
+            
+            # Keep the document only for users with another purchase covering it
+            EntitlementService.rebuild(document_id)
             db.session.commit()
+            CacheService.invalidate('packages')
             
             return True, None
             
@@ -0,0 +1,164 @@
+"""
+Pagination service - keyset (cursor) pagination for list endpoints
+"""
+import json
+import base64
+from datetime import datetime
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import and_, or_, text
+from models import db
+
+
+class PaginationService:
+    """Service for cursor-based pagination"""
+
+    @staticmethod
+    def encode_cursor(sort_value, item_id):
+        """
+        Build an opaque cursor from the last row's sort value and ID
+
+        Args:
+            sort_value: Value of the sort column on the last row
+            item_id: ID of the last row
+
+        Returns:
+            str: URL-safe cursor
+        """
+        if isinstance(sort_value, datetime):
+            value = {'dt': sort_value.isoformat()}
+        elif isinstance(sort_value, Decimal):
+            value = {'dec': str(sort_value)}
+        else:
+            value = sort_value
+        raw = json.dumps([value, item_id], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Parse a cursor produced by encode_cursor
+
+        Args:
+            cursor: Opaque cursor string
+
+        Returns:
+            tuple: (sort_value, item_id)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if isinstance(value, dict) and list(value) == ['dt']:
+                value = datetime.fromisoformat(value['dt'])
+            elif isinstance(value, dict) and list(value) == ['dec']:
+                value = Decimal(value['dec'])
+        except Exception:
+            raise ValueError('Invalid cursor')
+
+        # Anything else (lists, objects) would reach the SQL comparison and fail there
+        if value is not None and not isinstance(value, (str, int, float, datetime, Decimal)):
+            raise ValueError('Invalid cursor')
+        if isinstance(item_id, bool) or not isinstance(item_id, (str, int)):
+            raise ValueError('Invalid cursor')
+        return value, item_id
+
+    @staticmethod
+    def estimate_count(query):
+        """
+        Cheap row estimate from the PostgreSQL planner (None elsewhere)
+
+        Args:
+            query: SQLAlchemy ORM query
+
+        Returns:
+            int: Estimated rows, or None if unavailable
+        """
+        if db.engine.dialect.name != 'postgresql':
+            return None
+        try:
+            statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+            # Savepoint: a failed EXPLAIN must not discard the caller's pending work
+            with db.session.begin_nested():
+                plan = db.session.execute(text(f'EXPLAIN (FORMAT JSON) {statement}')).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception:
+            return None
+
+    @staticmethod
+    def max_per_page():
+        """Largest page size either pagination path returns (MAX_PAGE_SIZE)"""
+        return int(current_app.config.get('MAX_PAGE_SIZE', 100))
+
+    @staticmethod
+    def paginate_keyset(query, sort_column, id_column, cursor=None, per_page=20,
+                        descending=True, total=None):
+        """
+        Seek-based pagination on (sort_column, id)
+
+        Unlike paginate(), no OFFSET is used and COUNT(*) only runs on request,
+        so every page costs the same regardless of depth.
+
+        Args:
+            query: Filtered ORM query (any existing ORDER BY is replaced)
+            sort_column: Column to sort on
+            id_column: Unique tie-breaker column
+            cursor: Cursor from the previous page (None for the first page)
+            per_page: Items per page (clamped to 1..max_per_page())
+            descending: Sort direction
+            total: None (skip), 'exact' (COUNT(*)) or 'estimate' (planner estimate)
+
+        Returns:
+            dict: {items, per_page, next_cursor, has_next, total}
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        per_page = max(1, min(int(per_page), PaginationService.max_per_page()))
+
+        total_count = None
+        if total == 'exact':
+            total_count = query.order_by(None).count()
+        elif total == 'estimate':
+            total_count = PaginationService.estimate_count(query.order_by(None))
+
+        if cursor:
+            sort_value, last_id = PaginationService.decode_cursor(cursor)
+            if descending:
+                query = query.filter(or_(
+                    sort_column < sort_value,
+                    and_(sort_column == sort_value, id_column < last_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    sort_column > sort_value,
+                    and_(sort_column == sort_value, id_column > last_id)
+                ))
+
+        if descending:
+            query = query.order_by(None).order_by(sort_column.desc(), id_column.desc())
+        else:
+            query = query.order_by(None).order_by(sort_column.asc(), id_column.asc())
+
+        rows = query.limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+
+        next_cursor = None
+        if has_next and items:
+            last = items[-1]
+            next_cursor = PaginationService.encode_cursor(
+                getattr(last, sort_column.key), getattr(last, id_column.key)
+            )
+
+        return {
+            'items': items,
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': has_next,
+            'total': total_count
+        }
@@ -0,0 +1,146 @@
+"""
+Payment notifier - wake requests waiting for a payment to leave 'pending'
+
+Code that completes or cancels a SePay payment calls notify() before it
+commits. After the commit, waiters in this process are woken directly. On
+PostgreSQL the notification also goes out with pg_notify in the same
+transaction, and a LISTEN thread wakes waiters in every other worker.
+Without PostgreSQL, waiters recheck the database every keepalive period
+instead.
+"""
+import os
+import time
+import select
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from models import db
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentNotifier:
+    """In-process notification hub for payment status changes"""
+
+    CHANNEL = 'sepay_payments'
+    SESSION_KEY = 'payment_notifications'
+    IDS_PER_NOTIFY = 200  # pg_notify payloads are limited to 8000 bytes
+
+    _app = None
+    _waiters = defaultdict(set)
+    _lock = threading.Lock()
+    _listener = None
+    _listener_pid = None
+    _start_lock = threading.Lock()
+    _events_registered = False
+
+    @classmethod
+    def init_app(cls, app):
+        """Configure the hub for an app"""
+        cls._app = app
+        if not cls._events_registered:
+            event.listen(Session, 'after_commit', cls._after_commit)
+            event.listen(Session, 'after_rollback', cls._after_rollback)
+            cls._events_registered = True
+
+    @classmethod
+    def notify(cls, *transaction_ids):
+        """
+        Announce status changes of transactions; delivered when the session commits
+
+        Args:
+            transaction_ids: IDs of transactions that left 'pending'
+        """
+        ids = [str(transaction_id) for transaction_id in transaction_ids if transaction_id]
+        if not ids:
+            return
+        db.session.info.setdefault(cls.SESSION_KEY, set()).update(ids)
+
+        if db.engine.dialect.name == 'postgresql':
+            # NOTIFY is transactional: sent on commit, dropped on rollback
+            for start in range(0, len(ids), cls.IDS_PER_NOTIFY):
+                db.session.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {'channel': cls.CHANNEL, 'payload': ','.join(ids[start:start + cls.IDS_PER_NOTIFY])}
+                )
+
+    @classmethod
+    @contextmanager
+    def subscribe(cls, transaction_id):
+        """
+        Wait for notifications about one transaction
+
+        Yields a threading.Event that is set when the transaction is
+        notified; clear it after each wake-up.
+        """
+        notified = threading.Event()
+        with cls._lock:
+            cls._waiters[transaction_id].add(notified)
+        cls._ensure_listener()
+        try:
+            yield notified
+        finally:
+            with cls._lock:
+                waiters = cls._waiters.get(transaction_id)
+                if waiters is not None:
+                    waiters.discard(notified)
+                    if not waiters:
+                        del cls._waiters[transaction_id]
+
+    @classmethod
+    def _wake(cls, transaction_ids):
+        with cls._lock:
+            waiters = [w for transaction_id in transaction_ids for w in cls._waiters.get(transaction_id, ())]
+        for notified in waiters:
+            notified.set()
+
+    @classmethod
+    def _after_commit(cls, session):
+        ids = session.info.pop(cls.SESSION_KEY, None)
+        if ids:
+            cls._wake(ids)
+
+    @classmethod
+    def _after_rollback(cls, session):
+        session.info.pop(cls.SESSION_KEY, None)
+
+    @classmethod
+    def _ensure_listener(cls):
+        """Start the LISTEN thread on PostgreSQL (again after a fork)"""
+        if cls._app is None or db.engine.dialect.name != 'postgresql':
+            return
+        if cls._listener is not None and cls._listener.is_alive() and cls._listener_pid == os.getpid():
+            return
+        with cls._start_lock:
+            if cls._listener is not None and cls._listener.is_alive() and cls._listener_pid == os.getpid():
+                return
+            cls._listener = threading.Thread(target=cls._listen, name='payment-notifier', daemon=True)
+            cls._listener_pid = os.getpid()
+            cls._listener.start()
+
+    @classmethod
+    def _listen(cls):
+        """Relay NOTIFY messages to local waiters, reconnecting after errors"""
+        while True:
+            try:
+                with cls._app.app_context():
+                    connection = db.engine.raw_connection()
+                connection.detach()  # Autocommit + LISTEN must not go back to the pool
+                try:
+                    dbapi_connection = connection.driver_connection
+                    dbapi_connection.autocommit = True
+                    dbapi_connection.cursor().execute(f'LISTEN {cls.CHANNEL}')
+                    while True:
+                        if select.select([dbapi_connection], [], [], 30) == ([], [], []):
+                            continue
+                        dbapi_connection.poll()
+                        while dbapi_connection.notifies:
+                            cls._wake(dbapi_connection.notifies.pop(0).payload.split(','))
+                finally:
+                    connection.close()
+            except Exception as e:
+                logger.warning(f"Payment notification listener failed, reconnecting: {e}")
+                time.sleep(5)
@@ -1,126 +1,529 @@
 """
 Preview service for generating document previews
+
+Rendering runs in a local process pool (PREVIEW_WORKERS) so uploads return
+immediately; DocumentFile.preview_status tracks each job
+(pending -> ready | failed) and failed jobs are retried with backoff.
 """
 import os
 import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial, lru_cache
 from config import config
 # from pdf2image import convert_from_path # Replaced by fitz
-import io
+import json
+import tempfile
 from PIL import Image, ImageFilter
 
 logger = logging.getLogger(__name__)
 
 from flask import current_app
 
+from .office_converter import OFFICE_TYPES, file_sha256, get_converter
+
+# File types with a visual preview (office files are converted to PDF first)
+PREVIEW_TYPES = {'pdf'} | OFFICE_TYPES
+
+WATERMARK_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets', 'watermark.png')
+WATERMARK_WIDTH_RATIO = 0.5  # Watermark width relative to the page
+
+# Preview renditions: pixel widths below full size, each saved in every format
+RENDITION_WIDTHS = (200, 480)
+RENDITION_FORMATS = ('webp', 'jpeg')
+
+
+@lru_cache(maxsize=1)
+def _watermark_source():
+    """Decoded RGBA watermark, loaded once per process (None if missing)"""
+    if not os.path.exists(WATERMARK_PATH):
+        logger.warning("Watermark file not found, skipping watermark.")
+        return None
+    with Image.open(WATERMARK_PATH) as source:
+        return source.convert("RGBA")
+
+
+@lru_cache(maxsize=32)
+def get_watermark(target_width):
+    """
+    Watermark resized to target_width, cached per width
+
+    Pages of one document (and most documents) share a size, so the LANCZOS
+    resize runs once per distinct width instead of once per preview.
+    """
+    source = _watermark_source()
+    if source is None or target_width <= 0:
+        return None
+    ratio = target_width / float(source.width)
+    target_height = max(int(source.height * ratio), 1)
+    return source.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+
+def apply_watermark(image):
+    """
+    Paste the centered watermark onto an RGB page image in place
+
+    The watermark's own alpha is the paste mask, which gives the same result as
+    alpha-compositing a full-page transparent layer without allocating one.
+
+    Args:
+        image: PIL image of the page
+
+    Returns:
+        PIL.Image: RGB image with the watermark (the original on failure)
+    """
+    try:
+        watermark = get_watermark(int(image.width * WATERMARK_WIDTH_RATIO))
+        if watermark is None:
+            return image
+
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Calculate position (Center)
+        x = int((image.width - watermark.width) / 2)
+        y = int((image.height - watermark.height) / 2)
+        image.paste(watermark, (x, y), watermark)
+        return image
+
+    except Exception as wm_error:
+        logger.error(f"Failed to apply watermark: {wm_error}")
+        return image # Fallback to original
+
+
+def _save_rendition(image, previews_folder, base_name, width, fmt):
+    """Save one rendition and return its {width, format, url} entry"""
+    suffix = '' if width is None else f'_{width}'
+    ext = 'jpg' if fmt == 'jpeg' else fmt
+    preview_filename = f"{base_name}_preview{suffix}.{ext}"
+    preview_path = os.path.join(previews_folder, preview_filename)
+
+    if fmt == 'webp':
+        image.save(preview_path, 'WEBP', quality=80, method=4)
+    else:
+        image.save(preview_path, 'JPEG', quality=85 if width else 90, optimize=True, progressive=True)
+
+    # Keep it consistent with the existing serving route: /uploads/documents/<filename>
+    return {
+        'width': image.width,
+        'format': fmt,
+        'url': f"/uploads/documents/previews/{preview_filename}"
+    }
+
+
+def render_pdf_preview(file_path, previews_folder, base_name=None):
+    """
+    Render page 1 of a PDF with the watermark as a set of renditions
+
+    Each width in RENDITION_WIDTHS (plus full size) is rasterized directly at
+    that scale through fitz.Matrix, watermarked and saved as WebP and JPEG.
+    Runs inside the preview process pool, so it must not touch Flask or the DB.
+
+    Args:
+        file_path: Absolute path to the PDF
+        previews_folder: Folder to write the preview into
+        base_name: Preview file name prefix (default: the PDF's name)
+
+    Returns:
+        dict: {preview_url, renditions} where preview_url is the full-size JPEG
+              and renditions is a list of {width, format, url}
+
+    Raises:
+        Exception: If the PDF cannot be rendered
+    """
+    import fitz  # PyMuPDF
+
+    # 1. Open PDF
+    doc = fitz.open(file_path)
+    try:
+        if doc.page_count < 1:
+            raise ValueError('PDF has no pages')
+
+        # 2. Get first page
+        page = doc.load_page(0)
+        page_width = page.rect.width
+
+        os.makedirs(previews_folder, exist_ok=True)
+        base_name = base_name or os.path.splitext(os.path.basename(file_path))[0]
+
+        renditions = []
+        preview_url = None
+        targets = [w for w in RENDITION_WIDTHS if w < page_width] + [None]
+        for width in targets:
+            # 3. Render page straight at the target scale (None = full size, 72 dpi)
+            scale = 1 if width is None else width / page_width
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+
+            # 4. Convert to PIL Image
+            image = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+
+            # 5. Add Watermark (Logo)
+            image = apply_watermark(image)
+
+            # 6. Save renditions
+            for fmt in RENDITION_FORMATS:
+                entry = _save_rendition(image, previews_folder, base_name, width, fmt)
+                renditions.append(entry)
+                if width is None and fmt == 'jpeg':
+                    preview_url = entry['url']
+    finally:
+        doc.close()
+
+    return {'preview_url': preview_url, 'renditions': renditions}
+
+
+def render_office_preview(file_path, previews_folder, office_options=None):
+    """
+    Convert an office file to PDF and render its preview, cached by content hash
+
+    The intermediate PDF is the whole document, so it is written to a private
+    temporary folder and deleted once page 1 is rendered; only the watermarked
+    renditions land in previews_folder. Identical files (the same template
+    uploaded twice) reuse the renditions through a manifest kept outside the
+    public folder, without starting LibreOffice.
+
+    Args:
+        file_path: Absolute path to the DOC/DOCX/XLS/XLSX file
+        previews_folder: Folder to write the preview into
+        office_options: OfficeConverter options {timeout, unoserver_path, soffice_path}
+
+    Returns:
+        dict: {preview_url, renditions} (see render_pdf_preview)
+    """
+    content_hash = file_sha256(file_path)
+    manifest_folder = os.path.join(os.path.dirname(previews_folder), 'tmp', 'office')
+    os.makedirs(manifest_folder, exist_ok=True)
+    manifest_path = os.path.join(manifest_folder, f"{content_hash}.json")
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            result = json.load(f)
+        if all(os.path.exists(os.path.join(previews_folder, os.path.basename(r['url']))) for r in result['renditions']):
+            return result
+
+    with tempfile.TemporaryDirectory(prefix='office-preview-') as work_dir:
+        pdf_path = os.path.join(work_dir, f"{content_hash}.pdf")
+        get_converter(office_options).convert(file_path, pdf_path)
+        result = render_pdf_preview(pdf_path, previews_folder, base_name=content_hash)
+
+    tmp_manifest = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_manifest, 'w') as f:
+        json.dump(result, f)
+    os.replace(tmp_manifest, manifest_path)
+    return result
+
+
+def render_preview(file_path, file_type, previews_folder, office_options=None):
+    """
+    Render the preview of any supported file (process pool entry point)
+
+    Args:
+        file_path: Absolute path to the file
+        file_type: File extension (pdf, doc, docx, xls, xlsx)
+        previews_folder: Folder to write the preview into
+        office_options: OfficeConverter options for office files
+
+    Returns:
+        dict: {preview_url, renditions}
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    file_type = (file_type or '').lower()
+    if file_type in OFFICE_TYPES:
+        return render_office_preview(file_path, previews_folder, office_options)
+    if file_type == 'pdf':
+        return render_pdf_preview(file_path, previews_folder)
+    raise ValueError(f"Preview is not supported for .{file_type} files")
+
+
 class PreviewService:
     """Service to handle preview generation"""
-    
+
+    _app = None
+    _executor = None
+    _executor_pid = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        Configure background preview generation for an app
+
+        PREVIEW_WORKERS sets the process pool size; 0 renders inline.
+        PREVIEW_MAX_ATTEMPTS and PREVIEW_RETRY_DELAY control retries.
+        """
+        cls._app = app
+
+    @staticmethod
+    def can_preview(file_type):
+        """Check if a file type gets a generated preview"""
+        return (file_type or '').lower() in PREVIEW_TYPES
+
     @staticmethod
     def generate_preview(file_path, original_filename):
         """
-        Generate preview image for a document
-        
+        Generate preview image for a document (synchronously)
+
         Args:
             file_path: Absolute path to the file
             original_filename: Original filename to extract extension
-            
+
         Returns:
             str: Relative URL to the preview image, or None if not possible
         """
         if not os.path.exists(file_path):
             logger.error(f"File not found: {file_path}")
             return None
-            
+
         file_ext = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
-        
-        if file_ext == 'pdf':
-            return PreviewService._generate_pdf_preview(file_path)
-        
-        # For other file types, we might return a default icon or look for a way to preview later
-        # For now, only PDF is supported for visual preview
-        return None
-    
-    @staticmethod
-    def _generate_pdf_preview(file_path):
-        """Generate preview for PDF (Page 1 with Blur) using PyMuPDF"""
+
+        if file_ext not in PREVIEW_TYPES:
+            # No visual preview for other file types
+            return None
+
         try:
-            import fitz  # PyMuPDF
-            
-            # 1. Open PDF
-            doc = fitz.open(file_path)
-            if doc.page_count < 1:
-                return None
-                
-            # 2. Get first page
-            page = doc.load_page(0)
-            
-            # 3. Render page to image (pixmap)
-            # matrix=fitz.Matrix(2, 2) for higher resolution (optional)
-            pix = page.get_pixmap(alpha=False) 
-            
-            # 4. Convert to PIL Image
-            img_data = pix.tobytes("ppm")
-            image = Image.open(io.BytesIO(img_data))
-            
-            doc.close()
-            
-            # 5. Add Watermark (Logo)
+            return render_preview(
+                file_path, file_ext, PreviewService._previews_folder(), PreviewService._office_options()
+            )['preview_url']
+        except Exception as e:
+            logger.error(f"Error generating preview: {str(e)}")
+            return None
+
+    @staticmethod
+    def _office_options():
+        """OfficeConverter options from the app config (passed to pool workers)"""
+        return {
+            'timeout': float(current_app.config.get('OFFICE_CONVERT_TIMEOUT', 60)),
+            'unoserver_path': current_app.config.get('UNOSERVER_PATH', 'unoserver'),
+            'soffice_path': current_app.config.get('SOFFICE_PATH', 'soffice')
+        }
+
+    @staticmethod
+    def _previews_folder():
+        # Use runtime config from current_app
+        return os.path.join(current_app.config['UPLOAD_FOLDER'], 'previews')
+
+    @staticmethod
+    def _local_path(file_url):
+        """Map /uploads/documents/<path> to the file in UPLOAD_FOLDER"""
+        from .storage_service import StorageService
+        return StorageService.local_path(file_url) or ''
+
+    @classmethod
+    def _get_executor(cls):
+        """Process pool for rendering (recreated after a fork or a crash)"""
+        with cls._lock:
+            if cls._executor is None or cls._executor_pid != os.getpid():
+                workers = int(current_app.config.get('PREVIEW_WORKERS', 2))
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                cls._executor_pid = os.getpid()
+            return cls._executor
+
+    @classmethod
+    def enqueue(cls, file_id):
+        """
+        Queue preview generation for a DocumentFile
+
+        Args:
+            file_id: DocumentFile ID (preview_status should be 'pending')
+
+        Returns:
+            bool: True if the job was queued (or rendered inline)
+        """
+        from models import db, DocumentFile
+
+        doc_file = db.session.get(DocumentFile, file_id)
+        if not doc_file or not cls.can_preview(doc_file.file_type):
+            return False
+
+        job = (
+            cls._local_path(doc_file.file_url),
+            doc_file.file_type,
+            cls._previews_folder(),
+            cls._office_options()
+        )
+
+        if int(current_app.config.get('PREVIEW_WORKERS', 2)) <= 0:
             try:
-                # Load watermark
-                watermark_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets', 'watermark.png')
-                if os.path.exists(watermark_path):
-                    watermark = Image.open(watermark_path).convert("RGBA")
-                    
-                    # Calculate size (e.g., 50% of page width)
-                    target_width = int(image.width * 0.5)
-                    ratio = target_width / float(watermark.width)
-                    target_height = int(watermark.height * ratio)
-                    
-                    watermark = watermark.resize((target_width, target_height), Image.Resampling.LANCZOS)
-                    
-                    # Calculate position (Center)
-                    x = int((image.width - target_width) / 2)
-                    y = int((image.height - target_height) / 2)
-                    
-                    # Create transparent layer for watermark
-                    transparent = Image.new('RGBA', image.size, (0,0,0,0))
-                    transparent.paste(watermark, (x, y))
-                    
-                    # Ensure original is compatible
-                    if image.mode != 'RGBA':
-                        image = image.convert('RGBA')
-                        
-                    watermarked_image = Image.alpha_composite(image, transparent)
-                    
-                    # Convert back to RGB for JPEG saving
-                    final_image = watermarked_image.convert('RGB')
-                else:
-                    logger.warning("Watermark file not found, skipping watermark.")
-                    final_image = image  # No watermark
-            
-            except Exception as wm_error:
-                logger.error(f"Failed to apply watermark: {wm_error}")
-                final_image = image # Fallback to original
-            
-            # 6. Save preview image
-            # Use runtime config from current_app
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            previews_folder = os.path.join(upload_folder, 'previews')
-            os.makedirs(previews_folder, exist_ok=True)
-            
-            filename = os.path.basename(file_path)
-            preview_filename = f"{os.path.splitext(filename)[0]}_preview.jpg"
-            preview_path = os.path.join(previews_folder, preview_filename)
-            
-            # Save as JPEG with high quality
-            final_image.save(preview_path, 'JPEG', quality=90)
-            
-            # Construct return URL relative to uploads folder
-            # Assuming UPLOAD_FOLDER is like 'uploads/documents' or '/var/www/.../uploads/documents'
-            # We want to return /uploads/documents/previews/...
-            # To be safe, let's keep it consistent with the existing serving route: /uploads/documents/<filename>
-            return f"/uploads/documents/previews/{preview_filename}"
-            
+                result = render_preview(*job)
+            except Exception as e:
+                cls._on_failure(file_id, e)
+            else:
+                cls._on_success(file_id, result)
+            return True
+
+        try:
+            future = cls._get_executor().submit(render_preview, *job)
+        except Exception as e:
+            # Pool is unusable (e.g. broken by a crashed worker); start a fresh one next time
+            cls._executor = None
+            cls._on_failure(file_id, e)
+            return False
+
+        future.add_done_callback(partial(cls._job_done, current_app._get_current_object(), file_id))
+        return True
+
+    @classmethod
+    def _job_done(cls, app, file_id, future):
+        """Process pool callback: record the result in the database"""
+        with app.app_context():
+            error = future.exception()
+            if error is None:
+                cls._on_success(file_id, future.result())
+                return
+            if isinstance(error, BrokenProcessPool):
+                cls._executor = None
+            cls._on_failure(file_id, error)
+
+    @staticmethod
+    def _on_success(file_id, result):
+        """Store the preview renditions and use them as the document thumbnail if there is none"""
+        from models import db, DocumentFile
+        from .cache_service import CacheService
+
+        try:
+            doc_file = db.session.get(DocumentFile, file_id)
+            if not doc_file:
+                return
+            preview_url = result['preview_url']
+            doc_file.preview_url = preview_url
+            doc_file.preview_renditions = result['renditions']
+            doc_file.preview_status = 'ready'
+            doc_file.preview_error = None
+
+            document = doc_file.document
+            if document and not document.thumbnail_url and document.files and document.files[0].id == doc_file.id:
+                document.thumbnail_url = preview_url
+
+            db.session.commit()
+            CacheService.invalidate('documents')
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to save preview for file {file_id}: {e}")
+
+    @classmethod
+    def _on_failure(cls, file_id, error):
+        """Count the failed attempt and schedule a retry while attempts remain"""
+        from models import db, DocumentFile
+
+        logger.error(f"Error generating preview for file {file_id}: {error}")
+        try:
+            doc_file = db.session.get(DocumentFile, file_id)
+            if not doc_file:
+                return
+            doc_file.preview_attempts = (doc_file.preview_attempts or 0) + 1
+            doc_file.preview_error = str(error)[:1000]
+
+            max_attempts = int(current_app.config.get('PREVIEW_MAX_ATTEMPTS', 3))
+            retry = doc_file.preview_attempts < max_attempts
+            doc_file.preview_status = 'pending' if retry else 'failed'
+            attempts = doc_file.preview_attempts
+            db.session.commit()
         except Exception as e:
-            logger.error(f"Error generating PDF preview: {str(e)}")
+            db.session.rollback()
+            logger.error(f"Failed to record preview failure for file {file_id}: {e}")
+            return
+
+        if retry:
+            delay = float(current_app.config.get('PREVIEW_RETRY_DELAY', 5)) * 2 ** (attempts - 1)
+            timer = threading.Timer(delay, cls._retry_later, [current_app._get_current_object(), file_id])
+            timer.daemon = True
+            timer.start()
+
+    @classmethod
+    def _retry_later(cls, app, file_id):
+        with app.app_context():
+            cls.enqueue(file_id)
+
+    @classmethod
+    def retry(cls, file_id):
+        """
+        Reset a file's preview job and queue it again
+
+        Args:
+            file_id: DocumentFile ID
+
+        Returns:
+            tuple: (success, error_message)
+        """
+        from models import db, DocumentFile
+
+        doc_file = db.session.get(DocumentFile, file_id)
+        if not doc_file:
+            return False, 'File not found'
+        if not cls.can_preview(doc_file.file_type):
+            return False, 'Preview is not supported for this file type'
+
+        doc_file.preview_status = 'pending'
+        doc_file.preview_attempts = 0
+        doc_file.preview_error = None
+        db.session.commit()
+
+        cls.enqueue(file_id)
+        return True, None
+
+    @staticmethod
+    def get_status(document_id):
+        """
+        Get preview job status for every file of a document
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            dict: {document_id, thumbnail_url, done, files} or None if not found
+        """
+        from models import db, Document
+
+        document = db.session.get(Document, document_id)
+        if not document:
             return None
+
+        files = [{
+            'id': f.id,
+            'original_filename': f.original_filename,
+            'preview_status': f.preview_status,
+            'preview_url': f.preview_url,
+            'preview_attempts': f.preview_attempts,
+            'preview_error': f.preview_error
+        } for f in document.files]
+
+        return {
+            'document_id': document.id,
+            'thumbnail_url': document.thumbnail_url,
+            'done': all(f['preview_status'] != 'pending' for f in files),
+            'files': files
+        }
+
+    @classmethod
+    def requeue_pending(cls, include_failed=False):
+        """
+        Queue every pending job again (e.g. after a restart lost the pool)
+
+        Args:
+            include_failed: Also reset and retry failed jobs
+
+        Returns:
+            int: Number of jobs queued
+        """
+        from models import db, DocumentFile
+
+        statuses = ['pending', 'failed'] if include_failed else ['pending']
+        file_ids = [f.id for f in DocumentFile.query.filter(DocumentFile.preview_status.in_(statuses)).all()]
+
+        if include_failed:
+            DocumentFile.query.filter(DocumentFile.id.in_(file_ids)).update(
+                {'preview_status': 'pending', 'preview_attempts': 0, 'preview_error': None},
+                synchronize_session=False
+            )
+            db.session.commit()
+
+        for file_id in file_ids:
+            cls.enqueue(file_id)
+        return len(file_ids)
@@ -0,0 +1,195 @@
+"""
+Principal service - who is behind a JWT, without a users-table read per request
+
+Authenticated requests only need the user's id, role and active flag. These
+are kept as immutable UserPrincipal snapshots in a short-TTL per-process LRU,
+optionally backed by Redis so all workers share them. Admin changes to a user
+drop the snapshot.
+
+With AUTH_PRINCIPAL_FROM_TOKEN the role and active flag are read from the
+access token claims instead. A user changed after the token was issued is
+recorded with a marker, and that user's requests fall back to the cache/DB
+until they get a new token. Markers must reach every worker, so the mode
+stays off unless AUTH_PRINCIPAL_REDIS_URL is configured.
+"""
+import time
+import logging
+from typing import NamedTuple, Optional
+from flask import current_app
+from models import db, User
+from .cache_service import MemoryCacheBackend, RedisCacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class UserPrincipal(NamedTuple):
+    """Immutable snapshot of the fields authorization needs"""
+
+    id: str
+    role: str
+    is_active: bool
+    balance_version: Optional[str]  # users.updated_at when the snapshot was taken
+
+    def is_admin(self):
+        """Check if user is admin"""
+        return self.role == 'admin'
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(
+            id=user.id,
+            role=user.role,
+            is_active=bool(user.is_active),
+            balance_version=user.updated_at.isoformat() if user.updated_at else None
+        )
+
+
+class PrincipalService:
+    """Service for cached user principals"""
+
+    _app = None
+    _local = None
+    _shared = None
+    _from_token = False
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        Configure the principal cache for an app
+
+        AUTH_PRINCIPAL_TTL (seconds) bounds how long a snapshot is trusted; 0 disables the cache.
+        AUTH_PRINCIPAL_MAX_ENTRIES bounds the in-process LRU.
+        AUTH_PRINCIPAL_REDIS_URL enables the shared Redis store behind the LRU.
+        AUTH_PRINCIPAL_FROM_TOKEN trusts token claims; it requires the shared store.
+        """
+        cls._app = app
+        cls._local = MemoryCacheBackend(int(app.config.get('AUTH_PRINCIPAL_MAX_ENTRIES', 4096)))
+        cls._shared = None
+        cls._from_token = False
+
+        redis_url = app.config.get('AUTH_PRINCIPAL_REDIS_URL')
+        if redis_url:
+            try:
+                cls._shared = RedisCacheBackend(redis_url, key_prefix='principal:')
+            except Exception as e:
+                logger.warning(f"Redis principal cache unavailable, using memory only: {e}")
+
+        if app.config.get('AUTH_PRINCIPAL_FROM_TOKEN'):
+            if cls._shared is None:
+                # A marker written by one worker would not stop another from trusting an old token
+                logger.error("AUTH_PRINCIPAL_FROM_TOKEN needs AUTH_PRINCIPAL_REDIS_URL, ignoring token claims")
+            else:
+                cls._from_token = True
+
+    @classmethod
+    def _ttl(cls):
+        if cls._app is None:
+            return 0
+        return float(cls._app.config.get('AUTH_PRINCIPAL_TTL', 0))
+
+    @staticmethod
+    def _marker_ttl():
+        # Markers must outlive every access token issued before the change
+        expires = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+        return expires.total_seconds() if hasattr(expires, 'total_seconds') else 3600
+
+    @staticmethod
+    def token_claims(user):
+        """Extra access-token claims read back by current() in AUTH_PRINCIPAL_FROM_TOKEN mode"""
+        principal = user if isinstance(user, UserPrincipal) else UserPrincipal.from_user(user)
+        return {
+            'role': principal.role,
+            'active': principal.is_active,
+            'bv': principal.balance_version
+        }
+
+    @classmethod
+    def get(cls, user_id):
+        """
+        Principal for a user ID (LRU, then shared store, then the users table)
+
+        Returns:
+            UserPrincipal: Snapshot, or None if the user does not exist
+        """
+        ttl = cls._ttl()
+        if ttl > 0 and cls._local is not None:
+            principal = cls._local.get(user_id)
+            if principal is not None:
+                return principal
+            if cls._shared is not None:
+                try:
+                    raw = cls._shared.get(user_id)
+                except Exception as e:
+                    logger.warning(f"Principal cache read failed: {e}")
+                    raw = None
+                if raw:
+                    principal = UserPrincipal(*raw)
+                    cls._local.set(user_id, principal, ttl)
+                    return principal
+
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        principal = UserPrincipal.from_user(user)
+
+        if ttl > 0 and cls._local is not None:
+            cls._local.set(user_id, principal, ttl)
+            if cls._shared is not None:
+                try:
+                    cls._shared.set(user_id, list(principal), ttl)
+                except Exception as e:
+                    logger.warning(f"Principal cache write failed: {e}")
+        return principal
+
+    @classmethod
+    def _changed_since(cls, user_id, issued_at):
+        """Check if the user was invalidated at or after a token's iat"""
+        if cls._local is None:
+            return True
+        changed_at = cls._local.get(f'changed:{user_id}')
+        if changed_at is None and cls._shared is not None:
+            try:
+                changed_at = cls._shared.get(f'changed:{user_id}')
+            except Exception as e:
+                logger.warning(f"Principal marker read failed: {e}")
+                return True
+        return changed_at is not None and changed_at >= issued_at
+
+    @classmethod
+    def current(cls, user_id, claims):
+        """
+        Principal for a verified JWT
+
+        Args:
+            user_id: JWT identity
+            claims: Decoded JWT claims
+
+        Returns:
+            UserPrincipal: Snapshot, or None if the user does not exist
+        """
+        if (cls._from_token
+                and 'role' in claims and 'active' in claims
+                and not cls._changed_since(user_id, claims.get('iat', 0))):
+            return UserPrincipal(user_id, claims['role'], bool(claims['active']), claims.get('bv'))
+        return cls.get(user_id)
+
+    @classmethod
+    def invalidate(cls, user_id):
+        """
+        Forget a user's snapshot after their role, status or balance changed
+
+        Also marks the user as changed, so tokens issued earlier stop being
+        trusted in AUTH_PRINCIPAL_FROM_TOKEN mode.
+        """
+        if cls._local is None or not user_id:
+            return
+        changed_at = time.time()
+        marker_ttl = cls._marker_ttl()
+        cls._local.delete(user_id)
+        cls._local.set(f'changed:{user_id}', changed_at, marker_ttl)
+        if cls._shared is not None:
+            try:
+                cls._shared.delete(user_id)
+                cls._shared.set(f'changed:{user_id}', changed_at, marker_ttl)
+            except Exception as e:
+                logger.error(f"Principal cache invalidation failed: {e}")
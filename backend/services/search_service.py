@@ -0,0 +1,109 @@
+"""
+Search service - full-text search over documents
+"""
+import re
+from sqlalchemy import func, text, literal_column
+from models import db, Document
+from models.document import fold_search_text
+
+
+class SearchService:
+    """Service for full-text document search"""
+
+    @staticmethod
+    def tokenize(search_query):
+        """
+        Fold diacritics and split a search query into index tokens
+
+        Args:
+            search_query: Raw user query
+
+        Returns:
+            list: Folded alphanumeric tokens (underscores count as punctuation)
+        """
+        return re.findall(r'[^\W_]+', fold_search_text(search_query))
+
+    @staticmethod
+    def apply_search(query, search_query):
+        """
+        Restrict a Document query to full-text matches
+
+        Every token must match (prefix match on the last characters typed),
+        so "hop dong thue" finds "Hợp đồng thuê nhà".
+
+        Args:
+            query: Document query to filter
+            search_query: Raw user query
+
+        Returns:
+            tuple: (filtered_query, rank_expression) - rank sorts best match first
+                   when ordered descending; None if the query has no tokens
+        """
+        tokens = SearchService.tokenize(search_query)
+        if not tokens:
+            return query, None
+
+        dialect = db.engine.dialect.name
+
+        if dialect == 'postgresql':
+            ts_query = func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+            vector = func.to_tsvector('simple', func.coalesce(Document.search_text, ''))
+            query = query.filter(vector.op('@@')(ts_query))
+            return query, func.ts_rank_cd(vector, ts_query)
+
+        if dialect == 'sqlite':
+            match = ' '.join(f'"{token}"*' for token in tokens)
+            matches = text(
+                'SELECT document_id, bm25(documents_fts) AS fts_rank '
+                'FROM documents_fts WHERE documents_fts MATCH :match'
+            ).bindparams(match=match).columns(
+                literal_column('document_id'), literal_column('fts_rank')
+            ).subquery('fts_matches')
+            query = query.join(matches, matches.c.document_id == Document.id)
+            # bm25() is lower-is-better; negate so desc() means most relevant
+            return query, -matches.c.fts_rank
+
+        # Other databases: scan the folded column (LIKE wildcards in the input match literally)
+        for token in tokens:
+            pattern = token.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            query = query.filter(Document.search_text.like(f'%{pattern}%', escape='\\'))
+        return query, None
+
+    @staticmethod
+    def rebuild_index(batch_size=500):
+        """
+        Recompute search_text (and the SQLite FTS5 rows) for every document
+
+        Args:
+            batch_size: Documents per flush
+
+        Returns:
+            int: Number of documents reindexed
+        """
+        count = 0
+        last_id = ''
+        while True:
+            batch = Document.query.filter(Document.id > last_id)\
+                .order_by(Document.id).limit(batch_size).all()
+            if not batch:
+                break
+            for document in batch:
+                document.update_search_text()
+            db.session.commit()
+            count += len(batch)
+            last_id = batch[-1].id
+
+        SearchService.sync_fts_table()
+        return count
+
+    @staticmethod
+    def sync_fts_table():
+        """Repopulate the SQLite FTS5 table from documents.search_text (no-op elsewhere)"""
+        if db.engine.dialect.name != 'sqlite':
+            return
+        db.session.execute(text('DELETE FROM documents_fts'))
+        db.session.execute(text(
+            "INSERT INTO documents_fts (document_id, search_text) "
+            "SELECT id, coalesce(search_text, '') FROM documents"
+        ))
+        db.session.commit()
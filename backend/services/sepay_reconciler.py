@@ -0,0 +1,272 @@
+"""
+SePay reconciler - background matching of bank transfers against pending payments
+
+One thread per process polls the SePay transactions API incrementally (a
+since-id cursor stored in sepay_sync_state) and matches every new incoming
+transfer against all pending SePay transactions with one bulk query. It is
+the safety net for missed webhooks; the status endpoint only reads the
+local database. On PostgreSQL an advisory lock keeps workers from polling
+at the same time.
+
+The same thread sweeps payment requests past expires_at, cancelling them in
+batched UPDATEs so the pending set stays small.
+"""
+import os
+import re
+import logging
+import time
+import threading
+from datetime import datetime
+from sqlalchemy import text, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Transaction, SepaySyncState
+from .sepay_service import SepayService
+from .principal_service import PrincipalService
+from .payment_notifier import PaymentNotifier
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_CODE_PATTERN = re.compile(r'DH([A-Z0-9]{8})')
+
+
+class SepayReconciler:
+    """Service for polling SePay, completing matched payments and expiring stale ones"""
+
+    CURSOR_KEY = 'last_transaction_id'
+    LOCK_ID = 7302001  # pg advisory lock key, any constant unique to this job
+
+    _app = None
+    _worker = None
+    _worker_pid = None
+    _stop = threading.Event()
+    _start_lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        Configure background reconciliation for an app
+
+        SEPAY_RECONCILE_INTERVAL (seconds) between polls; 0 disables the thread.
+        SEPAY_RECONCILE_PAGE_SIZE and SEPAY_RECONCILE_MAX_PAGES bound one poll.
+        SEPAY_EXPIRY_SWEEP_INTERVAL (seconds) between expiry sweeps; 0 disables them.
+        """
+        cls._app = app
+        if cls._interval() > 0 or cls._sweep_interval() > 0:
+            # Started lazily so it runs in each worker process, not in the preforking master
+            app.before_request(cls._ensure_worker)
+
+    @classmethod
+    def _interval(cls):
+        if cls._app is None:
+            return 0
+        return float(cls._app.config.get('SEPAY_RECONCILE_INTERVAL', 0))
+
+    @classmethod
+    def _sweep_interval(cls):
+        if cls._app is None:
+            return 0
+        return float(cls._app.config.get('SEPAY_EXPIRY_SWEEP_INTERVAL', 0))
+
+    @classmethod
+    def reconcile_once(cls):
+        """
+        Fetch new bank transactions and complete the pending payments they pay for
+
+        Returns:
+            dict: fetched / matched counts and the cursor after the run
+        """
+        stats = {'fetched': 0, 'matched': 0, 'cursor': None}
+        if not SepayService.is_enabled():
+            return stats
+
+        pending = db.session.query(Transaction.id).filter(
+            Transaction.payment_method == 'sepay',
+            Transaction.payment_status == 'pending'
+        ).first()
+        db.session.commit()
+        if not pending:
+            return stats
+
+        if db.engine.dialect.name != 'postgresql':
+            return cls._reconcile(stats)
+
+        with db.engine.connect() as lock_conn:
+            if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {'id': cls.LOCK_ID}).scalar():
+                return stats  # Another worker is polling
+            try:
+                return cls._reconcile(stats)
+            finally:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': cls.LOCK_ID})
+                lock_conn.commit()
+
+    @classmethod
+    def _reconcile(cls, stats):
+        page_size = int(cls._app.config.get('SEPAY_RECONCILE_PAGE_SIZE', 100))
+        max_pages = int(cls._app.config.get('SEPAY_RECONCILE_MAX_PAGES', 10))
+
+        state = db.session.get(SepaySyncState, cls.CURSOR_KEY)
+        cursor = int(state.value) if state and state.value else None
+
+        for _ in range(max_pages):
+            bank_transactions = SepayService.fetch_bank_transactions(since_id=cursor, limit=page_size)
+            if not bank_transactions:
+                break
+            stats['fetched'] += len(bank_transactions)
+            stats['matched'] += cls._match(bank_transactions)
+            cursor = max(int(tx['id']) for tx in bank_transactions)
+            cls._save_cursor(cursor)
+            if len(bank_transactions) < page_size:
+                break
+
+        stats['cursor'] = cursor
+        return stats
+
+    @classmethod
+    def _match(cls, bank_transactions):
+        """Complete pending transactions paid by a page of bank transactions"""
+        incoming = {}
+        for tx in bank_transactions:
+            amount = float(tx.get('amount_in') or tx.get('transferAmount') or 0)
+            content = (tx.get('transaction_content') or tx.get('content') or '').upper()
+            match = PAYMENT_CODE_PATTERN.search(content)
+            if amount > 0 and match:
+                incoming[str(tx['id'])] = (match.group(1), amount, tx)
+        if not incoming:
+            return 0
+
+        # One query for the orders, one for transfers already recorded by the webhook
+        codes = {code for code, _, _ in incoming.values()}
+        orders = {
+            transaction.payment_code: transaction
+            for transaction in Transaction.query.filter(
+                Transaction.payment_code.in_(codes),
+                Transaction.payment_status != 'completed'
+            ).all()
+        }
+        recorded = {
+            sepay_id for (sepay_id,) in db.session.query(Transaction.sepay_transaction_id).filter(
+                Transaction.sepay_transaction_id.in_(list(incoming))
+            )
+        }
+
+        matched = 0
+        for sepay_id, (code, amount, tx) in incoming.items():
+            transaction = orders.get(code)
+            if sepay_id in recorded or transaction is None or transaction.payment_status == 'completed':
+                continue
+            if not SepayService.amount_matches(transaction, amount):
+                logger.warning(f"SePay reconcile: amount mismatch for {transaction.id}: got {amount}")
+                continue
+
+            if not SepayService.complete_payment(transaction, sepay_id, amount, tx):
+                # The webhook completed this order in the meantime
+                db.session.rollback()
+                continue
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # The webhook recorded this transfer in the meantime
+                db.session.rollback()
+                continue
+            if transaction.transaction_type == 'topup':
+                PrincipalService.invalidate(transaction.user_id)
+            logger.info(f"SePay reconcile: completed {transaction.id} from bank transaction {sepay_id}")
+            matched += 1
+        return matched
+
+    @classmethod
+    def _save_cursor(cls, cursor):
+        db.session.merge(SepaySyncState(key=cls.CURSOR_KEY, value=str(cursor)))
+        db.session.commit()
+
+    @classmethod
+    def sweep_expired(cls, batch_size=None, now=None):
+        """
+        Cancel pending SePay payments whose QR code has expired
+
+        Works in batches of SEPAY_EXPIRY_SWEEP_BATCH rows, one short
+        transaction each, so the sweep never holds many row locks at once.
+        A transfer that still arrives for a cancelled order is matched by its
+        payment code and completes it.
+
+        Returns:
+            dict: expired / batches counts
+        """
+        batch_size = batch_size or int(cls._app.config.get('SEPAY_EXPIRY_SWEEP_BATCH', 1000))
+        now = now or datetime.utcnow()
+        stats = {'expired': 0, 'batches': 0}
+
+        while True:
+            # Served by the partial index on expires_at WHERE payment_status = 'pending'
+            ids = db.session.execute(
+                select(Transaction.id).where(
+                    Transaction.payment_status == 'pending',
+                    Transaction.payment_method == 'sepay',
+                    Transaction.expires_at < now
+                ).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+
+            expired = db.session.execute(
+                update(Transaction)
+                .where(
+                    # Recheck everything: a reused pending order may have a fresh expires_at by now
+                    Transaction.id.in_(ids),
+                    Transaction.payment_status == 'pending',
+                    Transaction.payment_method == 'sepay',
+                    Transaction.expires_at < now
+                )
+                .values(status='cancelled', payment_status='cancelled', updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            PaymentNotifier.notify(*ids)
+            db.session.commit()
+
+            stats['expired'] += expired
+            stats['batches'] += 1
+            if len(ids) < batch_size:
+                break
+
+        if stats['expired']:
+            logger.info(f"SePay sweep: cancelled {stats['expired']} expired payment(s)")
+        return stats
+
+    @classmethod
+    def _ensure_worker(cls):
+        """Start the polling thread (again after a fork)"""
+        if cls._worker is not None and cls._worker.is_alive() and cls._worker_pid == os.getpid():
+            return
+        with cls._start_lock:
+            if cls._worker is not None and cls._worker.is_alive() and cls._worker_pid == os.getpid():
+                return
+            cls._stop.clear()
+            cls._worker = threading.Thread(target=cls.run_forever, name='sepay-reconciler', daemon=True)
+            cls._worker_pid = os.getpid()
+            cls._worker.start()
+
+    @classmethod
+    def run_forever(cls):
+        """Poll and sweep until stop() is called"""
+        intervals = [interval for interval in (cls._interval(), cls._sweep_interval()) if interval > 0]
+        next_reconcile = next_sweep = 0
+        while not cls._stop.wait(max(min(intervals or [1]), 1)):
+            now = time.monotonic()
+            with cls._app.app_context():
+                try:
+                    if cls._interval() > 0 and now >= next_reconcile:
+                        next_reconcile = now + cls._interval()
+                        cls.reconcile_once()
+                    # Sweep after a successful poll, so paid orders are completed, not cancelled
+                    if cls._sweep_interval() > 0 and now >= next_sweep:
+                        next_sweep = now + cls._sweep_interval()
+                        cls.sweep_expired()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"SePay background job failed: {e}")
+                finally:
+                    db.session.remove()
+
+    @classmethod
+    def stop(cls):
+        cls._stop.set()
@@ -7,10 +7,22 @@ import hmac
 import hashlib
 import requests
 import re
+import json
+import time
+import secrets
 from datetime import datetime, timedelta
 from decimal import Decimal
-from models import db, Transaction
+from models import db, Transaction, User
 from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from .entitlement_service import EntitlementService
+from .principal_service import PrincipalService
+from .payment_notifier import PaymentNotifier
+
+# Payment codes: 8 characters matched by the DH([A-Z0-9]{8}) pattern, without look-alikes (0/O, 1/I)
+PAYMENT_CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+PAYMENT_CODE_LENGTH = 8
 
 
 class SepayService:
@@ -39,19 +51,28 @@ class SepayService:
         return config['enabled'] and config['api_key']
     
     @staticmethod
-    def generate_transaction_code(transaction_id):
+    def new_payment_code():
+        """Random order code stored in transactions.payment_code (unique index)"""
+        return ''.join(secrets.choice(PAYMENT_CODE_ALPHABET) for _ in range(PAYMENT_CODE_LENGTH))
+    
+    @staticmethod
+    def legacy_payment_code(transaction_id):
+        """Order code of transactions created before payment_code: last 8 characters of the ID"""
+        return str(transaction_id)[-8:].upper()
+    
+    @staticmethod
+    def generate_transaction_code(transaction_id, payment_code=None):
         """
         Generate unique transaction code for bank transfer content
         
         FIXED: Support virtual account
-        Format without VA: DH{last_8_chars}
-        Format with VA: LOCSPAY000324416 DH{last_8_chars}
+        Format without VA: DH{payment_code}
+        Format with VA: LOCSPAY000324416 DH{payment_code}
         """
         config = SepayService._get_config()
         virtual_account = config.get('virtual_account', '')
         
-        # Get last 8 characters of transaction ID
-        short_id = str(transaction_id)[-8:].upper()
+        short_id = payment_code or SepayService.legacy_payment_code(transaction_id)
         transaction_code = f"DH{short_id}"
         
         # Add virtual account prefix if configured
@@ -61,7 +82,7 @@ class SepayService:
         return transaction_code
     
     @staticmethod
-    def create_payment_request(transaction_id, amount, description="Thanh toan van ban"):
+    def create_payment_request(transaction_id, amount, description="Thanh toan van ban", payment_code=None):
         """
         Create SePay payment request and generate QR code
         
@@ -74,7 +95,7 @@ class SepayService:
                 return None, 'SePay payment is not enabled'
             
             # FIXED: Use generate_transaction_code method
-            transaction_code = SepayService.generate_transaction_code(transaction_id)
+            transaction_code = SepayService.generate_transaction_code(transaction_id, payment_code)
             
             # Create payment info
             payment_info = {
@@ -177,7 +198,7 @@ class SepayService:
             if not sepay_transaction_id:
                 return False, 'Missing SePay transaction ID'
             
-            # FIXED: IDEMPOTENCY CHECK - Has this webhook been processed?
+            # FIXED: IDEMPOTENCY CHECK - Has this webhook been processed? (unique index lookup)
             existing = Transaction.query.filter_by(
                 sepay_transaction_id=sepay_transaction_id
             ).first()
@@ -233,19 +254,17 @@ class SepayService:
                 )
                 return False, f'No order code found in content: {transaction_content}'
             
-            order_code_suffix = match.group(1)
-            current_app.logger.info(f"Extracted order code suffix: {order_code_suffix}")
+            payment_code = match.group(1)
+            current_app.logger.info(f"Extracted order code: {payment_code}")
             
-            # Find transaction in DB
-            transaction = Transaction.query.filter(
-                Transaction.id.ilike(f'%{order_code_suffix}')
-            ).first()
+            # Find transaction in DB (unique index on payment_code)
+            transaction = Transaction.query.filter_by(payment_code=payment_code).first()
             
             if not transaction:
                 current_app.logger.warning(
-                    f"No transaction found for code suffix: {order_code_suffix}"
+                    f"No transaction found for order code: {payment_code}"
                 )
-                return False, f'Transaction not found for code suffix {order_code_suffix}'
+                return False, f'Transaction not found for order code {payment_code}'
             
             current_app.logger.info(f"Found transaction: {transaction.id}")
             
@@ -255,34 +274,34 @@ class SepayService:
                 return True, 'Transaction already completed'
             
             # Validate amount (allow small tolerance)
-            expected_amount = float(transaction.amount)
-            amount_diff = abs(transfer_amount - expected_amount)
-            
-            if amount_diff > 1000:  # 1000 VND tolerance
+            if not SepayService.amount_matches(transaction, transfer_amount):
+                expected_amount = float(transaction.amount)
                 current_app.logger.error(
                     f"Amount mismatch for {transaction.id}: "
                     f"Expected {expected_amount}, got {transfer_amount}, "
-                    f"difference {amount_diff}"
+                    f"difference {abs(transfer_amount - expected_amount)}"
                 )
                 return False, f'Amount mismatch: expected {expected_amount}, got {transfer_amount}'
             
-            # SUCCESS - Update transaction
-            transaction.payment_status = 'completed'
-            transaction.status = 'completed'
-            transaction.sepay_transaction_id = sepay_transaction_id
-            transaction.sepay_data = data
-            transaction.updated_at = datetime.utcnow()
+            # SUCCESS - Update transaction, credit top-ups, grant access
+            if not SepayService.complete_payment(transaction, sepay_transaction_id, transfer_amount, data):
+                # Completed by a concurrent delivery or the reconciler
+                db.session.rollback()
+                current_app.logger.info(f"Transaction {transaction.id} already completed")
+                return True, 'Transaction already completed'
             
-            # Handle top-up transactions
-            if transaction.transaction_type == 'topup' and transaction.user:
-                user = transaction.user
-                old_balance = user.balance
-                user.balance += Decimal(str(transfer_amount))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Same SePay ID committed by a concurrent delivery (unique index)
+                db.session.rollback()
                 current_app.logger.info(
-                    f"Top-up for user {user.id}: {old_balance} -> {user.balance}"
+                    f"Webhook already processed: SePay ID {sepay_transaction_id}"
                 )
+                return True, 'Webhook already processed (idempotent)'
             
-            db.session.commit()
+            if transaction.transaction_type == 'topup':
+                PrincipalService.invalidate(transaction.user_id)
             
             current_app.logger.info(
                 f"✅ Successfully processed payment for transaction {transaction.id}"
@@ -300,84 +319,16 @@ class SepayService:
     @staticmethod
     def check_transaction_status(transaction_id):
         """
-        FIXED: Check transaction status with correct API URL
+        Payment status from the local database
+        
+        Bank transfers are matched by the webhook and by SepayReconciler in
+        the background, so polling clients never trigger SePay API calls.
         """
         try:
-            config = SepayService._get_config()
-            
             transaction = db.session.get(Transaction, transaction_id)
             
             if not transaction:
                 return None, 'Transaction not found'
-
-            # If already completed, return immediately
-            if transaction.payment_status == 'completed':
-                return {
-                    'transaction_id': str(transaction.id),
-                    'payment_status': transaction.payment_status,
-                    'amount': int(transaction.amount),
-                    'sepay_transaction_id': transaction.sepay_transaction_id
-                }, None
-
-            # If pending, check with SePay API
-            if config['enabled'] and config['api_key']:
-                try:
-                    # FIXED: Use generate_transaction_code method
-                    expected_content = SepayService.generate_transaction_code(transaction.id)
-                    
-                    # FIXED: Use correct API URL from config
-                    api_url = config.get('api_url', 'https://my.sepay.vn/companyapi')
-                    url = f"{api_url}/transactions/list"
-                    
-                    headers = {
-                        "Authorization": f"Bearer {config['api_key']}",
-                        "Content-Type": "application/json"
-                    }
-                    
-                    current_app.logger.info(f"Calling SePay API: {url}")
-                    
-                    response = requests.get(url, headers=headers, params={"limit": 50}, timeout=10)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        # FIXED: Support both userapi and companyapi response formats
-                        if data.get('status') == 200:
-                            # userapi format
-                            transactions = data.get('messages', {}).get('transactions', [])
-                        elif data.get('status') == 'success':
-                            # companyapi format
-                            transactions = data.get('data', {}).get('transactions', [])
-                        else:
-                            transactions = []
-                        
-                        for tx in transactions:
-                            tx_content = tx.get('transaction_content', '')
-                            tx_amount = float(tx.get('amount_in', 0))
-                            
-                            # Check if content matches (case-insensitive)
-                            if expected_content.upper() in tx_content.upper():
-                                # Verify amount
-                                if abs(tx_amount - float(transaction.amount)) < 1000:
-                                    # MATCH FOUND!
-                                    current_app.logger.info(f"SePay API: Found match for {transaction.id}")
-                                    
-                                    transaction.payment_status = 'completed'
-                                    transaction.status = 'completed' 
-                                    transaction.sepay_transaction_id = str(tx.get('id'))
-                                    transaction.sepay_data = tx
-                                    transaction.updated_at = datetime.utcnow()
-                                    
-                                    if transaction.transaction_type == 'topup' and transaction.user:
-                                        transaction.user.balance += Decimal(str(tx_amount))
-                                    
-                                    db.session.commit()
-                                    break
-                    else:
-                        current_app.logger.warning(f"SePay API error: {response.status_code}")
-                        
-                except Exception as api_error:
-                    current_app.logger.warning(f"Failed to query SePay API: {str(api_error)}")
             
             return {
                 'transaction_id': str(transaction.id),
@@ -390,6 +341,142 @@ class SepayService:
             current_app.logger.error(f"SePay status check error: {str(e)}")
             return None, f"Failed to check status: {str(e)}"
     
+    @staticmethod
+    def status_stream(transaction_id):
+        """
+        Server-Sent Events for a payment: one 'status' event once it is no longer pending
+        
+        Waits on PaymentNotifier instead of polling. The database is reread
+        after each notification and every SEPAY_STREAM_KEEPALIVE seconds
+        (with a keep-alive comment), and the stream ends after
+        SEPAY_STREAM_TIMEOUT seconds so the client reconnects.
+        No database connection is held while waiting.
+        """
+        timeout = float(current_app.config.get('SEPAY_STREAM_TIMEOUT', 300))
+        keepalive = float(current_app.config.get('SEPAY_STREAM_KEEPALIVE', 15))
+        deadline = time.monotonic() + timeout
+        
+        with PaymentNotifier.subscribe(transaction_id) as notified:
+            yield 'retry: 3000\n\n'
+            while True:
+                db.session.expire_all()
+                status, error = SepayService.check_transaction_status(transaction_id)
+                db.session.commit()
+                
+                if error:
+                    yield f"event: error\ndata: {json.dumps({'message': error})}\n\n"
+                    return
+                if status['payment_status'] != 'pending':
+                    yield f"event: status\ndata: {json.dumps(status)}\n\n"
+                    return
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                if not notified.wait(min(keepalive, remaining)):
+                    yield ': keepalive\n\n'
+                notified.clear()
+    
+    @staticmethod
+    def amount_matches(transaction, amount):
+        """Check a transfer amount against the order (1000 VND tolerance)"""
+        return abs(float(amount) - float(transaction.amount)) <= 1000
+    
+    @staticmethod
+    def complete_payment(transaction, sepay_transaction_id, amount, data):
+        """
+        Mark a transaction as paid by a bank transfer; the caller commits
+        
+        The status flip is a conditional UPDATE (payment_status <> 'completed'),
+        so when a duplicate webhook and the reconciler race on the same order
+        only one of them gets the row: the other waits for the row lock and
+        then matches nothing. The balance credit and the access grant only
+        run for the winner. Top-ups are credited with a relative UPDATE so
+        they cannot overwrite a concurrent balance debit.
+        
+        Args:
+            transaction: Pending Transaction matched by its payment code
+            sepay_transaction_id: SePay bank transaction ID (unique)
+            amount: Transferred amount
+            data: Raw SePay payload, stored for auditing
+            
+        Returns:
+            bool: False if the transaction was already completed
+        """
+        now = datetime.utcnow()
+        completed = db.session.execute(
+            update(Transaction)
+            .where(Transaction.id == transaction.id, Transaction.payment_status != 'completed')
+            .values(
+                payment_status='completed',
+                status='completed',
+                sepay_transaction_id=str(sepay_transaction_id),
+                sepay_data=data,
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        # Reload the row on next access instead of trusting the stale copy
+        db.session.expire(transaction)
+        if completed != 1:
+            return False
+        
+        if transaction.transaction_type == 'topup':
+            db.session.execute(
+                update(User)
+                .where(User.id == transaction.user_id)
+                .values(balance=User.balance + Decimal(str(amount)), updated_at=now)
+            )
+            current_app.logger.info(f"Top-up for user {transaction.user_id}: +{amount}")
+        
+        EntitlementService.grant_for_transaction(transaction)
+        PaymentNotifier.notify(transaction.id)
+        return True
+    
+    @staticmethod
+    def fetch_bank_transactions(since_id=None, limit=100):
+        """
+        Incoming bank transactions from the SePay API
+        
+        Args:
+            since_id: Only transactions with a larger SePay ID
+            limit: Page size
+            
+        Returns:
+            list: SePay transaction dicts in ascending ID order
+            
+        Raises:
+            requests.RequestException: On network or HTTP errors
+        """
+        config = SepayService._get_config()
+        url = f"{config['api_url'].rstrip('/')}/transactions/list"
+        headers = {
+            "Authorization": f"Bearer {config['api_key']}",
+            "Content-Type": "application/json"
+        }
+        params = {'limit': limit}
+        if since_id is not None:
+            params['since_id'] = since_id
+        
+        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Support both userapi and companyapi response formats
+        if isinstance(data.get('transactions'), list):
+            transactions = data['transactions']
+        elif data.get('status') == 200:
+            transactions = data.get('messages', {}).get('transactions', [])
+        elif data.get('status') == 'success':
+            transactions = data.get('data', {}).get('transactions', [])
+        else:
+            transactions = []
+        
+        # since_id is inclusive on some endpoints
+        if since_id is not None:
+            transactions = [tx for tx in transactions if int(tx.get('id', 0)) > int(since_id)]
+        return sorted(transactions, key=lambda tx: int(tx.get('id', 0)))
+    
     @staticmethod
     def cancel_payment(transaction_id):
         """Cancel pending payment"""
@@ -405,6 +492,7 @@ class SepayService:
             transaction.payment_status = 'cancelled'
             transaction.status = 'cancelled'
             transaction.updated_at = datetime.utcnow()
+            PaymentNotifier.notify(transaction.id)
             
             db.session.commit()
             
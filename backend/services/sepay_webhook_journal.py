@@ -0,0 +1,204 @@
+"""
+SePay webhook journal - acknowledge webhooks fast, process them in order later
+
+With SEPAY_WEBHOOK_MODE=journal the webhook endpoint only checks the API key
+and appends the raw body to sepay_webhook_events, then answers SePay. A
+worker thread drains the journal in arrival order, in batches, through
+SepayService.process_payment_webhook (idempotent on sepay_transaction_id, so
+an event processed twice after a crash is harmless). On PostgreSQL an
+advisory lock keeps a single drainer at a time.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import text, select, bindparam
+from models import db, SepayWebhookEvent
+from .sepay_service import SepayService
+
+logger = logging.getLogger(__name__)
+
+
+class SepayWebhookJournal:
+    """Service for journaled webhook ingestion"""
+
+    LOCK_ID = 7302002  # pg advisory lock key, any constant unique to this job
+    PURGE_EVERY = 3600  # Seconds between removals of old processed events
+
+    _app = None
+    _worker = None
+    _worker_pid = None
+    _stop = threading.Event()
+    _wake = threading.Event()
+    _start_lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        """
+        Configure webhook ingestion for an app
+
+        SEPAY_WEBHOOK_MODE: 'inline' processes webhooks in the request, 'journal' queues them.
+        SEPAY_WEBHOOK_DRAIN_INTERVAL (seconds) between drains when no webhook wakes the worker.
+        SEPAY_WEBHOOK_DRAIN_BATCH events per batch; SEPAY_WEBHOOK_MAX_ATTEMPTS for internal errors.
+        SEPAY_WEBHOOK_RETENTION_DAYS keeps processed events for auditing.
+        """
+        cls._app = app
+        if app.config.get('SEPAY_WEBHOOK_MODE') == 'journal':
+            # Also drain events appended by processes that have since exited
+            app.before_request(cls._ensure_worker)
+
+    @staticmethod
+    def enabled():
+        """Check if webhooks are journaled instead of processed inline"""
+        return current_app.config.get('SEPAY_WEBHOOK_MODE') == 'journal'
+
+    @classmethod
+    def _interval(cls):
+        if cls._app is None:
+            return 1
+        return float(cls._app.config.get('SEPAY_WEBHOOK_DRAIN_INTERVAL', 1))
+
+    @classmethod
+    def append(cls, payload):
+        """
+        Durably record a raw webhook body and wake the drain worker
+
+        Args:
+            payload: Request body as text
+
+        Returns:
+            int: Event ID
+        """
+        result = db.session.execute(SepayWebhookEvent.__table__.insert().values(payload=payload))
+        db.session.commit()
+        cls._ensure_worker()
+        cls._wake.set()
+        return result.inserted_primary_key[0]
+
+    @classmethod
+    def drain(cls, batch_size=None):
+        """
+        Process journaled events in arrival order
+
+        An event that fails with an internal error (e.g. the database went
+        away) stays queued and stops the drain, so later events are not
+        applied before it; it is given up after SEPAY_WEBHOOK_MAX_ATTEMPTS.
+
+        Returns:
+            dict: processed / retried / batches counts
+        """
+        stats = {'processed': 0, 'retried': 0, 'batches': 0}
+        if db.engine.dialect.name != 'postgresql':
+            return cls._drain(stats, batch_size)
+
+        with db.engine.connect() as lock_conn:
+            if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {'id': cls.LOCK_ID}).scalar():
+                return stats  # Another worker is draining
+            try:
+                return cls._drain(stats, batch_size)
+            finally:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': cls.LOCK_ID})
+                lock_conn.commit()
+
+    @classmethod
+    def _drain(cls, stats, batch_size):
+        config = current_app.config
+        batch_size = batch_size or int(config.get('SEPAY_WEBHOOK_DRAIN_BATCH', 100))
+        max_attempts = int(config.get('SEPAY_WEBHOOK_MAX_ATTEMPTS', 5))
+        table = SepayWebhookEvent.__table__
+        mark = table.update()\
+            .where(table.c.id == bindparam('event_id'))\
+            .values(attempts=table.c.attempts + 1,
+                    result=bindparam('event_result'),
+                    processed_at=bindparam('event_processed_at'))
+
+        while True:
+            # Served by the partial index on id WHERE processed_at IS NULL
+            events = db.session.execute(
+                select(table.c.id, table.c.payload, table.c.attempts)
+                .where(table.c.processed_at.is_(None))
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            db.session.commit()
+            if not events:
+                break
+
+            done = []
+            blocked = False
+            for event_id, payload, attempts in events:
+                try:
+                    success, message = SepayService.process_payment_webhook(json.loads(payload))
+                except ValueError:
+                    success, message = False, 'Invalid JSON payload'
+
+                if not success and message.startswith('Internal error') and attempts + 1 < max_attempts:
+                    db.session.execute(mark, [{'event_id': event_id, 'event_result': message[:255],
+                                               'event_processed_at': None}])
+                    stats['retried'] += 1
+                    blocked = True
+                    break
+                done.append({'event_id': event_id, 'event_result': message[:255],
+                             'event_processed_at': datetime.utcnow()})
+
+            if done:
+                db.session.execute(mark, done)
+            db.session.commit()
+            stats['processed'] += len(done)
+            stats['batches'] += 1
+            if blocked or len(events) < batch_size:
+                break
+
+        return stats
+
+    @classmethod
+    def purge(cls, days=None):
+        """Delete processed events older than SEPAY_WEBHOOK_RETENTION_DAYS"""
+        days = days if days is not None else int(current_app.config.get('SEPAY_WEBHOOK_RETENTION_DAYS', 30))
+        deleted = SepayWebhookEvent.query.filter(
+            SepayWebhookEvent.processed_at < datetime.utcnow() - timedelta(days=days)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    @classmethod
+    def _ensure_worker(cls):
+        """Start the drain thread (again after a fork)"""
+        if cls._worker is not None and cls._worker.is_alive() and cls._worker_pid == os.getpid():
+            return
+        with cls._start_lock:
+            if cls._worker is not None and cls._worker.is_alive() and cls._worker_pid == os.getpid():
+                return
+            cls._stop.clear()
+            cls._worker = threading.Thread(target=cls.run_forever, name='sepay-webhook-drain', daemon=True)
+            cls._worker_pid = os.getpid()
+            cls._worker.start()
+
+    @classmethod
+    def run_forever(cls):
+        """Drain on every wake-up (or every interval) until stop() is called"""
+        next_purge = 0
+        while not cls._stop.is_set():
+            cls._wake.wait(max(cls._interval(), 0.1))
+            cls._wake.clear()
+            if cls._stop.is_set():
+                break
+            with cls._app.app_context():
+                try:
+                    cls.drain()
+                    if time.monotonic() >= next_purge:
+                        next_purge = time.monotonic() + cls.PURGE_EVERY
+                        cls.purge()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"SePay webhook drain failed: {e}")
+                finally:
+                    db.session.remove()
+
+    @classmethod
+    def stop(cls):
+        cls._stop.set()
+        cls._wake.set()
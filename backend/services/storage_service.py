@@ -0,0 +1,174 @@
+"""
+Storage service - content-addressed document file storage
+
+Uploaded files are streamed through SHA-256 into a temporary file and stored
+once at objects/<hh>/<sha256>.<ext> under UPLOAD_FOLDER. DocumentFile rows
+carry the content_hash, so the number of rows sharing a hash is the object's
+reference count.
+"""
+import os
+import hashlib
+import tempfile
+from flask import current_app
+from sqlalchemy import func
+from models import db, Document, DocumentFile
+
+URL_PREFIX = '/uploads/documents/'
+CHUNK_SIZE = 1024 * 1024
+
+
+class StorageService:
+    """Service for storing uploaded document files"""
+
+    @staticmethod
+    def _upload_folder():
+        return current_app.config['UPLOAD_FOLDER']
+
+    @staticmethod
+    def object_name(content_hash, file_ext):
+        """Path of a stored object relative to UPLOAD_FOLDER"""
+        return f"objects/{content_hash[:2]}/{content_hash}.{file_ext}"
+
+    @staticmethod
+    def relative_path(file_url):
+        """Strip the /api and /uploads/documents/ prefixes from a file URL"""
+        relative = (file_url or '')
+        if relative.startswith('/api' + URL_PREFIX):
+            relative = relative[len('/api'):]
+        if relative.startswith(URL_PREFIX):
+            relative = relative[len(URL_PREFIX):]
+        return relative
+
+    @staticmethod
+    def local_path(file_url):
+        """
+        Map a /uploads/documents/... URL to its path on disk
+
+        Returns:
+            str: Absolute path, or None if the URL points outside UPLOAD_FOLDER
+        """
+        from werkzeug.security import safe_join
+
+        relative = StorageService.relative_path(file_url)
+        return safe_join(os.path.abspath(StorageService._upload_folder()), relative)
+
+    @staticmethod
+    def store_upload(file, file_ext):
+        """
+        Store an uploaded file at its content address
+
+        The upload is copied in chunks, so memory use does not depend on file size.
+        If an object with the same bytes exists, the temporary copy is discarded.
+
+        Args:
+            file: Werkzeug FileStorage (or any object with a binary .stream)
+            file_ext: Lowercase extension without the dot
+
+        Returns:
+            dict: {file_url, file_type, file_size, content_hash, deduplicated}
+        """
+        upload_folder = StorageService._upload_folder()
+        tmp_folder = os.path.join(upload_folder, 'tmp')
+        os.makedirs(tmp_folder, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_folder, suffix=f'.{file_ext}')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+            return StorageService.commit_object(tmp_path, digest.hexdigest(), file_ext, size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def commit_object(tmp_path, content_hash, file_ext, size):
+        """
+        Move a fully written temporary file to its content address
+
+        Args:
+            tmp_path: Temporary file inside UPLOAD_FOLDER (removed or moved)
+            content_hash: SHA-256 hex digest of the file
+            file_ext: Lowercase extension without the dot
+            size: File size in bytes
+
+        Returns:
+            dict: {file_url, file_type, file_size, content_hash, deduplicated}
+        """
+        name = StorageService.object_name(content_hash, file_ext)
+        object_path = os.path.join(StorageService._upload_folder(), name)
+
+        deduplicated = os.path.exists(object_path)
+        if deduplicated:
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(tmp_path, object_path)
+
+        return {
+            'file_url': f"{URL_PREFIX}{name}",
+            'file_type': file_ext,
+            'file_size': size,
+            'content_hash': content_hash,
+            'deduplicated': deduplicated
+        }
+
+    @staticmethod
+    def ref_count(content_hash):
+        """Number of DocumentFile rows using an object"""
+        if not content_hash:
+            return 0
+        return db.session.query(func.count(DocumentFile.id)).filter(
+            DocumentFile.content_hash == content_hash
+        ).scalar()
+
+    @staticmethod
+    def find_preview(content_hash):
+        """
+        Finished preview of an earlier file with the same bytes
+
+        Returns:
+            DocumentFile: A file with preview_status 'ready', or None
+        """
+        if not content_hash:
+            return None
+        return DocumentFile.query.filter(
+            DocumentFile.content_hash == content_hash,
+            DocumentFile.preview_status == 'ready'
+        ).first()
+
+    @staticmethod
+    def release(file_url):
+        """
+        Delete a stored file once nothing references it
+
+        Args:
+            file_url: URL returned by store_upload
+
+        Returns:
+            tuple: (deleted, error_message)
+        """
+        path = StorageService.local_path(file_url)
+        if not path or not os.path.isfile(path):
+            return False, 'File not found'
+
+        in_use = db.session.query(func.count(DocumentFile.id)).filter(
+            DocumentFile.file_url == file_url
+        ).scalar()
+        if in_use:
+            return False, f'File is used by {in_use} document file(s)'
+
+        # Documents also point at a file directly (Document.file_url)
+        in_use = db.session.query(func.count(Document.id)).filter(
+            Document.file_url == file_url
+        ).scalar()
+        if in_use:
+            return False, f'File is used by {in_use} document(s)'
+
+        os.remove(path)
+        return True, None
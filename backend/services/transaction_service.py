@@ -1,10 +1,66 @@
 """
 Transaction service for payments and purchases
 """
+import uuid
 from decimal import Decimal
 from datetime import datetime
 from models import db, Transaction, User, Document, DocumentPackage
+from sqlalchemy import text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from .sepay_service import SepayService
+from .entitlement_service import EntitlementService
+from .pagination_service import PaginationService
+
+
+def _purchase_sql(item_type):
+    """
+    One-statement balance purchase for PostgreSQL
+
+    Debits users.balance only if it covers the price and the item is not
+    already bought, inserts the completed transaction and grants the
+    entitlements. Returns the transaction id, or no row if nothing was debited.
+    """
+    item_table, item_column = ('documents', 'document_id') if item_type == 'document' else ('document_packages', 'package_id')
+    if item_type == 'document':
+        grants = "SELECT :user_id, :item_id, purchase.id, :now FROM purchase"
+    else:
+        grants = ("SELECT :user_id, pd.document_id, purchase.id, :now FROM purchase "
+                  "JOIN package_documents pd ON pd.package_id = :item_id")
+    return f"""
+        WITH item AS (
+            SELECT price FROM {item_table} WHERE id = :item_id
+        ),
+        debit AS (
+            UPDATE users SET balance = users.balance - item.price, updated_at = :now
+            FROM item
+            WHERE users.id = :user_id
+              AND users.balance >= item.price
+              AND NOT EXISTS (
+                  SELECT 1 FROM transactions t
+                  WHERE t.user_id = :user_id AND t.{item_column} = :item_id
+                    AND t.transaction_type = '{item_type}' AND t.status = 'completed'
+              )
+            RETURNING item.price
+        ),
+        purchase AS (
+            INSERT INTO transactions (id, user_id, transaction_type, {item_column}, amount,
+                                      status, payment_method, payment_status, created_at, updated_at)
+            SELECT :transaction_id, :user_id, '{item_type}', :item_id, debit.price,
+                   'completed', 'balance', 'completed', :now, :now
+            FROM debit
+            RETURNING id
+        ),
+        granted AS (
+            INSERT INTO user_document_entitlements (user_id, document_id, transaction_id, created_at)
+            {grants}
+            ON CONFLICT DO NOTHING
+        )
+        SELECT id FROM purchase
+    """
+
+
+PURCHASE_SQL = {item_type: _purchase_sql(item_type) for item_type in ('document', 'package')}
 
 
 class TransactionService:
@@ -13,106 +69,121 @@ class TransactionService:
     @staticmethod
     def purchase_document(user_id, document_id):
         """Purchase a document using user balance"""
-        try:
-            user = db.session.get(User, user_id)
-            if not user:
-                return None, 'User not found'
-            
-            document = db.session.get(Document, document_id)
-            if not document:
-                return None, 'Document not found'
-            
-            # Check if already purchased
-            existing = Transaction.query.filter_by(
-                user_id=user_id,
-                document_id=document_id,
-                transaction_type='document',
-                status='completed'
-            ).first()
-            
-            if existing:
-                return None, 'Document already purchased'
-            
-            # Check balance
-            if user.balance < document.price:
-                return None, 'Insufficient balance'
-            
-            # Create transaction
-            transaction = Transaction(
-                user_id=user_id,
-                transaction_type='document',
-                document_id=document_id,
-                amount=document.price,
-                status='pending',
-                payment_method='balance'
-            )
-            
-            # Deduct balance
-            user.balance -= document.price
-            
-            # Mark as completed
-            transaction.status = 'completed'
-            
-            db.session.add(transaction)
-            db.session.commit()
-            
-            return transaction, None
-            
-        except Exception as e:
-            db.session.rollback()
-            return None, f'Purchase failed: {str(e)}'
+        return TransactionService._purchase(user_id, 'document', document_id)
     
     @staticmethod
     def purchase_package(user_id, package_id):
         """Purchase a package using user balance"""
+        return TransactionService._purchase(user_id, 'package', package_id)
+    
+    @staticmethod
+    def _purchase(user_id, item_type, item_id):
+        """
+        Debit the balance and record a completed purchase atomically
+        
+        The debit is a conditional UPDATE (balance >= price), so concurrent
+        purchases can never overdraw, and the partial unique indexes on
+        transactions reject a second completed purchase of the same item.
+        On PostgreSQL debit, transaction and entitlements are written by a
+        single statement.
+        
+        Args:
+            user_id: Buyer
+            item_type: 'document' or 'package'
+            item_id: Document or package ID
+            
+        Returns:
+            tuple: (transaction, error_message)
+        """
+        label = item_type.capitalize()
+        params = {
+            'transaction_id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'item_id': item_id,
+            'now': datetime.utcnow()
+        }
         try:
-            user = db.session.get(User, user_id)
-            if not user:
-                return None, 'User not found'
-            
-            package = db.session.get(DocumentPackage, package_id)
-            if not package:
-                return None, 'Package not found'
-            
-            # Check if already purchased
-            existing = Transaction.query.filter_by(
-                user_id=user_id,
-                package_id=package_id,
-                transaction_type='package',
-                status='completed'
-            ).first()
-            
-            if existing:
-                return None, 'Package already purchased'
-            
-            # Check balance
-            if user.balance < package.price:
-                return None, 'Insufficient balance'
-            
-            # Create transaction
-            transaction = Transaction(
-                user_id=user_id,
-                transaction_type='package',
-                package_id=package_id,
-                amount=package.price,
-                status='pending',
-                payment_method='balance'
-            )
-            
-            # Deduct balance
-            user.balance -= package.price
+            if db.engine.dialect.name == 'postgresql':
+                purchased = db.session.execute(text(PURCHASE_SQL[item_type]), params).first() is not None
+            else:
+                purchased = TransactionService._purchase_portable(item_type, params)
             
-            # Mark as completed
-            transaction.status = 'completed'
+            if not purchased:
+                db.session.rollback()
+                return None, TransactionService._purchase_failure(user_id, item_type, item_id)
             
-            db.session.add(transaction)
             db.session.commit()
-            
-            return transaction, None
-            
+        except IntegrityError:
+            # A concurrent request completed the same purchase first
+            db.session.rollback()
+            return None, f'{label} already purchased'
         except Exception as e:
             db.session.rollback()
             return None, f'Purchase failed: {str(e)}'
+        
+        EntitlementService.clear_memo(user_id)
+        return db.session.get(Transaction, params['transaction_id']), None
+    
+    @staticmethod
+    def _purchase_portable(item_type, params):
+        """Same purchase for databases without data-modifying CTEs (SQLite); the caller commits"""
+        model = Document if item_type == 'document' else DocumentPackage
+        item = db.session.get(model, params['item_id'])
+        if not item:
+            return False
+        
+        item_column = Transaction.document_id if item_type == 'document' else Transaction.package_id
+        already = db.session.query(Transaction.id).filter(
+            Transaction.user_id == params['user_id'],
+            item_column == params['item_id'],
+            Transaction.transaction_type == item_type,
+            Transaction.status == 'completed'
+        ).first()
+        if already:
+            return False
+        
+        debited = db.session.execute(
+            update(User)
+            .where(User.id == params['user_id'], User.balance >= item.price)
+            .values(balance=User.balance - item.price, updated_at=params['now'])
+        ).rowcount
+        if not debited:
+            return False
+        
+        transaction = Transaction(
+            id=params['transaction_id'],
+            user_id=params['user_id'],
+            transaction_type=item_type,
+            document_id=params['item_id'] if item_type == 'document' else None,
+            package_id=params['item_id'] if item_type == 'package' else None,
+            amount=item.price,
+            status='completed',
+            payment_method='balance',
+            payment_status='completed'
+        )
+        db.session.add(transaction)
+        EntitlementService.grant_for_transaction(transaction)
+        db.session.flush()
+        return True
+    
+    @staticmethod
+    def _purchase_failure(user_id, item_type, item_id):
+        """Explain why a purchase debited nothing (only runs on the failure path)"""
+        if not db.session.get(User, user_id):
+            return 'User not found'
+        model = Document if item_type == 'document' else DocumentPackage
+        if not db.session.get(model, item_id):
+            return f'{item_type.capitalize()} not found'
+        item_column = Transaction.document_id if item_type == 'document' else Transaction.package_id
+        already = db.session.query(Transaction.id).filter(
+            Transaction.user_id == user_id,
+            item_column == item_id,
+            Transaction.transaction_type == item_type,
+            Transaction.status == 'completed'
+        ).first()
+        if already:
+            return f'{item_type.capitalize()} already purchased'
+        return 'Insufficient balance'
     
     @staticmethod
     def create_sepay_payment(user_id, item_type, item_id):
@@ -178,24 +249,34 @@ class TransactionService:
             transaction = pending_query.first()
             
             if not transaction:
-                transaction = Transaction(
-                    user_id=user_id,
-                    transaction_type=item_type,
-                    document_id=document_id,
-                    package_id=package_id,
-                    amount=amount,
-                    status='pending',
-                    payment_method='sepay',
-                    payment_status='pending'
-                )
-                db.session.add(transaction)
-                db.session.commit()
+                # payment_code is unique; retry on the (very unlikely) collision
+                for attempt in range(3):
+                    transaction = Transaction(
+                        user_id=user_id,
+                        transaction_type=item_type,
+                        document_id=document_id,
+                        package_id=package_id,
+                        amount=amount,
+                        status='pending',
+                        payment_method='sepay',
+                        payment_status='pending',
+                        payment_code=SepayService.new_payment_code()
+                    )
+                    db.session.add(transaction)
+                    try:
+                        db.session.commit()
+                        break
+                    except IntegrityError:
+                        db.session.rollback()
+                        if attempt == 2:
+                            raise
             
             # Create SePay payment request
             payment_info, error = SepayService.create_payment_request(
                 transaction.id, 
                 amount,
-                description
+                description,
+                payment_code=transaction.payment_code
             )
             
             if error:
@@ -255,43 +336,37 @@ class TransactionService:
     
     @staticmethod
     def check_user_purchased_document(user_id, document_id):
-        """Check if user has purchased a document"""
-        direct_purchase = Transaction.query.filter_by(
-            user_id=user_id,
-            document_id=document_id,
-            transaction_type='document',
-            status='completed'
-        ).first()
-        
-        if direct_purchase:
-            return True
-        
-        # Check if purchased via package
-        package_purchases = Transaction.query.filter_by(
-            user_id=user_id,
-            transaction_type='package',
-            status='completed'
-        ).all()
-        
-        for purchase in package_purchases:
-            if purchase.package:
-                for pkg_doc in purchase.package.documents:
-                    if pkg_doc.document_id == document_id:
-                        return True
-        
-        return False
+        """Check if user has purchased a document (directly or via a package)"""
+        return EntitlementService.user_owns_document(user_id, document_id)
     
     @staticmethod
-    def get_user_transactions(user_id, page=1, per_page=20, transaction_type=None):
-        """Get user transaction history"""
-        query = Transaction.query.filter_by(user_id=user_id)
+    def get_user_transactions(user_id, page=1, per_page=20, transaction_type=None,
+                              cursor=None, total=None):
+        """
+        Get user transaction history
+        
+        Pass cursor (not None, '' for the first page) to use keyset pagination;
+        total ('exact'/'estimate') is then computed only on request.
+        """
+        query = Transaction.query.options(
+            selectinload(Transaction.document).selectinload(Document.files),
+            selectinload(Transaction.package)
+        ).filter_by(user_id=user_id)
         
         if transaction_type:
             query = query.filter_by(transaction_type=transaction_type)
         
+        if cursor is not None:
+            result = PaginationService.paginate_keyset(
+                query, Transaction.created_at, Transaction.id,
+                cursor=cursor, per_page=per_page, total=total
+            )
+            result['transactions'] = [txn.to_dict(include_details=True) for txn in result.pop('items')]
+            return result
+        
         query = query.order_by(Transaction.created_at.desc())
         
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = query.paginate(page=page, per_page=per_page, max_per_page=PaginationService.max_per_page(), error_out=False)
         
         return {
             'transactions': [txn.to_dict(include_details=True) for txn in pagination.items],
@@ -303,31 +378,5 @@ class TransactionService:
     
     @staticmethod
     def get_purchased_documents(user_id):
-        """Get all documents purchased by user"""
-        documents = []
-        
-        # Direct purchases
-        direct_purchases = Transaction.query.filter_by(
-            user_id=user_id,
-            transaction_type='document',
-            status='completed'
-        ).all()
-        
-        for purchase in direct_purchases:
-            if purchase.document:
-                documents.append(purchase.document)
-        
-        # Package purchases
-        package_purchases = Transaction.query.filter_by(
-            user_id=user_id,
-            transaction_type='package',
-            status='completed'
-        ).all()
-        
-        for purchase in package_purchases:
-            if purchase.package:
-                for pkg_doc in purchase.package.documents:
-                    if pkg_doc.document and pkg_doc.document not in documents:
-                        documents.append(pkg_doc.document)
-        
-        return documents
+        """Get all documents purchased by user (directly or via packages)"""
+        return EntitlementService.get_owned_documents(user_id)
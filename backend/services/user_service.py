@@ -1,7 +1,10 @@
 """
 User service for user-related operations
 """
-from models import db, SavedDocument, ReportedDocument, User
+from models import db, SavedDocument, ReportedDocument, User, Document
+from sqlalchemy.orm import joinedload
+from .pagination_service import PaginationService
+from .principal_service import PrincipalService
 
 
 class UserService:
@@ -200,7 +203,7 @@ class UserService:
             return False, f'Failed to unsave document: {str(e)}'
     
     @staticmethod
-    def get_saved_documents(user_id, page=1, per_page=20):
+    def get_saved_documents(user_id, page=1, per_page=20, cursor=None, total=None):
         """
         Get user's saved documents
         
@@ -208,15 +211,29 @@ class UserService:
             user_id: User ID
             page: Page number
             per_page: Items per page
+            cursor: Keyset mode when not None ('' = first page)
+            total: Keyset mode only - None, 'exact' or 'estimate'
             
         Returns:
-            dict: {documents, total, page, per_page, pages}
+            dict: {documents, total, page, per_page, pages}, or in keyset mode
+                  {documents, total, per_page, next_cursor, has_next}
         """
-        query = SavedDocument.query.filter_by(user_id=user_id).order_by(
-            SavedDocument.created_at.desc()
-        )
+        query = SavedDocument.query.options(
+            joinedload(SavedDocument.document).joinedload(Document.category),
+            joinedload(SavedDocument.document).selectinload(Document.files)
+        ).filter_by(user_id=user_id)
         
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        if cursor is not None:
+            result = PaginationService.paginate_keyset(
+                query, SavedDocument.created_at, SavedDocument.id,
+                cursor=cursor, per_page=per_page, total=total
+            )
+            result['documents'] = [sd.to_dict(include_document=True) for sd in result.pop('items')]
+            return result
+        
+        query = query.order_by(SavedDocument.created_at.desc())
+        
+        pagination = query.paginate(page=page, per_page=per_page, max_per_page=PaginationService.max_per_page(), error_out=False)
         
         return {
             'documents': [sd.to_dict(include_document=True) for sd in pagination.items],
@@ -279,7 +296,7 @@ class UserService:
         
         query = query.order_by(ReportedDocument.created_at.desc())
         
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = query.paginate(page=page, per_page=per_page, max_per_page=PaginationService.max_per_page(), error_out=False)
         
         return {
             'reports': [report.to_dict(include_details=True) for report in pagination.items],
@@ -325,7 +342,7 @@ class UserService:
             return None, f'Failed to update report: {str(e)}'
     
     @staticmethod
-    def get_all_users(page=1, per_page=20, role=None, is_active=None):
+    def get_all_users(page=1, per_page=20, role=None, is_active=None, cursor=None, total=None):
         """
         Get all users (admin)
         
@@ -334,9 +351,12 @@ class UserService:
             per_page: Items per page
             role: Filter by role
             is_active: Filter by active status
+            cursor: Keyset mode when not None ('' = first page)
+            total: Keyset mode only - None, 'exact' or 'estimate'
             
         Returns:
-            dict: {users, total, page, per_page, pages}
+            dict: {users, total, page, per_page, pages}, or in keyset mode
+                  {users, total, per_page, next_cursor, has_next}
         """
         query = User.query
         
@@ -346,9 +366,17 @@ class UserService:
         if is_active is not None:
             query = query.filter_by(is_active=is_active)
         
+        if cursor is not None:
+            result = PaginationService.paginate_keyset(
+                query, User.created_at, User.id,
+                cursor=cursor, per_page=per_page, total=total
+            )
+            result['users'] = [user.to_dict(include_sensitive=True) for user in result.pop('items')]
+            return result
+        
         query = query.order_by(User.created_at.desc())
         
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = query.paginate(page=page, per_page=per_page, max_per_page=PaginationService.max_per_page(), error_out=False)
         
         return {
             'users': [user.to_dict(include_sensitive=True) for user in pagination.items],
@@ -377,6 +405,7 @@ class UserService:
             
             user.is_active = not user.is_active
             db.session.commit()
+            PrincipalService.invalidate(user_id)
             
             return user, None
             
@@ -409,6 +438,7 @@ class UserService:
                 return None, 'Balance cannot be negative'
             
             db.session.commit()
+            PrincipalService.invalidate(user_id)
             
             return user, None
             
@@ -450,6 +480,7 @@ class UserService:
                 user.role = kwargs['role']
             
             db.session.commit()
+            PrincipalService.invalidate(user_id)
             return user, None
             
         except Exception as e:
@@ -475,6 +506,7 @@ class UserService:
             
             db.session.delete(user)
             db.session.commit()
+            PrincipalService.invalidate(user_id)
             
             return True, None
             
@@ -51,6 +51,7 @@ export interface DocumentParams {
     per_page?: number;
     q?: string;
     category_id?: number | string;
+    include_descendants?: boolean;
     sort?: string;
     min_price?: number;
     max_price?: number;
@@ -1,4 +1,4 @@
-import api from './axios';
+import api, { API_BASE_URL } from './axios';
 
 export interface PaymentInfo {
     bank_account: string;
@@ -27,6 +27,38 @@ export const sepayApi = {
     checkStatus: (transactionId: string) =>
         api.get<{ success: boolean; data: PaymentStatus }>(`/sepay/check/${transactionId}`),
 
+    // Wait for the payment to leave 'pending' (Server-Sent Events).
+    // Resolves with the final status, or null when the server ends the stream first (reconnect).
+    streamStatus: async (transactionId: string, signal: AbortSignal): Promise<PaymentStatus | null> => {
+        const token = localStorage.getItem('access_token');
+        const response = await fetch(`${API_BASE_URL}/api/sepay/stream/${transactionId}`, {
+            headers: token ? { Authorization: `Bearer ${token}` } : {},
+            signal,
+        });
+        if (!response.ok || !response.body) {
+            throw new Error(`Payment stream failed: ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) return null;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const lines = buffer.slice(0, boundary).split('\n');
+                buffer = buffer.slice(boundary + 2);
+                const event = lines.find((line) => line.startsWith('event:'))?.slice(6).trim();
+                const data = lines.filter((line) => line.startsWith('data:')).map((line) => line.slice(5).trim()).join('\n');
+                if (event === 'status') return JSON.parse(data);
+                if (event === 'error') throw new Error(JSON.parse(data).message);
+            }
+        }
+    },
+
     // Cancel payment
     cancelPayment: (transactionId: string) =>
         api.post<{ success: boolean; message: string }>(`/sepay/cancel/${transactionId}`, {}),
@@ -25,8 +25,8 @@ export default function SepayPaymentModal({
     const [status, setStatus] = useState<'pending' | 'completed' | 'failed' | 'cancelled'>('pending');
     const [timeLeft, setTimeLeft] = useState<number>(900); // 15 minutes
 
-    // Polling interval
-    const intervalRef = useRef<NodeJS.Timeout | null>(null);
+    // Status stream of the current payment
+    const streamRef = useRef<AbortController | null>(null);
 
     // Initial load - create payment request
     useEffect(() => {
@@ -84,36 +84,59 @@ export default function SepayPaymentModal({
         }
     };
 
+    // Returns true once the payment has left 'pending'
+    const handleStatus = (result: PaymentStatus) => {
+        if (result.payment_status === 'completed') {
+            setStatus('completed');
+            stopPolling();
+            toast.success('Thanh toán thành công!');
+            setTimeout(() => {
+                onSuccess();
+                onClose();
+            }, 2000);
+            return true;
+        }
+        if (result.payment_status === 'failed' || result.payment_status === 'cancelled') {
+            setStatus(result.payment_status);
+            stopPolling();
+            setError('Thanh toán thất bại hoặc đã bị hủy');
+            return true;
+        }
+        return false;
+    };
+
+    // The server pushes the status once over /sepay/stream; a status check is
+    // only made when the stream fails, before reconnecting.
     const startPolling = (transactionId: string) => {
         stopPolling();
 
-        intervalRef.current = setInterval(async () => {
-            try {
-                const { data } = await sepayApi.checkStatus(transactionId);
+        const controller = new AbortController();
+        streamRef.current = controller;
 
-                if (data.data.payment_status === 'completed') {
-                    setStatus('completed');
-                    stopPolling();
-                    toast.success('Thanh toán thành công!');
-                    setTimeout(() => {
-                        onSuccess();
-                        onClose();
-                    }, 2000);
-                } else if (data.data.payment_status === 'failed' || data.data.payment_status === 'cancelled') {
-                    setStatus(data.data.payment_status);
-                    stopPolling();
-                    setError('Thanh toán thất bại hoặc đã bị hủy');
+        (async () => {
+            while (!controller.signal.aborted) {
+                try {
+                    const result = await sepayApi.streamStatus(transactionId, controller.signal);
+                    if (result && handleStatus(result)) return;
+                } catch (err) {
+                    if (controller.signal.aborted) return;
+                    console.error('Payment stream error', err);
+                    try {
+                        const { data } = await sepayApi.checkStatus(transactionId);
+                        if (handleStatus(data.data)) return;
+                    } catch (checkErr) {
+                        console.error('Polling error', checkErr);
+                    }
+                    await new Promise((resolve) => setTimeout(resolve, 3000));
                 }
-            } catch (err) {
-                console.error('Polling error', err);
             }
-        }, 3000); // Poll every 3 seconds
+        })();
     };
 
     const stopPolling = () => {
-        if (intervalRef.current) {
-            clearInterval(intervalRef.current);
-            intervalRef.current = null;
+        if (streamRef.current) {
+            streamRef.current.abort();
+            streamRef.current = null;
         }
     };
 